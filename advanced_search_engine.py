@@ -1,9 +1,8 @@
 # Orchestra AI Advanced Search Engine Implementation
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Union
-import asyncio
-import aiohttp
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
 import requests
 import json
 import time
@@ -11,6 +10,10 @@ from datetime import datetime
 import logging
 import os
 
+from search_cache import MISS, search_cache
+from search_fanout import OK, FanOut, search_latency
+from search_http_client import provider_http
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,6 +46,8 @@ class BlendedSearchResponse(BaseModel):
     blended_results: List[SearchResult]
     processing_time_ms: int
     sources_used: List[str]
+    cached_sources: List[str] = Field(default_factory=list, description="Sources answered from the search cache")
+    provider_status: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="Status and latency per provider")
     cost_estimate: float = 0.0
 
 # Search Engine Configuration
@@ -165,11 +170,13 @@ async def search_database(query: str, persona: str, max_results: int = 10) -> Li
 async def search_duckduckgo(query: str, max_results: int = 10) -> List[SearchResult]:
     """Search using DuckDuckGo Instant Answer API"""
     try:
-        url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as response:
-                data = await response.json()
+        params = {"q": query, "format": "json", "no_html": "1", "skip_disambig": "1"}
+        status, data = await provider_http.fetch_json(
+            "duckduckgo", "GET", "https://api.duckduckgo.com/", params=params, timeout=10
+        )
+        if data is None:
+            logger.error(f"DuckDuckGo search failed with status: {status}")
+            return []
         
         results = []
         
@@ -220,26 +227,25 @@ async def search_exa_ai(query: str, api_key: str, max_results: int = 10) -> List
             "use_autoprompt": True
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data, timeout=15) as response:
-                if response.status == 200:
-                    result_data = await response.json()
-                    results = []
-                    
-                    for item in result_data.get('results', []):
-                        results.append(SearchResult(
-                            title=item.get('title', 'Exa AI Result'),
-                            content=item.get('text', '')[:1000],
-                            url=item.get('url', ''),
-                            source="Exa AI",
-                            relevance_score=item.get('score', 0.7),
-                            metadata={"published_date": item.get('published_date')}
-                        ))
-                    
-                    return results
-                else:
-                    logger.error(f"Exa AI search failed with status: {response.status}")
-                    return []
+        status, result_data = await provider_http.fetch_json(
+            "exa_ai", "POST", url, headers=headers, json=data, timeout=15
+        )
+        if result_data is None:
+            logger.error(f"Exa AI search failed with status: {status}")
+            return []
+        
+        results = []
+        for item in result_data.get('results', []):
+            results.append(SearchResult(
+                title=item.get('title', 'Exa AI Result'),
+                content=item.get('text', '')[:1000],
+                url=item.get('url', ''),
+                source="Exa AI",
+                relevance_score=item.get('score', 0.7),
+                metadata={"published_date": item.get('published_date')}
+            ))
+        
+        return results
                     
     except Exception as e:
         logger.error(f"Exa AI search failed: {e}")
@@ -260,26 +266,23 @@ async def search_serp_api(query: str, api_key: str, max_results: int = 10) -> Li
             "num": max_results
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=15) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    results = []
-                    
-                    for item in data.get('organic_results', []):
-                        results.append(SearchResult(
-                            title=item.get('title', 'SERP Result'),
-                            content=item.get('snippet', ''),
-                            url=item.get('link', ''),
-                            source="Google (SERP)",
-                            relevance_score=0.8,
-                            metadata={"position": item.get('position')}
-                        ))
-                    
-                    return results
-                else:
-                    logger.error(f"SERP API search failed with status: {response.status}")
-                    return []
+        status, data = await provider_http.fetch_json("serp", "GET", url, params=params, timeout=15)
+        if data is None:
+            logger.error(f"SERP API search failed with status: {status}")
+            return []
+        
+        results = []
+        for item in data.get('organic_results', []):
+            results.append(SearchResult(
+                title=item.get('title', 'SERP Result'),
+                content=item.get('snippet', ''),
+                url=item.get('link', ''),
+                source="Google (SERP)",
+                relevance_score=0.8,
+                metadata={"position": item.get('position')}
+            ))
+        
+        return results
                     
     except Exception as e:
         logger.error(f"SERP API search failed: {e}")
@@ -332,6 +335,21 @@ async def search_with_scraping(query: str, mode: str, config: SearchConfig) -> L
     
     return results
 
+def _copy_result(result: SearchResult) -> SearchResult:
+    return result.model_copy() if hasattr(result, 'model_copy') else result.copy()
+
+def event_payload(event: Dict[str, Any]) -> Dict[str, Any]:
+    """A stream_search event as plain JSON-compatible data"""
+    def encode(value):
+        if hasattr(value, 'model_dump'):
+            return value.model_dump(mode='json')
+        if hasattr(value, 'dict'):
+            return value.dict()
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+    return json.loads(json.dumps(event, default=encode))
+
 # Search Orchestration Engine
 class SearchOrchestrator:
     def __init__(self):
@@ -339,76 +357,98 @@ class SearchOrchestrator:
     
     async def execute_search(self, request: SearchRequest) -> BlendedSearchResponse:
         """Execute a comprehensive search across multiple sources"""
+        response = None
+        async for event in self.stream_search(request, blend_updates=False):
+            if event["type"] == "search_completed":
+                response = event["response"]
+        return response
+    
+    async def stream_search(self, request: SearchRequest, blend_updates: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Execute a search, yielding events as each source answers
+        
+        Events, in order: search_started; provider_results for every source as
+        it finishes (or misses the mode's timeout), each followed by a blended
+        ranking of everything received so far when blend_updates is set; and
+        search_completed carrying the final BlendedSearchResponse.
+        """
         start_time = time.time()
         
         database_results = []
         internet_results = []
         sources_used = []
+        cached_sources = []
+        provider_status = {}
         
         # Get search mode configuration
         mode_config = self.config.search_modes.get(request.search_mode, self.config.search_modes['normal'])
         
-        # Execute database search if requested
+        # Every source runs concurrently within the mode's timeout, answering from the
+        # cache where possible and keeping whatever finishes in time
+        fanout = FanOut(deadline=mode_config['timeout'])
+        provider_sources = {}
+        
+        # Database search if requested
         if request.include_database:
-            try:
-                database_results = await search_database(
-                    request.query, 
-                    request.persona, 
-                    max_results=request.max_results // 2
-                )
-                if database_results:
-                    sources_used.append("Database")
-            except Exception as e:
-                logger.error(f"Database search failed: {e}")
+            provider_sources["database"] = ["Database"]
+            fanout.add("database", lambda: search_database(
+                request.query, 
+                request.persona, 
+                max_results=request.max_results // 2
+            ))
         
-        # Execute internet searches if requested
+        # Internet searches if requested
         if request.include_internet:
-            search_tasks = []
-            
-            # DuckDuckGo (always available)
-            if 'duckduckgo' in mode_config['apis']:
-                search_tasks.append(search_duckduckgo(request.query, max_results=5))
-                sources_used.append("DuckDuckGo")
-            
-            # Exa AI
-            if 'exa_ai' in mode_config['apis']:
-                search_tasks.append(search_exa_ai(
-                    request.query, 
-                    self.config.exa_ai_api_key, 
-                    max_results=5
-                ))
-                sources_used.append("Exa AI")
-            
-            # SERP API
-            if 'serp' in mode_config['apis']:
-                search_tasks.append(search_serp_api(
-                    request.query, 
-                    self.config.serp_api_key, 
-                    max_results=5
-                ))
-                sources_used.append("SERP API")
+            for provider, sources, fetch in self._internet_calls(request, mode_config):
+                provider_sources[provider] = sources
+                sources_used.extend(sources)
+                fanout.add(provider, self._cached_search(provider, request, fetch), cached=True)
+        
+        yield {
+            "type": "search_started",
+            "query": request.query,
+            "persona": request.persona,
+            "search_mode": request.search_mode,
+            "providers": list(provider_sources),
+            "timeout_ms": mode_config['timeout'] * 1000
+        }
+        
+        async for outcome in fanout.as_completed():
+            provider = outcome.provider
+            provider_status[provider] = outcome.to_dict()
+            if outcome.status != OK:
+                logger.error(f"Search task {provider} failed: {outcome.status} {outcome.error or ''}")
+            elif provider == "database":
+                database_results = outcome.results
+                if database_results:
+                    sources_used.insert(0, "Database")
+            else:
+                internet_results.extend(outcome.results)
+                if outcome.cache not in (None, MISS):
+                    cached_sources.extend(provider_sources[provider])
             
-            # Advanced scraping for deep modes
-            if mode_config.get('scraping', False):
-                search_tasks.append(search_with_scraping(
-                    request.query, 
-                    request.search_mode, 
-                    self.config
-                ))
-                sources_used.extend(["Apify", "PhantomBuster", "ZenRows"])
+            yield {
+                "type": "provider_results",
+                "provider": provider,
+                "sources": provider_sources[provider],
+                "cache": outcome.cache,
+                **provider_status[provider],
+                "results": outcome.results
+            }
             
-            # Execute all internet searches concurrently
-            try:
-                search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
-                
-                for result in search_results:
-                    if isinstance(result, list):
-                        internet_results.extend(result)
-                    elif isinstance(result, Exception):
-                        logger.error(f"Search task failed: {result}")
-                        
-            except Exception as e:
-                logger.error(f"Internet search orchestration failed: {e}")
+            if blend_updates and outcome.results:
+                blended_results = self._blend_results(
+                    database_results, 
+                    internet_results, 
+                    request.persona, 
+                    request.query
+                )
+                yield {
+                    "type": "blended",
+                    "providers_done": len(provider_status),
+                    "providers_total": len(provider_sources),
+                    "total_results": len(blended_results),
+                    "blended_results": blended_results[:request.max_results]
+                }
         
         # Blend and rank results
         blended_results = self._blend_results(
@@ -421,25 +461,83 @@ class SearchOrchestrator:
         # Calculate processing time
         processing_time = int((time.time() - start_time) * 1000)
         
-        return BlendedSearchResponse(
-            query=request.query,
-            persona=request.persona,
-            search_mode=request.search_mode,
-            total_results=len(blended_results),
-            database_results=database_results,
-            internet_results=internet_results,
-            blended_results=blended_results[:request.max_results],
-            processing_time_ms=processing_time,
-            sources_used=sources_used,
-            cost_estimate=self._estimate_cost(sources_used, len(blended_results))
-        )
+        yield {
+            "type": "search_completed",
+            "response": BlendedSearchResponse(
+                query=request.query,
+                persona=request.persona,
+                search_mode=request.search_mode,
+                total_results=len(blended_results),
+                database_results=database_results,
+                internet_results=internet_results,
+                blended_results=blended_results[:request.max_results],
+                processing_time_ms=processing_time,
+                sources_used=sources_used,
+                cached_sources=cached_sources,
+                provider_status=provider_status,
+                cost_estimate=self._estimate_cost(sources_used, len(blended_results), cached_sources, {
+                    source: provider_status[provider]["attempts"]
+                    for provider, sources in provider_sources.items() if provider in provider_status
+                    for source in sources
+                })
+            )
+        }
+    
+    def _internet_calls(self, request: SearchRequest, mode_config: Dict[str, Any]) -> List[tuple]:
+        """(cache provider, sources it stands for, fetch) for each internet search of the mode"""
+        provider_calls = []
+        
+        # DuckDuckGo (always available)
+        if 'duckduckgo' in mode_config['apis']:
+            provider_calls.append(("duckduckgo", ["DuckDuckGo"], lambda: search_duckduckgo(
+                request.query, max_results=5
+            )))
+        
+        # Exa AI
+        if 'exa_ai' in mode_config['apis']:
+            provider_calls.append(("exa_ai", ["Exa AI"], lambda: search_exa_ai(
+                request.query, 
+                self.config.exa_ai_api_key, 
+                max_results=5
+            )))
+        
+        # SERP API
+        if 'serp' in mode_config['apis']:
+            provider_calls.append(("serp", ["SERP API"], lambda: search_serp_api(
+                request.query, 
+                self.config.serp_api_key, 
+                max_results=5
+            )))
+        
+        # Advanced scraping for deep modes
+        if mode_config.get('scraping', False):
+            provider_calls.append(("scraping", ["Apify", "PhantomBuster", "ZenRows"], lambda: search_with_scraping(
+                request.query, 
+                request.search_mode, 
+                self.config
+            )))
+        
+        return provider_calls
+    
+    def _cached_search(self, provider: str, request: SearchRequest, fetch):
+        """Provider fetch answered from the search cache when possible, with its cache status"""
+        async def cached() -> Tuple[List[SearchResult], str]:
+            return await search_cache.get_or_fetch(
+                provider,
+                request.search_mode,
+                request.persona,
+                request.query,
+                fetch,
+                decode=lambda items: [SearchResult(**item) for item in items]
+            )
+        return cached
     
     def _blend_results(self, db_results: List[SearchResult], web_results: List[SearchResult], 
                       persona: str, query: str) -> List[SearchResult]:
         """Intelligently blend database and web results based on persona and query"""
         
-        # Combine all results
-        all_results = db_results + web_results
+        # Combine all results; scores are adjusted on copies, so the inputs can be re-blended
+        all_results = [_copy_result(result) for result in db_results + web_results]
         
         # Apply persona-specific weighting
         persona_weights = {
@@ -476,8 +574,14 @@ class SearchOrchestrator:
         
         return unique_results
     
-    def _estimate_cost(self, sources: List[str], result_count: int) -> float:
-        """Estimate the cost of the search operation"""
+    def _estimate_cost(self, sources: List[str], result_count: int,
+                       cached_sources: Optional[List[str]] = None,
+                       attempts: Optional[Dict[str, int]] = None) -> float:
+        """Estimate the cost of the search operation
+
+        Sources answered from the cache are free; a hedged source is paid for
+        every attempt sent (`attempts` by source, default one).
+        """
         cost_per_source = {
             'Database': 0.0,
             'DuckDuckGo': 0.0,
@@ -488,9 +592,12 @@ class SearchOrchestrator:
             'ZenRows': 0.01
         }
         
+        cached = set(cached_sources or [])
+        attempts = attempts or {}
         total_cost = 0.0
         for source in sources:
-            total_cost += cost_per_source.get(source, 0.005)
+            if source not in cached:
+                total_cost += cost_per_source.get(source, 0.005) * attempts.get(source, 1)
         
         # Add result processing cost
         total_cost += result_count * 0.001
@@ -503,6 +610,11 @@ search_orchestrator = SearchOrchestrator()
 # Add these endpoints to your main FastAPI app
 def add_advanced_search_endpoints(app: FastAPI):
     
+    # One provider connection pool for the life of the app
+    app.add_event_handler("startup", provider_http.start)
+    app.add_event_handler("shutdown", provider_http.close)
+    app.add_event_handler("shutdown", search_cache.close)
+    
     @app.post("/api/search/advanced", response_model=BlendedSearchResponse)
     async def advanced_search(request: SearchRequest):
         """Execute advanced search with blending across multiple sources"""
@@ -512,6 +624,23 @@ def add_advanced_search_endpoints(app: FastAPI):
             logger.error(f"Advanced search failed: {e}")
             raise HTTPException(status_code=500, detail=str(e))
     
+    @app.get("/api/search/advanced/stream")
+    async def advanced_search_stream(request: SearchRequest = Depends()):
+        """Stream search events as Server-Sent Events, one source at a time"""
+        async def events():
+            try:
+                async for event in search_orchestrator.stream_search(request):
+                    yield f"event: {event['type']}\ndata: {json.dumps(event_payload(event))}\n\n"
+            except Exception as e:
+                logger.error(f"Streaming search failed: {e}")
+                yield f"event: search_failed\ndata: {json.dumps({'type': 'search_failed', 'error': str(e)})}\n\n"
+        
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
     @app.get("/api/search/modes")
     async def get_search_modes():
         """Get available search modes and their configurations"""
@@ -535,6 +664,16 @@ def add_advanced_search_endpoints(app: FastAPI):
                 "zenrows": {"available": bool(config.zenrows_api_key), "cost": "$0.01/search"}
             }
         }
+    
+    @app.get("/api/search/pool")
+    async def get_search_pool_stats():
+        """Get provider HTTP pool utilization and latency for sizing connection limits"""
+        return {**provider_http.stats(), "latency": search_latency.stats()}
+    
+    @app.get("/api/search/cache")
+    async def get_search_cache_stats():
+        """Get search result cache hit rates and tier sizes"""
+        return search_cache.stats()
 
 # Usage: Import and call add_advanced_search_endpoints(app) in your main API file
 
@@ -40,9 +40,14 @@ from services.file_service import (
     FileUploadResponse,
     FileProcessingStatus,
     FileSearchRequest,
-    FileSearchResult
+    FileSearchResult,
+    UploadResumeStatus
 )
 from services.file_processor import file_processor
+from services.embedding_cache import embedding_cache
+from services.extraction_pool import extraction_pool
+from services.embedding_service import embedding_service
+from services.job_queue import job_queue
 from services.websocket_service import websocket_service, heartbeat_task
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -123,6 +128,10 @@ async def lifespan(app: FastAPI):
         asyncio.create_task(update_metrics())
         asyncio.create_task(heartbeat_task())
         
+        # Process queued uploads here unless dedicated workers handle them
+        if os.getenv("INGEST_WORKER_INLINE", "true").lower() == "true":
+            enhanced_file_service.start_worker()
+        
         logger.info("Orchestra AI Admin API Phase 2 started successfully")
         yield
         
@@ -131,6 +140,10 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         # Cleanup
+        await enhanced_file_service.stop_worker()
+        await file_processor.pipeline.stop()
+        await vector_store.close()
+        extraction_pool.shutdown()
         await close_database()
         logger.info("Orchestra AI Admin API shutting down")
 
@@ -430,10 +443,27 @@ async def upload_file_chunk(
         chunk_data = await chunk.read()
         result = await enhanced_file_service.upload_chunk(file_id, chunk_data, chunk_offset, db)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Chunk upload failed", file_id=file_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/files/{file_id}/upload", response_model=UploadResumeStatus)
+async def get_upload_status(
+    file_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """Report missing byte ranges so an interrupted upload can resume"""
+    try:
+        return await enhanced_file_service.get_upload_status(file_id, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get upload status", file_id=file_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/files/{file_id}/status", response_model=FileProcessingStatus)
 async def get_file_status(
     file_id: str,
@@ -835,8 +865,8 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                     # File upload progress updates are handled by the file service
                     pass
                 elif message.get("type") == "search_query":
-                    # Real-time search results could be sent here
-                    pass
+                    # Search events stream back as each provider answers
+                    websocket_service.start_search(message, user_id)
                 
             except WebSocketDisconnect:
                 break
@@ -869,6 +899,13 @@ async def health_check():
             "database": "healthy" if db_healthy else "unhealthy",
             "vector_store": "healthy" if vector_healthy else "unhealthy", 
             "file_service": "healthy" if file_service_healthy else "unhealthy",
+            "vector_store_stats": await vector_store.get_stats(),
+            "embedding_cache": embedding_cache.stats(),
+            "extraction_pool": extraction_pool.stats(),
+            "embedding_service": embedding_service.stats(),
+            "ingest_pipeline": file_processor.pipeline.stats(),
+            "ingest_queue": await job_queue.stats(),
+            "ingest_worker": enhanced_file_service.worker.stats() if enhanced_file_service.worker else None,
             "timestamp": datetime.utcnow().isoformat(),
             "version": "2.0.0"
         }
@@ -6,8 +6,8 @@ SQLAlchemy models, database connections, and data access layers.
 """
 
 from .connection import DatabaseManager, get_db
-from .models import User, Persona, FileRecord, SearchQuery, ProcessingJob
-from .vector_store import VectorStore
+from .models import User, Persona, FileRecord, ContentBlob, SearchQuery, ProcessingJob
+from .vector_store import VectorStore, WriteResult
 
 __all__ = [
     'DatabaseManager',
@@ -15,7 +15,9 @@ __all__ = [
     'User',
     'Persona', 
     'FileRecord',
+    'ContentBlob',
     'SearchQuery',
     'ProcessingJob',
-    'VectorStore'
+    'VectorStore',
+    'WriteResult'
 ] 
\ No newline at end of file
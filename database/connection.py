@@ -102,8 +102,11 @@ class DatabaseManager:
         try:
             # Import here to avoid circular imports
             from . import models
+            from .migrations import upgrade_schema
             async with self.engine.begin() as conn:
                 await conn.run_sync(models.Base.metadata.create_all)
+                # create_all leaves existing tables alone; add newer columns/indexes
+                await conn.run_sync(upgrade_schema)
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error("Failed to create database tables", error=str(e))
@@ -0,0 +1,866 @@
+"""
+Persistent FAISS Collections
+
+Disk-backed storage for FAISSStore collections. Each collection lives in its
+own directory under FAISS_STORAGE_PATH:
+
+    entries.sqlite      vectors, ids and metadata, plus an append log of writes
+    index-<gen>.faiss   immutable snapshot index, reopened memory-mapped
+    checkpoint.lock     held by the single process building a new snapshot
+
+New vectors are written to the append log and kept in a small in-memory delta
+index. Every worker process tails the log to pick up writes made by the
+others, and a checkpoint folds the delta into the next snapshot generation so
+restarts only need to map the snapshot and replay a short log.
+
+Snapshots are built with the collection's configured index type (flat, HNSW,
+IVF-Flat or IVF-PQ). ANN types are trained in the background once the
+collection holds enough vectors; until then the snapshot stays flat.
+
+Scalar fields declared in the metadata schema are kept in an inverted index
+(value -> labels) so filtered searches select candidates before the vector
+search instead of discarding hits afterwards.
+
+Deletes are logged like adds. Vectors still in the delta are removed outright;
+vectors already in the snapshot are marked in a tombstone bitmap that search
+excludes through an ID selector. Once tombstones pass FAISS_COMPACTION_THRESHOLD
+of the snapshot, the next checkpoint rebuilds it without the deleted rows.
+"""
+
+import os
+import json
+import fcntl
+import sqlite3
+import time
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import structlog
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    faiss = None
+    FAISS_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collection_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    label INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    metadata TEXT NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_doc_id ON entries(doc_id);
+CREATE TABLE IF NOT EXISTS entry_fields (
+    label INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS append_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    label INTEGER NOT NULL
+);
+"""
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+INDEXED_FIELD_TYPES = ("string", "number", "boolean")
+
+# Reads of the current generation before a missing snapshot is an error
+SNAPSHOT_OPEN_ATTEMPTS = 3
+
+def resolve_index_config(metadata_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the per-collection "_index" schema entry over environment defaults"""
+    config = {
+        "type": os.getenv("FAISS_INDEX_TYPE", "flat").lower(),
+        "min_vectors": int(os.getenv("FAISS_ANN_MIN_VECTORS", "20000")),
+        "hnsw_m": int(os.getenv("FAISS_HNSW_M", "32")),
+        "ef_construction": int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200")),
+        "ef_search": int(os.getenv("FAISS_HNSW_EF_SEARCH", "64")),
+        "nlist": os.getenv("FAISS_IVF_NLIST", "auto"),
+        "nprobe": int(os.getenv("FAISS_IVF_NPROBE", "16")),
+        "pq_m": int(os.getenv("FAISS_PQ_M", "0")),
+        "pq_nbits": int(os.getenv("FAISS_PQ_NBITS", "8")),
+    }
+    config.update(metadata_schema.get("_index", {}))
+
+    if config["type"] not in INDEX_TYPES:
+        logger.warning("Unknown FAISS index type, using flat", index_type=config["type"])
+        config["type"] = "flat"
+    return config
+
+class FAISSCollection:
+    """A single collection: mmapped snapshot + in-memory delta + append log"""
+
+    def __init__(self, name: str, directory: str, mmap: bool = True,
+                 checkpoint_threshold: int = 50000, brute_force_threshold: int = 4096,
+                 compaction_threshold: float = 0.2):
+        self.name = name
+        self.directory = directory
+        self.mmap = mmap
+        self.checkpoint_threshold = checkpoint_threshold
+        self.brute_force_threshold = brute_force_threshold
+        self.compaction_threshold = compaction_threshold
+
+        self.dimension: Optional[int] = None
+        self.metadata_schema: Dict[str, Any] = {}
+        self.index_config: Dict[str, Any] = resolve_index_config({})
+        self.snapshot_type = "flat"
+        self.generation = 0
+        self.last_seq = 0
+        self.snapshot_max_label = 0
+
+        self.base_index = None
+        self.delta_index = None
+
+        # Bit per snapshot label (little-endian within each byte) for
+        # vectors deleted since the snapshot was built
+        self.tombstones = np.zeros(0, dtype=np.uint8)
+        self.tombstone_count = 0
+
+        # field -> JSON-encoded value -> labels carrying that value
+        self.field_index: Dict[str, Dict[str, array]] = {}
+        self.last_field_rowid = 0
+
+        self._lock = threading.RLock()
+        self._checkpointing = False
+
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, "entries.sqlite")
+        self.conn = self._connect()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """Check whether a collection has been persisted in directory"""
+        return os.path.exists(os.path.join(directory, "entries.sqlite"))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.executescript(SCHEMA)
+        return conn
+
+    # === Collection info ===
+
+    def _get_info(self, key: str, conn: Optional[sqlite3.Connection] = None) -> Optional[Any]:
+        row = (conn or self.conn).execute(
+            "SELECT value FROM collection_info WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_info(self, key: str, value: Any, conn: Optional[sqlite3.Connection] = None):
+        (conn or self.conn).execute(
+            "INSERT OR REPLACE INTO collection_info (key, value) VALUES (?, ?)",
+            (key, json.dumps(value))
+        )
+
+    # === Lifecycle ===
+
+    def create(self, dimension: int, metadata_schema: Dict[str, Any]):
+        """Create the collection on disk, or reopen it if it already exists"""
+        with self.conn:
+            stored_dimension = self._get_info("dimension")
+            if stored_dimension is None:
+                self._set_info("dimension", dimension)
+                self._set_info("metadata_schema", metadata_schema)
+                self._set_info("generation", 0)
+                self._set_info("snapshot_seq", 0)
+            elif stored_dimension != dimension:
+                raise ValueError(
+                    f"Collection {self.name} exists with dimension {stored_dimension}, not {dimension}"
+                )
+            else:
+                self._set_info("metadata_schema", metadata_schema)
+
+            self.metadata_schema = metadata_schema
+            if self._get_info("indexed_fields") != self.indexed_fields:
+                self._rebuild_field_index()
+
+        self.load()
+
+    def _rebuild_field_index(self):
+        """Re-derive entry_fields from stored metadata after a schema change"""
+        self.conn.execute("DELETE FROM entry_fields")
+        fields = self.indexed_fields
+        cursor = self.conn.execute("SELECT label, metadata FROM entries ORDER BY label")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            self.conn.executemany(
+                "INSERT INTO entry_fields (label, field, value) VALUES (?, ?, ?)",
+                [
+                    (label, field, json.dumps(meta[field]))
+                    for label, meta in ((label, json.loads(raw)) for label, raw in rows)
+                    for field in fields
+                    if field in meta
+                ]
+            )
+        self._set_info("indexed_fields", fields)
+
+    def load(self):
+        """Open the current snapshot and replay the append log into the delta"""
+        with self._lock:
+            self.dimension = self._get_info("dimension")
+            self.metadata_schema = self._get_info("metadata_schema") or {}
+            self.index_config = resolve_index_config(self.metadata_schema)
+
+            for attempt in range(SNAPSHOT_OPEN_ATTEMPTS):
+                self.snapshot_type = self._get_info("snapshot_type") or "flat"
+                self.generation = self._get_info("generation") or 0
+                self.last_seq = self._get_info("snapshot_seq") or 0
+                self.snapshot_max_label = self._get_info("snapshot_max_label") or 0
+                try:
+                    self.base_index = self._open_snapshot(self.generation)
+                    break
+                except FileNotFoundError:
+                    # A checkpoint elsewhere may have moved on since the generation was read
+                    if attempt + 1 == SNAPSHOT_OPEN_ATTEMPTS or (self._get_info("generation") or 0) == self.generation:
+                        raise
+            self.delta_index = self._new_flat_index()
+            self.tombstones = np.zeros(0, dtype=np.uint8)
+            self.tombstone_count = 0
+            self._replay_log()
+
+            self.field_index = {}
+            self.last_field_rowid = 0
+            self._replay_fields()
+
+        logger.info(
+            "Loaded FAISS collection",
+            collection=self.name,
+            generation=self.generation,
+            base_vectors=self.base_index.ntotal,
+            delta_vectors=self.delta_index.ntotal,
+            tombstones=self.tombstone_count
+        )
+
+    @property
+    def indexed_fields(self) -> List[str]:
+        return [
+            field for field, field_type in self.metadata_schema.items()
+            if not field.startswith("_") and field_type in INDEXED_FIELD_TYPES
+        ]
+
+    def _snapshot_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"index-{generation}.faiss")
+
+    def _new_flat_index(self):
+        # Inner product over normalised vectors gives cosine similarity
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+
+    def _open_snapshot(self, generation: int):
+        """Open a snapshot index memory-mapped and read-only where supported"""
+        if generation == 0:
+            return self._new_flat_index()
+
+        # An empty index in place of a missing snapshot would silently drop results
+        path = self._snapshot_path(generation)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"FAISS snapshot {path} of collection {self.name} is missing")
+
+        if self.mmap:
+            flags = getattr(faiss, "IO_FLAG_MMAP", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+            try:
+                return faiss.read_index(path, flags)
+            except RuntimeError as e:
+                # Not every index type can be mapped; fall back to a private copy
+                logger.warning("FAISS snapshot cannot be memory-mapped", collection=self.name, error=str(e))
+
+        return faiss.read_index(path)
+
+    # === Append log ===
+
+    def sync(self):
+        """Pick up snapshots and writes made by other worker processes"""
+        with self._lock:
+            generation = self._get_info("generation") or 0
+            if generation != self.generation:
+                self.load()
+                return
+            self._replay_log()
+            self._replay_fields()
+
+    def _replay_log(self):
+        rows = self.conn.execute(
+            """
+            SELECT l.seq, l.op, l.label, e.vector
+            FROM append_log l LEFT JOIN entries e ON e.label = l.label
+            WHERE l.seq > ? ORDER BY l.seq
+            """,
+            (self.last_seq,)
+        ).fetchall()
+
+        if not rows:
+            return
+
+        labels, vectors = [], []
+        for seq, op, label, blob in rows:
+            if op == "add" and blob is not None:
+                labels.append(label)
+                vectors.append(np.frombuffer(blob, dtype=np.float32))
+            elif op == "delete":
+                # Flush pending adds first so a delete never precedes its add
+                self._apply_adds(labels, vectors)
+                labels, vectors = [], []
+                self._apply_deletes([label])
+            self.last_seq = seq
+
+        self._apply_adds(labels, vectors)
+
+    def _apply_adds(self, labels: List[int], vectors: List[np.ndarray]):
+        if labels:
+            self.delta_index.add_with_ids(
+                np.vstack(vectors).astype(np.float32),
+                np.array(labels, dtype=np.int64)
+            )
+
+    def _apply_deletes(self, labels: List[int]):
+        """Remove delta vectors outright and tombstone snapshot vectors"""
+        in_delta = [label for label in labels if label > self.snapshot_max_label]
+        if in_delta:
+            self.delta_index.remove_ids(np.array(in_delta, dtype=np.int64))
+
+        in_snapshot = [label for label in labels if label <= self.snapshot_max_label]
+        if not in_snapshot:
+            return
+        needed = (max(in_snapshot) >> 3) + 1
+        if len(self.tombstones) < needed:
+            grown = np.zeros(max(needed, (self.snapshot_max_label >> 3) + 1), dtype=np.uint8)
+            grown[:len(self.tombstones)] = self.tombstones
+            self.tombstones = grown
+        for label in in_snapshot:
+            bit = np.uint8(1 << (label & 7))
+            if not self.tombstones[label >> 3] & bit:
+                self.tombstones[label >> 3] |= bit
+                self.tombstone_count += 1
+
+    def is_tombstoned(self, labels: np.ndarray) -> np.ndarray:
+        """Boolean mask of labels deleted from the snapshot"""
+        labels = np.asarray(labels, dtype=np.int64)
+        mask = np.zeros(len(labels), dtype=bool)
+        if self.tombstone_count == 0:
+            return mask
+        inside = (labels >= 0) & ((labels >> 3) < len(self.tombstones))
+        byte_index = labels[inside] >> 3
+        mask[inside] = (self.tombstones[byte_index] >> (labels[inside] & 7).astype(np.uint8)) & 1 == 1
+        return mask
+
+    def _replay_fields(self):
+        rows = self.conn.execute(
+            "SELECT rowid, field, value, label FROM entry_fields WHERE rowid > ? ORDER BY rowid",
+            (self.last_field_rowid,)
+        ).fetchall()
+
+        for rowid, field, value, label in rows:
+            self.field_index.setdefault(field, {}).setdefault(value, array("q")).append(label)
+            self.last_field_rowid = rowid
+
+    # === Writes ===
+
+    def add(self, vectors: np.ndarray, ids: List[str], metadata: List[Dict[str, Any]]) -> List[int]:
+        """Append normalised vectors to the log and the delta index"""
+        with self._lock:
+            self.sync()
+
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                head_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM append_log").fetchone()[0]
+
+                # Re-adding a document ID replaces the previous vector
+                replaced = self._delete_rows(ids)
+
+                labels = []
+                for vector, doc_id, meta in zip(vectors, ids, metadata):
+                    cursor = self.conn.execute(
+                        "INSERT INTO entries (doc_id, vector, metadata) VALUES (?, ?, ?)",
+                        (doc_id, vector.astype(np.float32).tobytes(), json.dumps(meta, default=str))
+                    )
+                    labels.append(cursor.lastrowid)
+
+                self.conn.executemany(
+                    "INSERT INTO entry_fields (label, field, value) VALUES (?, ?, ?)",
+                    [
+                        (label, field, json.dumps(meta[field]))
+                        for label, meta in zip(labels, metadata)
+                        for field in self.indexed_fields
+                        if field in meta
+                    ]
+                )
+                self.conn.executemany(
+                    "INSERT INTO append_log (op, label) VALUES ('add', ?)",
+                    [(label,) for label in labels]
+                )
+                end_seq = self.conn.execute("SELECT MAX(seq) FROM append_log").fetchone()[0]
+
+            if head_seq == self.last_seq:
+                # Nobody else wrote in between, apply our own batch directly
+                self._apply_deletes(replaced)
+                self.delta_index.add_with_ids(vectors, np.array(labels, dtype=np.int64))
+                self.last_seq = end_seq
+            else:
+                self._replay_log()
+            self._replay_fields()
+
+            return labels
+
+    def delete(self, ids: List[str]) -> int:
+        """Delete entries by document ID, returning how many were removed"""
+        with self._lock:
+            self.sync()
+
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                head_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM append_log").fetchone()[0]
+                labels = self._delete_rows(ids)
+                end_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM append_log").fetchone()[0]
+
+            if head_seq == self.last_seq:
+                self._apply_deletes(labels)
+                self.last_seq = end_seq
+            else:
+                self._replay_log()
+
+            return len(labels)
+
+    def _delete_rows(self, ids: List[str]) -> List[int]:
+        """Flag live entries for ids as deleted and log the deletes (inside a transaction)"""
+        labels = []
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            placeholders = ",".join("?" for _ in batch)
+            labels.extend(label for (label,) in self.conn.execute(
+                f"SELECT label FROM entries WHERE deleted = 0 AND doc_id IN ({placeholders})", batch
+            ))
+        if not labels:
+            return labels
+
+        self.conn.executemany("UPDATE entries SET deleted = 1 WHERE label = ?", [(label,) for label in labels])
+        self.conn.executemany(
+            "INSERT INTO append_log (op, label) VALUES ('delete', ?)",
+            [(label,) for label in labels]
+        )
+        return labels
+
+    # === Reads ===
+
+    @property
+    def ntotal(self) -> int:
+        return self.base_index.ntotal + self.delta_index.ntotal
+
+    def _search_parameters(self, search_params: Optional[Dict[str, Any]], selector=None):
+        """Per-query nprobe / efSearch and candidate selector for the snapshot index"""
+        search_params = search_params or {}
+        if self.snapshot_type in ("ivf_flat", "ivf_pq"):
+            return faiss.SearchParametersIVF(
+                sel=selector,
+                nprobe=int(search_params.get("nprobe", self.index_config["nprobe"]))
+            )
+        if self.snapshot_type == "hnsw":
+            return faiss.SearchParametersHNSW(
+                sel=selector,
+                efSearch=int(search_params.get("ef_search", self.index_config["ef_search"]))
+            )
+        return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+    def split_filters(self, filters: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Split filters into (indexed, residual) parts"""
+        indexed, residual = {}, {}
+        for key, value in (filters or {}).items():
+            (indexed if key in self.indexed_fields else residual)[key] = value
+        return indexed, residual
+
+    def candidates(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Labels matching every indexed filter; list values mean "any of"."""
+        with self._lock:
+            self.sync()
+
+            result = None
+            postings_by_field = []
+            for field, value in filters.items():
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                postings = self.field_index.get(field, {})
+                matched = [postings[json.dumps(v)] for v in values if json.dumps(v) in postings]
+                postings_by_field.append(
+                    np.unique(np.concatenate([np.frombuffer(m, dtype=np.int64) for m in matched]))
+                    if matched else np.empty(0, dtype=np.int64)
+                )
+
+        # Intersect smallest posting lists first
+        for labels in sorted(postings_by_field, key=len):
+            result = labels if result is None else np.intersect1d(result, labels, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
+
+    def search(self, queries: np.ndarray, top_k: int,
+               search_params: Optional[Dict[str, Any]] = None,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search snapshot and delta, merging into one (scores, labels) result
+
+        When candidates is given only those labels are considered. Small
+        candidate sets are scored exactly; larger ones use an ID selector
+        inside the FAISS search, falling back to an exact scan if the ANN
+        probe could not fill top_k.
+        """
+        if candidates is not None:
+            with self._lock:
+                self.sync()
+                candidates = candidates[~self.is_tombstoned(candidates)]
+            if len(candidates) <= self.brute_force_threshold:
+                return self.exact_search(queries, candidates, top_k)
+
+            scores, labels = self._index_search(queries, top_k, search_params, candidates)
+            expected = min(top_k, len(candidates))
+            if (labels != -1).sum(axis=1).min() < expected:
+                return self.exact_search(queries, candidates, top_k)
+            return scores, labels
+
+        return self._index_search(queries, top_k, search_params)
+
+    def _index_search(self, queries: np.ndarray, top_k: int,
+                      search_params: Optional[Dict[str, Any]] = None,
+                      candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Selectors must outlive the search call that references them
+        selector = faiss.IDSelectorBatch(candidates) if candidates is not None else None
+
+        with self._lock:
+            self.sync()
+
+            # Candidate sets are already tombstone-free; otherwise exclude
+            # deleted snapshot vectors with a bitmap selector
+            base_selector = selector
+            if selector is None and self.tombstone_count > 0:
+                tombstones = faiss.IDSelectorBitmap(self.tombstones)
+                base_selector = faiss.IDSelectorNot(tombstones)
+
+            parts = []
+            if self.base_index.ntotal > 0:
+                parts.append(self.base_index.search(
+                    queries, min(top_k, self.base_index.ntotal),
+                    params=self._search_parameters(search_params, base_selector)
+                ))
+            if self.delta_index.ntotal > 0:
+                parts.append(self.delta_index.search(
+                    queries, min(top_k, self.delta_index.ntotal),
+                    params=faiss.SearchParameters(sel=selector) if selector is not None else None
+                ))
+
+        return self._merge(parts, len(queries), top_k)
+
+    def exact_search(self, queries: np.ndarray, candidates: np.ndarray,
+                     top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force scoring of a candidate set straight from stored vectors"""
+        parts = []
+        for start in range(0, len(candidates), 10000):
+            batch = [int(label) for label in candidates[start:start + 10000]]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT label, vector FROM entries WHERE deleted = 0 AND label IN ({placeholders})", batch
+                ).fetchall()
+            if not rows:
+                continue
+
+            vectors = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            labels = np.array([label for label, _ in rows], dtype=np.int64)
+            scores = queries @ vectors.T
+            k = min(top_k, len(labels))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            parts.append((np.take_along_axis(scores, top, axis=1), labels[top]))
+
+        return self._merge(parts, len(queries), top_k)
+
+    @staticmethod
+    def _merge(parts: List[Tuple[np.ndarray, np.ndarray]], num_queries: int,
+               top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if not parts:
+            empty = np.full((num_queries, 0), -1)
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        scores = np.hstack([p[0] for p in parts])
+        labels = np.hstack([p[1] for p in parts])
+        scores = np.where(labels == -1, -np.inf, scores)
+        order = np.argsort(-scores, axis=1)[:, :top_k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+    def fetch(self, labels: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Load document IDs and metadata for internal labels"""
+        rows = []
+        for start in range(0, len(labels), 10000):
+            batch = [int(label) for label in labels[start:start + 10000]]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows.extend(self.conn.execute(
+                    f"SELECT label, doc_id, metadata, deleted FROM entries WHERE label IN ({placeholders})",
+                    batch
+                ).fetchall())
+        return {
+            label: {"id": doc_id, "metadata": json.loads(meta), "deleted": bool(deleted)}
+            for label, doc_id, meta, deleted in rows
+        }
+
+    def entries_matching(self, filters: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """Live entries matching indexed filters (all live entries when empty)"""
+        if filters:
+            entries = self.fetch(self.candidates(filters).tolist())
+        else:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT label, doc_id, metadata, deleted FROM entries WHERE deleted = 0"
+                ).fetchall()
+            entries = {
+                label: {"id": doc_id, "metadata": json.loads(meta), "deleted": bool(deleted)}
+                for label, doc_id, meta, deleted in rows
+            }
+        return {label: item for label, item in entries.items() if not item["deleted"]}
+
+    # === Checkpoints ===
+
+    def needs_checkpoint(self) -> bool:
+        if self._checkpointing:
+            return False
+        if self.delta_index.ntotal >= self.checkpoint_threshold:
+            return True
+        if self.needs_compaction():
+            return True
+        # Enough vectors to train the configured ANN index for the first time
+        return (
+            self.index_config["type"] != "flat"
+            and self.snapshot_type == "flat"
+            and self.ntotal >= self.index_config["min_vectors"]
+        )
+
+    def needs_compaction(self) -> bool:
+        """Whether enough snapshot vectors are tombstoned to rebuild it"""
+        return (
+            self.tombstone_count > 0
+            and self.tombstone_count / max(self.base_index.ntotal, 1) >= self.compaction_threshold
+        )
+
+    def _nlist(self, count: int) -> int:
+        nlist = self.index_config["nlist"]
+        if str(nlist) != "auto":
+            return int(nlist)
+        # ~4*sqrt(n) lists, keeping at least 39 training points per centroid
+        return int(max(1, min(4 * np.sqrt(count), count // 39, 65536)))
+
+    def _pq_m(self) -> int:
+        if self.index_config["pq_m"]:
+            return int(self.index_config["pq_m"])
+        for m in (self.dimension // 8, 64, 48, 32, 16, 8, 4, 2, 1):
+            if m and self.dimension % m == 0:
+                return m
+        return 1
+
+    def _build_index(self, index_type: str, count: int):
+        """Create an empty (untrained) ID-mapped index of the given type"""
+        if index_type == "hnsw":
+            factory = f"IDMap2,HNSW{self.index_config['hnsw_m']}"
+        elif index_type == "ivf_flat":
+            factory = f"IDMap2,IVF{self._nlist(count)},Flat"
+        elif index_type == "ivf_pq":
+            factory = f"IDMap2,IVF{self._nlist(count)},PQ{self._pq_m()}x{self.index_config['pq_nbits']}"
+        else:
+            return self._new_flat_index()
+
+        index = faiss.index_factory(self.dimension, factory, faiss.METRIC_INNER_PRODUCT)
+        if index_type == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efConstruction = int(self.index_config["ef_construction"])
+        return index
+
+    def _training_sample(self, conn: sqlite3.Connection, max_label: int, count: int, size: int) -> np.ndarray:
+        """Evenly strided sample of stored vectors for IVF/PQ training"""
+        step = max(1, count // size)
+        rows = conn.execute(
+            "SELECT vector FROM entries WHERE deleted = 0 AND label <= ? AND label % ? = 0 LIMIT ?",
+            (max_label, step, size)
+        ).fetchall()
+        return np.vstack([np.frombuffer(blob, dtype=np.float32) for (blob,) in rows])
+
+    def checkpoint(self) -> bool:
+        """Fold the delta into a new snapshot generation
+
+        Runs in a worker thread. Only one process builds a snapshot at a time;
+        the others see the new generation on their next sync. Deleted entries
+        are left out, so this is also how tombstones get compacted away.
+        """
+        lock_file = open(os.path.join(self.directory, "checkpoint.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        self._checkpointing = True
+        compacting = self.needs_compaction()
+        reclaimed = self.tombstone_count
+        conn = self._connect()
+        try:
+            generation = (self._get_info("generation", conn) or 0) + 1
+
+            # A single read transaction keeps entries and log seq consistent
+            conn.execute("BEGIN")
+            snapshot_seq, max_label = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0), COALESCE(MAX(label), 0) FROM append_log"
+            ).fetchone()
+            count = conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE deleted = 0 AND label <= ?", (max_label,)
+            ).fetchone()[0]
+
+            index_type = self.index_config["type"]
+            if count < self.index_config["min_vectors"]:
+                index_type = "flat"
+            index = self._build_index(index_type, count)
+
+            if not index.is_trained:
+                nlist = faiss.extract_index_ivf(index).nlist
+                started = time.time()
+                index.train(self._training_sample(conn, max_label, count, min(count, nlist * 256)))
+                logger.info("Trained FAISS index", collection=self.name, index_type=index_type,
+                            nlist=nlist, seconds=round(time.time() - started, 2))
+
+            cursor = conn.execute(
+                "SELECT label, vector FROM entries WHERE deleted = 0 AND label <= ? ORDER BY label",
+                (max_label,)
+            )
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                index.add_with_ids(
+                    np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]),
+                    np.array([label for label, _ in rows], dtype=np.int64)
+                )
+            conn.execute("COMMIT")
+
+            path = self._snapshot_path(generation)
+            faiss.write_index(index, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+            with conn:
+                self._set_info("generation", generation, conn)
+                self._set_info("snapshot_seq", snapshot_seq, conn)
+                self._set_info("snapshot_type", index_type, conn)
+                self._set_info("snapshot_max_label", max_label, conn)
+                if compacting:
+                    self._set_info("compactions", (self._get_info("compactions", conn) or 0) + 1, conn)
+                    self._set_info("last_compaction_at", time.time(), conn)
+                    self._set_info("last_compaction_reclaimed", reclaimed, conn)
+
+            # Processes still mapping older generations keep their open handles. The
+            # previous generation stays until the next checkpoint, for processes that
+            # have read its number but not opened the file yet
+            keep = {os.path.basename(self._snapshot_path(g)) for g in (generation - 1, generation)}
+            for filename in os.listdir(self.directory):
+                if filename.startswith("index-") and filename not in keep:
+                    os.remove(os.path.join(self.directory, filename))
+
+            logger.info("FAISS checkpoint written", collection=self.name, generation=generation,
+                        index_type=index_type, vectors=index.ntotal,
+                        reclaimed=reclaimed if compacting else 0)
+            self.load()
+            return True
+
+        finally:
+            conn.close()
+            self._checkpointing = False
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    # === Stats ===
+
+    def stats(self) -> Dict[str, Any]:
+        """Vector, tombstone and compaction counters for health reporting"""
+        with self._lock:
+            self.sync()
+            return {
+                "vectors": self.ntotal - self.tombstone_count,
+                "base_vectors": self.base_index.ntotal,
+                "delta_vectors": self.delta_index.ntotal,
+                "tombstones": self.tombstone_count,
+                "tombstone_ratio": round(self.tombstone_count / max(self.base_index.ntotal, 1), 4),
+                "generation": self.generation,
+                "index_type": self.snapshot_type,
+                "compactions": self._get_info("compactions") or 0,
+                "last_compaction_at": self._get_info("last_compaction_at"),
+                "last_compaction_reclaimed": self._get_info("last_compaction_reclaimed") or 0,
+                "checkpointing": self._checkpointing,
+            }
+
+    # === Benchmarks ===
+
+    def default_benchmark_settings(self) -> List[Dict[str, Any]]:
+        if self.snapshot_type in ("ivf_flat", "ivf_pq"):
+            return [{"nprobe": n} for n in (1, 4, 16, 64, 256)]
+        if self.snapshot_type == "hnsw":
+            return [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)]
+        return [{}]
+
+    def benchmark(self, settings: Optional[List[Dict[str, Any]]] = None,
+                  num_queries: int = 100, top_k: int = 10) -> Dict[str, Any]:
+        """Measure recall@k and per-query latency against exact search
+
+        Queries are sampled from the stored vectors; the ground truth comes
+        from a brute-force scan over everything in the collection.
+        """
+        settings = settings or self.default_benchmark_settings()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT vector FROM entries WHERE deleted = 0 ORDER BY RANDOM() LIMIT ?", (num_queries,)
+            ).fetchall()
+            if not rows:
+                return {"collection": self.name, "index_type": self.snapshot_type, "results": []}
+            queries = np.vstack([np.frombuffer(blob, dtype=np.float32) for (blob,) in rows])
+
+            exact = self._new_flat_index()
+            cursor = conn.execute("SELECT label, vector FROM entries WHERE deleted = 0")
+            while True:
+                batch = cursor.fetchmany(10000)
+                if not batch:
+                    break
+                exact.add_with_ids(
+                    np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in batch]),
+                    np.array([label for label, _ in batch], dtype=np.int64)
+                )
+            _, truth = exact.search(queries, top_k)
+        finally:
+            conn.close()
+
+        results = []
+        for params in settings:
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                _, found = self.search(query.reshape(1, -1), top_k, params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(found[0].tolist()) & set(expected.tolist()) - {-1})
+
+            expected_total = sum(len(set(row.tolist()) - {-1}) for row in truth)
+            results.append({
+                "params": params,
+                "recall_at_k": round(hits / expected_total, 4) if expected_total else 0.0,
+                "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+                "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+            })
+
+        return {
+            "collection": self.name,
+            "index_type": self.snapshot_type,
+            "vectors": self.ntotal,
+            "top_k": top_k,
+            "queries": len(queries),
+            "results": results
+        }
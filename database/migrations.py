@@ -0,0 +1,93 @@
+"""
+Schema Upgrades
+
+Base.metadata.create_all creates missing tables but never changes tables
+that already exist, so columns and indexes added to a model would be missing
+on every existing deployment. They are listed here and applied at startup,
+right after create_all:
+
+    ADDED_COLUMNS   (table, column) pairs added after the table first shipped
+    ADDED_INDEXES   (table, column) pairs that gained an index=True
+
+Each step checks the live schema first and is safe to run repeatedly; on
+PostgreSQL the DDL also carries IF NOT EXISTS, so workers starting together
+do not trip over each other. Afterwards every model column is checked against
+the database, and startup fails with the missing columns listed instead of
+each query failing later.
+"""
+
+from typing import List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn
+import structlog
+
+from .models import Base
+
+logger = structlog.get_logger(__name__)
+
+ADDED_COLUMNS: List[Tuple[str, str]] = [
+    ("file_records", "vector_source_id"),      # content-addressed storage
+    ("processing_jobs", "run_after"),          # durable job queue
+    ("processing_jobs", "worker_id"),
+    ("processing_jobs", "lease_expires_at"),
+    ("vector_chunks", "content_hash"),         # incremental re-indexing
+]
+
+ADDED_INDEXES: List[Tuple[str, str]] = [
+    ("file_records", "checksum"),
+    ("processing_jobs", "status"),
+    ("processing_jobs", "run_after"),
+]
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is missing columns the models expect"""
+
+def upgrade_schema(connection: Connection) -> List[str]:
+    """Add missing columns and indexes to existing tables; returns what was applied"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    postgres = connection.dialect.name == "postgresql"
+    applied = []
+
+    for table_name, column_name in ADDED_COLUMNS:
+        if table_name not in tables:
+            continue
+        if column_name in {column["name"] for column in inspector.get_columns(table_name)}:
+            continue
+        column = Base.metadata.tables[table_name].c[column_name]
+        definition = CreateColumn(column).compile(dialect=connection.dialect)
+        if_not_exists = "IF NOT EXISTS " if postgres else ""
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {if_not_exists}{definition}"))
+        applied.append(f"{table_name}.{column_name}")
+
+    for table_name, column_name in ADDED_INDEXES:
+        if table_name not in tables:
+            continue
+        index_name = f"ix_{table_name}_{column_name}"
+        if index_name in {index["name"] for index in inspector.get_indexes(table_name)}:
+            continue
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({column_name})"))
+        applied.append(index_name)
+
+    if applied:
+        logger.info("Database schema upgraded", applied=applied)
+
+    missing = missing_columns(connection)
+    if missing:
+        raise SchemaOutOfDate(
+            "Database schema is out of date, missing columns: " + ", ".join(missing)
+        )
+    return applied
+
+def missing_columns(connection: Connection) -> List[str]:
+    """Model columns absent from their (existing) tables"""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    return missing
@@ -168,7 +168,7 @@ class FileRecord(Base):
     mime_type = Column(String(100))
     file_type = Column(String(50))
     storage_path = Column(String(500), nullable=False)
-    checksum = Column(String(64))
+    checksum = Column(String(64), index=True)  # ContentBlob holding the bytes
     
     # Processing Status
     status = Column(Enum(FileStatus), default=FileStatus.PENDING)
@@ -184,6 +184,7 @@ class FileRecord(Base):
     embedding_model = Column(String(100))
     embedding_dimensions = Column(Integer)
     chunk_count = Column(Integer, default=0)
+    vector_source_id = Column(GUID())  # key of the vectors this record uses; NULL means its own id
     
     # Timestamps
     upload_started = Column(DateTime(timezone=True))
@@ -198,6 +199,29 @@ class FileRecord(Base):
     persona = relationship("Persona", back_populates="files")
     processing_jobs = relationship("ProcessingJob", back_populates="file_record")
 
+class ContentBlob(Base):
+    """Deduplicated file content, shared by every FileRecord with the same checksum"""
+    __tablename__ = "content_blobs"
+    
+    checksum = Column(String(64), primary_key=True)
+    storage_path = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    
+    # Processing results reused by duplicate uploads
+    file_type = Column(String(50))
+    mime_type = Column(String(100))
+    extracted_text = Column(Text)
+    extracted_metadata = Column(JSON, default=dict)
+    persona_type = Column(Enum(PersonaType))
+    embedding_model = Column(String(100))
+    embedding_dimensions = Column(Integer)
+    chunk_count = Column(Integer, default=0)
+    vector_source_id = Column(GUID())  # file whose id tags the shared vectors
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
 class ProcessingJob(Base):
     """Background processing job tracking"""
     __tablename__ = "processing_jobs"
@@ -205,7 +229,7 @@ class ProcessingJob(Base):
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     file_record_id = Column(GUID(), ForeignKey("file_records.id"))
     job_type = Column(String(50), nullable=False)  # embedding, extraction, analysis
-    status = Column(String(20), default="pending")
+    status = Column(String(20), default="pending", index=True)
     progress = Column(Float, default=0.0)
     
     # Job Configuration
@@ -218,6 +242,11 @@ class ProcessingJob(Base):
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
     
+    # Queue State
+    run_after = Column(DateTime(timezone=True), index=True)  # earliest next attempt (retry backoff)
+    worker_id = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))  # running jobs past this are reclaimed
+    
     # Timestamps
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
@@ -277,6 +306,7 @@ class VectorChunk(Base):
     embedding_dimensions = Column(Integer, nullable=False)
     # Note: Actual embedding vectors stored in vector database (Weaviate/Pinecone)
     vector_id = Column(String(255))  # Reference to vector DB
+    content_hash = Column(String(64))  # SHA-256 of the chunk text and location, for re-index diffs
     
     # Metadata
     chunk_metadata = Column(JSON, default=dict)
@@ -46,8 +46,11 @@ class SQLiteDatabaseManager:
         try:
             # Import here to avoid circular imports
             from . import models
+            from .migrations import upgrade_schema
             async with self.engine.begin() as conn:
                 await conn.run_sync(models.Base.metadata.create_all)
+                # create_all leaves existing tables alone; add newer columns/indexes
+                await conn.run_sync(upgrade_schema)
             logger.info("SQLite database tables created successfully")
         except Exception as e:
             logger.error("Failed to create SQLite database tables", error=str(e))
@@ -8,13 +8,35 @@ Supports both Weaviate and FAISS for flexible deployment options.
 import os
 import json
 import uuid
+import asyncio
+import threading
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 import structlog
 
+from .faiss_collection import FAISSCollection, FAISS_AVAILABLE, faiss
+
 logger = structlog.get_logger(__name__)
 
+@dataclass
+class WriteResult:
+    """Outcome of a bulk write or delete
+
+    Truthy when nothing failed, so callers that only need a success flag can
+    keep using it as a boolean. errors holds one entry per failed batch.
+    """
+    succeeded: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    
+    def __bool__(self) -> bool:
+        return self.failed == 0 and not self.errors
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"succeeded": self.succeeded, "failed": self.failed, "errors": self.errors}
+
 class VectorStore(ABC):
     """Abstract base class for vector store implementations"""
     
@@ -30,33 +52,71 @@ class VectorStore(ABC):
     
     @abstractmethod
     async def add_vectors(self, collection_name: str, vectors: List[List[float]], 
-                         metadata: List[Dict[str, Any]], ids: List[str]) -> bool:
+                         metadata: List[Dict[str, Any]], ids: List[str]) -> WriteResult:
         """Add vectors to a collection"""
         pass
     
     @abstractmethod
     async def search_vectors(self, collection_name: str, query_vector: List[float], 
-                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search for similar vectors"""
+                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                           search_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors
+
+        search_params carries backend-specific tuning such as nprobe or
+        ef_search; backends ignore keys they do not support.
+        """
         pass
     
+    async def search_vectors_batch(self, collection_name: str, query_vectors: List[List[float]],
+                                   top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                                   search_params: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search several query vectors at once, returning one result list per query
+
+        Backends override this with a single batched round-trip; the default
+        just runs the queries concurrently.
+        """
+        return list(await asyncio.gather(*[
+            self.search_vectors(collection_name, query_vector, top_k, filters, search_params)
+            for query_vector in query_vectors
+        ]))
+    
     @abstractmethod
-    async def delete_vectors(self, collection_name: str, ids: List[str]) -> bool:
+    async def delete_vectors(self, collection_name: str, ids: List[str]) -> WriteResult:
         """Delete vectors by ID"""
         pass
     
+    @abstractmethod
+    async def delete_by_filter(self, collection_name: str, filters: Dict[str, Any]) -> WriteResult:
+        """Delete every vector whose metadata matches the equality filters"""
+        pass
+    
     @abstractmethod
     async def health_check(self) -> bool:
         """Check vector store health"""
         pass
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Backend-specific index statistics for health reporting"""
+        return {}
+    
+    async def close(self):
+        """Finish background work before shutdown"""
+        pass
 
 class WeaviateStore(VectorStore):
     """Weaviate vector store implementation"""
     
+    # Objects a single batch delete may remove (Weaviate QUERY_MAXIMUM_RESULTS)
+    DELETE_LIMIT = 10000
+    
     def __init__(self):
         self.client = None
         self.url = os.getenv("WEAVIATE_URL", "http://localhost:8080")
         self.api_key = os.getenv("WEAVIATE_API_KEY")
+        self.batch_size = int(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+        self.batch_workers = int(os.getenv("WEAVIATE_BATCH_WORKERS", "4"))
+        # The client's batch object is shared, so one bulk write at a time
+        self._batch_lock = threading.Lock()
         
     async def initialize(self) -> bool:
         """Initialize Weaviate client"""
@@ -131,13 +191,56 @@ class WeaviateStore(VectorStore):
             return False
     
     async def add_vectors(self, collection_name: str, vectors: List[List[float]], 
-                         metadata: List[Dict[str, Any]], ids: List[str]) -> bool:
-        """Add vectors to Weaviate"""
+                         metadata: List[Dict[str, Any]], ids: List[str]) -> WriteResult:
+        """Add vectors to Weaviate
+
+        The blocking client runs in a worker thread with dynamic batch sizing
+        and concurrent batch workers; failures are reported per batch.
+        """
         try:
+            result = await asyncio.to_thread(self._add_batch, collection_name, vectors, metadata, ids)
+            
+            if result:
+                logger.info(f"Added {len(vectors)} vectors to {collection_name}")
+            else:
+                logger.error(f"Failed to add {result.failed} of {len(vectors)} vectors to {collection_name}",
+                             failed_batches=len(result.errors))
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to add vectors to {collection_name}", error=str(e))
+            return WriteResult(failed=len(ids), errors=[{"batch": None, "size": len(ids), "errors": [str(e)]}])
+    
+    def _add_batch(self, collection_name: str, vectors: List[List[float]],
+                   metadata: List[Dict[str, Any]], ids: List[str]) -> WriteResult:
+        result = WriteResult()
+        
+        def on_batch(objects):
+            # Called by the client once per flushed batch
+            objects = objects or []
+            messages = [
+                error.get("message", str(error))
+                for obj in objects
+                for error in (((obj.get("result") or {}).get("errors") or {}).get("error") or [])
+            ]
+            failed = sum(1 for obj in objects if (obj.get("result") or {}).get("errors"))
+            result.succeeded += len(objects) - failed
+            result.failed += failed
+            if failed:
+                result.errors.append({"batch": len(result.errors), "size": len(objects),
+                                      "failed": failed, "errors": messages})
+        
+        with self._batch_lock:
+            self.client.batch.configure(
+                batch_size=self.batch_size,
+                dynamic=True,
+                num_workers=self.batch_workers,
+                timeout_retries=3,
+                connection_error_retries=3,
+                callback=on_batch
+            )
             with self.client.batch as batch:
-                batch.batch_size = 100
-                
-                for i, (vector, meta, doc_id) in enumerate(zip(vectors, metadata, ids)):
+                for vector, meta, doc_id in zip(vectors, metadata, ids):
                     data_object = meta.copy()
                     data_object["id"] = doc_id
                     
@@ -147,64 +250,149 @@ class WeaviateStore(VectorStore):
                         uuid=doc_id,
                         vector=vector
                     )
-            
-            logger.info(f"Added {len(vectors)} vectors to {collection_name}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to add vectors to {collection_name}", error=str(e))
-            return False
+        
+        return result
     
     async def search_vectors(self, collection_name: str, query_vector: List[float], 
-                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                           search_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Search Weaviate for similar vectors"""
         try:
-            query = self.client.query.get(collection_name, ["*"]).with_near_vector({
-                "vector": query_vector,
-                "certainty": 0.7
-            }).with_limit(top_k)
-            
-            # Apply filters if provided
-            if filters:
-                where_filter = {"operator": "And", "operands": []}
-                for key, value in filters.items():
-                    where_filter["operands"].append({
-                        "path": [key],
-                        "operator": "Equal",
-                        "valueText": str(value)
-                    })
-                query = query.with_where(where_filter)
-            
-            result = query.do()
+            query = self._near_vector_query(collection_name, query_vector, top_k, filters)
+            result = await asyncio.to_thread(query.do)
             
             # Extract results
-            results = []
             if "data" in result and "Get" in result["data"]:
-                for item in result["data"]["Get"][collection_name]:
-                    results.append({
-                        "id": item.get("id", ""),
-                        "score": item.get("_additional", {}).get("certainty", 0.0),
-                        "metadata": item
-                    })
-            
-            return results
+                return self._parse_results(result["data"]["Get"][collection_name])
+            return []
             
         except Exception as e:
             logger.error(f"Failed to search vectors in {collection_name}", error=str(e))
             return []
     
-    async def delete_vectors(self, collection_name: str, ids: List[str]) -> bool:
-        """Delete vectors from Weaviate"""
+    async def search_vectors_batch(self, collection_name: str, query_vectors: List[List[float]],
+                                   top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                                   search_params: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search several vectors in one GraphQL request using aliased Get queries
+
+        The blocking request runs in a worker thread, so a large batch does
+        not hold up the event loop.
+        """
+        if not query_vectors:
+            return []
         try:
-            for doc_id in ids:
-                self.client.data_object.delete(uuid=doc_id, class_name=collection_name)
+            queries = [
+                self._near_vector_query(collection_name, query_vector, top_k, filters).with_alias(f"q{i}")
+                for i, query_vector in enumerate(query_vectors)
+            ]
+            result = await asyncio.to_thread(self.client.query.multi_get(queries).do)
             
-            logger.info(f"Deleted {len(ids)} vectors from {collection_name}")
-            return True
+            if result.get("errors"):
+                logger.error(f"Batched search errors in {collection_name}", errors=result["errors"])
+            
+            get = result.get("data", {}).get("Get") or {}
+            return [self._parse_results(get.get(f"q{i}") or []) for i in range(len(query_vectors))]
             
+        except Exception as e:
+            logger.error(f"Failed to batch search vectors in {collection_name}", error=str(e))
+            return [[] for _ in query_vectors]
+    
+    def _near_vector_query(self, collection_name: str, query_vector: List[float],
+                           top_k: int, filters: Optional[Dict[str, Any]]):
+        query = self.client.query.get(collection_name, ["*"]).with_near_vector({
+            "vector": query_vector,
+            "certainty": 0.7
+        }).with_limit(top_k)
+        
+        # Apply filters if provided
+        if filters:
+            query = query.with_where(self._build_where_filter(filters))
+        return query
+    
+    @staticmethod
+    def _parse_results(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": item.get("id", ""),
+                "score": item.get("_additional", {}).get("certainty", 0.0),
+                "metadata": item
+            }
+            for item in items
+        ]
+    
+    @staticmethod
+    def _build_where_filter(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate equality filters to a Weaviate where filter (lists mean any-of)"""
+        operands = []
+        for key, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            clauses = [
+                {"path": [key], "operator": "Equal", "valueText": str(v)}
+                for v in values
+            ]
+            operands.append(clauses[0] if len(clauses) == 1 else {"operator": "Or", "operands": clauses})
+        return {"operator": "And", "operands": operands}
+    
+    async def delete_vectors(self, collection_name: str, ids: List[str]) -> WriteResult:
+        """Delete vectors from Weaviate with batch deletes on the object id"""
+        result = WriteResult()
+        for start in range(0, len(ids), 1000):
+            batch = ids[start:start + 1000]
+            where = {
+                "operator": "Or",
+                "operands": [{"path": ["id"], "operator": "Equal", "valueText": doc_id} for doc_id in batch]
+            }
+            self._merge_result(result, await self._delete_where(collection_name, where))
+        
+        logger.info(f"Deleted {result.succeeded} vectors from {collection_name}", failed=result.failed)
+        return result
+    
+    async def delete_by_filter(self, collection_name: str, filters: Dict[str, Any]) -> WriteResult:
+        """Delete matching objects with batch deletes, e.g. every chunk of a file_id"""
+        result = await self._delete_where(collection_name, self._build_where_filter(filters))
+        logger.info(f"Deleted {result.succeeded} vectors from {collection_name}",
+                    filters=filters, failed=result.failed)
+        return result
+    
+    async def _delete_where(self, collection_name: str, where: Dict[str, Any]) -> WriteResult:
+        result = WriteResult()
+        try:
+            while True:
+                response = await asyncio.to_thread(
+                    self.client.batch.delete_objects,
+                    class_name=collection_name,
+                    where=where,
+                    output="minimal"
+                )
+                counts = response.get("results", {})
+                result.succeeded += counts.get("successful", 0)
+                if counts.get("failed", 0):
+                    result.failed += counts["failed"]
+                    result.errors.append({
+                        "batch": len(result.errors),
+                        "size": counts.get("matches", 0),
+                        "failed": counts["failed"],
+                        "errors": [
+                            error.get("message", str(error))
+                            for obj in counts.get("objects") or []
+                            for error in ((obj.get("errors") or {}).get("error") or [])
+                        ]
+                    })
+                    break
+                # Each request removes at most DELETE_LIMIT objects
+                if counts.get("matches", 0) < counts.get("limit", self.DELETE_LIMIT):
+                    break
         except Exception as e:
             logger.error(f"Failed to delete vectors from {collection_name}", error=str(e))
-            return False
+            result.errors.append({"batch": len(result.errors), "size": None, "errors": [str(e)]})
+        return result
+    
+    @staticmethod
+    def _merge_result(total: WriteResult, part: WriteResult):
+        for error in part.errors:
+            total.errors.append({**error, "batch": len(total.errors)})
+        total.succeeded += part.succeeded
+        total.failed += part.failed
     
     async def health_check(self) -> bool:
         """Check Weaviate health"""
@@ -214,41 +402,71 @@ class WeaviateStore(VectorStore):
             return False
 
 class FAISSStore(VectorStore):
-    """FAISS vector store implementation for local development"""
+    """FAISS vector store implementation for local development
+
+    Collections are persisted under FAISS_STORAGE_PATH and reopened
+    memory-mapped, so restarts are warm and worker processes share one copy
+    of each snapshot (see database/faiss_collection.py). Collection reads and
+    writes (SQLite and FAISS) run in worker threads, off the event loop.
+    """
     
     def __init__(self):
-        self.indexes = {}
-        self.metadata_store = {}
+        self.indexes: Dict[str, FAISSCollection] = {}
         self.storage_path = os.getenv("FAISS_STORAGE_PATH", "./data/faiss")
+        self.mmap_enabled = os.getenv("FAISS_MMAP", "true").lower() == "true"
+        self.checkpoint_threshold = int(os.getenv("FAISS_CHECKPOINT_THRESHOLD", "50000"))
+        self.brute_force_threshold = int(os.getenv("FAISS_PREFILTER_BRUTE_FORCE", "4096"))
+        self.compaction_threshold = float(os.getenv("FAISS_COMPACTION_THRESHOLD", "0.2"))
+        # Background checkpoints, referenced until done so they are not collected mid-run
+        self._checkpoints: Set[asyncio.Task] = set()
         os.makedirs(self.storage_path, exist_ok=True)
         
     async def initialize(self) -> bool:
         """Initialize FAISS store"""
-        try:
-            import faiss
-            logger.info("FAISS store initialized successfully")
-            return True
-        except ImportError:
+        if not FAISS_AVAILABLE:
             logger.error("FAISS library not available")
             return False
+        
+        logger.info("FAISS store initialized successfully", storage_path=self.storage_path)
+        return True
+    
+    def _collection_dir(self, collection_name: str) -> str:
+        return os.path.join(self.storage_path, collection_name)
+    
+    def _get_collection(self, collection_name: str) -> Optional[FAISSCollection]:
+        """Get a loaded collection, reopening it from disk if needed"""
+        collection = self.indexes.get(collection_name)
+        if collection is None and FAISSCollection.exists(self._collection_dir(collection_name)):
+            collection = FAISSCollection(
+                collection_name,
+                self._collection_dir(collection_name),
+                mmap=self.mmap_enabled,
+                checkpoint_threshold=self.checkpoint_threshold,
+                brute_force_threshold=self.brute_force_threshold,
+                compaction_threshold=self.compaction_threshold
+            )
+            collection.load()
+            self.indexes[collection_name] = collection
+        return collection
     
     async def create_collection(self, collection_name: str, embedding_dim: int, metadata_schema: Dict[str, Any]) -> bool:
-        """Create a FAISS index"""
+        """Create a FAISS index, or reopen the persisted one"""
         try:
-            import faiss
-            
-            # Create index
-            index = faiss.IndexFlatIP(embedding_dim)  # Inner product for cosine similarity
-            self.indexes[collection_name] = {
-                "index": index,
-                "dimension": embedding_dim,
-                "metadata_schema": metadata_schema
-            }
-            
-            # Initialize metadata store
-            self.metadata_store[collection_name] = {}
+            collection = FAISSCollection(
+                collection_name,
+                self._collection_dir(collection_name),
+                mmap=self.mmap_enabled,
+                checkpoint_threshold=self.checkpoint_threshold,
+                brute_force_threshold=self.brute_force_threshold,
+                compaction_threshold=self.compaction_threshold
+            )
+            collection.create(embedding_dim, metadata_schema)
+            self.indexes[collection_name] = collection
             
-            logger.info(f"Created FAISS index: {collection_name} (dim: {embedding_dim})")
+            logger.info(
+                f"Opened FAISS index: {collection_name} (dim: {embedding_dim})",
+                vectors=collection.ntotal
+            )
             return True
             
         except Exception as e:
@@ -256,109 +474,197 @@ class FAISSStore(VectorStore):
             return False
     
     async def add_vectors(self, collection_name: str, vectors: List[List[float]], 
-                         metadata: List[Dict[str, Any]], ids: List[str]) -> bool:
+                         metadata: List[Dict[str, Any]], ids: List[str]) -> WriteResult:
         """Add vectors to FAISS index"""
         try:
-            if collection_name not in self.indexes:
-                return False
-            
-            index_info = self.indexes[collection_name]
-            index = index_info["index"]
+            collection = self._get_collection(collection_name)
+            if collection is None:
+                return WriteResult(failed=len(ids), errors=[{"batch": 0, "size": len(ids),
+                                                             "errors": [f"Unknown collection {collection_name}"]}])
             
             # Convert to numpy array and normalize for cosine similarity
             vectors_np = np.array(vectors, dtype=np.float32)
             faiss.normalize_L2(vectors_np)
             
-            # Add vectors to index
-            start_id = index.ntotal
-            index.add(vectors_np)
+            await asyncio.to_thread(collection.add, vectors_np, ids, metadata)
             
-            # Store metadata
-            for i, (doc_id, meta) in enumerate(zip(ids, metadata)):
-                internal_id = start_id + i
-                self.metadata_store[collection_name][internal_id] = {
-                    "id": doc_id,
-                    "metadata": meta
-                }
+            if collection.needs_checkpoint():
+                self._schedule_checkpoint(collection)
             
             logger.info(f"Added {len(vectors)} vectors to FAISS index {collection_name}")
-            return True
+            return WriteResult(succeeded=len(ids))
             
         except Exception as e:
             logger.error(f"Failed to add vectors to FAISS index {collection_name}", error=str(e))
-            return False
+            return WriteResult(failed=len(ids), errors=[{"batch": 0, "size": len(ids), "errors": [str(e)]}])
+    
+    def _schedule_checkpoint(self, collection: FAISSCollection):
+        task = asyncio.create_task(self._checkpoint(collection))
+        self._checkpoints.add(task)
+        task.add_done_callback(self._checkpoints.discard)
+    
+    async def _checkpoint(self, collection: FAISSCollection):
+        """Build the next snapshot (and train ANN indexes) off the event loop"""
+        try:
+            await asyncio.to_thread(collection.checkpoint)
+        except Exception as e:
+            logger.error(f"FAISS checkpoint failed for {collection.name}", error=str(e))
     
     async def search_vectors(self, collection_name: str, query_vector: List[float], 
-                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search FAISS index for similar vectors"""
+                           top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                           search_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search FAISS index for similar vectors
+
+        search_params may set "nprobe" (IVF) or "ef_search" (HNSW) per query.
+        """
+        results = await self.search_vectors_batch(collection_name, [query_vector], top_k, filters, search_params)
+        return results[0] if results else []
+    
+    async def search_vectors_batch(self, collection_name: str, query_vectors: List[List[float]],
+                                   top_k: int = 10, filters: Optional[Dict[str, Any]] = None,
+                                   search_params: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search all query vectors in a single matrix search"""
+        if not query_vectors:
+            return []
         try:
-            if collection_name not in self.indexes:
-                return []
+            collection = self._get_collection(collection_name)
+            if collection is None:
+                return [[] for _ in query_vectors]
             
-            index_info = self.indexes[collection_name]
-            index = index_info["index"]
+            # Normalize query vectors
+            queries_np = np.array(query_vectors, dtype=np.float32)
+            faiss.normalize_L2(queries_np)
             
-            # Normalize query vector
-            query_np = np.array([query_vector], dtype=np.float32)
-            faiss.normalize_L2(query_np)
-            
-            # Search
-            scores, indices = index.search(query_np, top_k)
-            
-            # Build results
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx == -1:  # No more results
-                    break
-                
-                if idx in self.metadata_store[collection_name]:
-                    item = self.metadata_store[collection_name][idx]
-                    
-                    # Apply filters if provided
-                    if filters:
-                        skip = False
-                        for key, value in filters.items():
-                            if key in item["metadata"] and item["metadata"][key] != value:
-                                skip = True
-                                break
-                        if skip:
-                            continue
-                    
-                    results.append({
-                        "id": item["id"],
-                        "score": float(score),
-                        "metadata": item["metadata"]
-                    })
-            
-            return results
+            return await asyncio.to_thread(self._search_batch, collection, queries_np, top_k,
+                                           filters, search_params)
             
         except Exception as e:
             logger.error(f"Failed to search FAISS index {collection_name}", error=str(e))
-            return []
+            return [[] for _ in query_vectors]
     
-    async def delete_vectors(self, collection_name: str, ids: List[str]) -> bool:
-        """Delete vectors from FAISS index (not directly supported, would need rebuild)"""
-        try:
-            # FAISS doesn't support deletion, so we mark as deleted in metadata
-            if collection_name not in self.metadata_store:
+    def _search_batch(self, collection: FAISSCollection, queries_np: np.ndarray, top_k: int,
+                      filters: Optional[Dict[str, Any]],
+                      search_params: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Filtered matrix search (blocking)"""
+        # Indexed filters select candidates up front; anything else is
+        # checked afterwards, widening the search until top_k is filled
+        indexed_filters, residual_filters = collection.split_filters(filters)
+        candidates = collection.candidates(indexed_filters) if indexed_filters else None
+        if candidates is not None and len(candidates) == 0:
+            return [[] for _ in range(len(queries_np))]
+        
+        fetch_k = top_k
+        while True:
+            scores, labels = collection.search(queries_np, fetch_k, search_params, candidates)
+            results = self._build_batch_results(collection, scores, labels, residual_filters, top_k)
+            exhausted = fetch_k >= (len(candidates) if candidates is not None else collection.ntotal)
+            if not residual_filters or exhausted or min(len(r) for r in results) >= top_k:
+                return results
+            fetch_k *= 4
+    
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """Residual filter check; like the inverted index, a missing field never matches"""
+        for key, value in filters.items():
+            if key not in metadata:
                 return False
+            allowed = value if isinstance(value, (list, tuple, set)) else [value]
+            if metadata[key] not in allowed:
+                return False
+        return True
+    
+    def _build_batch_results(self, collection: FAISSCollection, scores: np.ndarray, labels: np.ndarray,
+                             filters: Dict[str, Any], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Resolve a (queries x k) label matrix with one metadata lookup"""
+        entries = collection.fetch(np.unique(labels[labels != -1]).tolist())
+        return [
+            self._build_results(entries, row_scores, row_labels, filters, top_k)
+            for row_scores, row_labels in zip(scores, labels)
+        ]
+    
+    def _build_results(self, entries: Dict[int, Dict[str, Any]], scores: np.ndarray, labels: np.ndarray,
+                       filters: Dict[str, Any], top_k: int) -> List[Dict[str, Any]]:
+        """Resolve labels to ids and metadata, applying non-indexed filters"""
+        results = []
+        for score, label in zip(scores, labels):
+            if label == -1:  # No more results
+                break
+            
+            item = entries.get(int(label))
+            if item is None or item["deleted"] or not self._matches(item["metadata"], filters):
+                continue
+            
+            results.append({
+                "id": item["id"],
+                "score": float(score),
+                "metadata": item["metadata"]
+            })
+            if len(results) >= top_k:
+                break
+        
+        return results
+    
+    async def delete_vectors(self, collection_name: str, ids: List[str]) -> WriteResult:
+        """Delete vectors from FAISS index
+
+        Unsnapshotted vectors are removed immediately; snapshot vectors are
+        tombstoned and reclaimed by a background compaction.
+        """
+        try:
+            collection = self._get_collection(collection_name)
+            if collection is None:
+                return WriteResult()
             
-            deleted_count = 0
-            for internal_id, item in self.metadata_store[collection_name].items():
-                if item["id"] in ids:
-                    item["deleted"] = True
-                    deleted_count += 1
+            deleted_count = await asyncio.to_thread(collection.delete, ids)
             
-            logger.info(f"Marked {deleted_count} vectors as deleted in {collection_name}")
-            return True
+            if collection.needs_checkpoint():
+                self._schedule_checkpoint(collection)
+            
+            logger.info(f"Deleted {deleted_count} vectors from {collection_name}",
+                        tombstones=collection.tombstone_count)
+            return WriteResult(succeeded=deleted_count)
             
         except Exception as e:
             logger.error(f"Failed to delete vectors from FAISS index {collection_name}", error=str(e))
-            return False
+            return WriteResult(failed=len(ids), errors=[{"batch": 0, "size": len(ids), "errors": [str(e)]}])
+    
+    async def delete_by_filter(self, collection_name: str, filters: Dict[str, Any]) -> WriteResult:
+        """Delete every vector matching the filters, e.g. all chunks of a file_id"""
+        collection = self._get_collection(collection_name)
+        if collection is None:
+            return WriteResult()
+        indexed_filters, residual_filters = collection.split_filters(filters)
+        entries = await asyncio.to_thread(collection.entries_matching, indexed_filters)
+        ids = sorted({
+            item["id"] for item in entries.values()
+            if self._matches(item["metadata"], residual_filters)
+        })
+        return await self.delete_vectors(collection_name, ids)
+    
+    async def benchmark_collection(self, collection_name: str,
+                                   settings: Optional[List[Dict[str, Any]]] = None,
+                                   num_queries: int = 100, top_k: int = 10) -> Dict[str, Any]:
+        """Report recall@k vs. latency for a collection's index settings"""
+        collection = self._get_collection(collection_name)
+        if collection is None:
+            raise ValueError(f"Unknown FAISS collection: {collection_name}")
+        return await asyncio.to_thread(collection.benchmark, settings, num_queries, top_k)
     
     async def health_check(self) -> bool:
         """Check FAISS store health"""
-        return True
+        return FAISS_AVAILABLE and os.access(self.storage_path, os.W_OK)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Per-collection vector, tombstone and compaction counters"""
+        return {
+            "backend": "faiss",
+            "collections": {name: collection.stats() for name, collection in self.indexes.items()}
+        }
+    
+    async def close(self):
+        """Wait for background checkpoints to finish"""
+        if self._checkpoints:
+            await asyncio.gather(*self._checkpoints, return_exceptions=True)
 
 # Factory function to create vector store based on configuration
 def create_vector_store() -> VectorStore:
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark text chunkers
+
+Compares the token-aware chunker with the previous character-window splitter
+on chunks/sec, MB/s, chunk count, token sizes and near-duplicate chunks.
+
+Usage:
+    python scripts/benchmark_chunker.py                      # synthetic corpus
+    python scripts/benchmark_chunker.py report.txt --repeat 5
+    python scripts/benchmark_chunker.py --tokenizer sentence-transformers/all-MiniLM-L6-v2
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.chunker import TokenChunker, iter_character_chunks, estimate_tokens
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark text chunkers")
+    parser.add_argument("files", nargs="*", help="Text files to chunk (default: synthetic corpus)")
+    parser.add_argument("--size-mb", type=float, default=8, help="Synthetic corpus size")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per chunker (best is reported)")
+    parser.add_argument("--tokenizer", help="Hugging Face tokenizer name (default: word estimate)")
+    parser.add_argument("--max-tokens", type=int, default=254, help="Token chunker limit")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    return parser.parse_args()
+
+def synthetic_corpus(size_mb: float) -> str:
+    random.seed(42)
+    words = ("revenue growth quarter margin customer product market segment forecast "
+             "operating expense region pipeline churn retention analysis").split()
+    parts, size = [], 0
+    while size < size_mb * 1024 * 1024:
+        if random.random() < 0.05:
+            part = f"## {' '.join(random.choices(words, k=4)).title()}"
+        else:
+            sentences = [
+                " ".join(random.choices(words, k=random.randint(6, 30))).capitalize() + random.choice(".!?")
+                for _ in range(random.randint(1, 8))
+            ]
+            part = " ".join(sentences)
+        parts.append(part)
+        size += len(part) + 2
+    return "\n\n".join(parts)
+
+def measure(name, chunk_fn, text, repeat, count_tokens):
+    best, chunks = None, []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = [chunk for chunk, _, _ in chunk_fn([(None, text)])]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    sizes = [count_tokens(chunk) for chunk in chunks]
+    # Chunks whose text is wholly contained in their predecessor
+    contained = sum(1 for prev, cur in zip(chunks, chunks[1:]) if cur in prev)
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "seconds": round(best, 3),
+        "chunks_per_sec": round(len(chunks) / best, 1) if best else 0.0,
+        "mb_per_sec": round(len(text) / 1024 / 1024 / best, 2) if best else 0.0,
+        "avg_tokens": round(sum(sizes) / len(sizes), 1) if sizes else 0,
+        "max_tokens": max(sizes) if sizes else 0,
+        "contained_chunks": contained,
+    }
+
+def main():
+    args = parse_args()
+
+    if args.files:
+        text = "\n\n".join(Path(f).read_text(encoding="utf-8", errors="ignore") for f in args.files)
+    else:
+        text = synthetic_corpus(args.size_mb)
+
+    tokenizer = None
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+
+    def count_tokens(chunk):
+        if tokenizer is None:
+            return estimate_tokens(chunk)
+        return len(tokenizer(chunk, add_special_tokens=False)["input_ids"])
+
+    token_chunker = TokenChunker(tokenizer=tokenizer, max_tokens=args.max_tokens)
+    report = {
+        "input_mb": round(len(text) / 1024 / 1024, 2),
+        "results": [
+            measure("character (previous)", iter_character_chunks, text, args.repeat, count_tokens),
+            measure("token-aware", token_chunker.iter_chunks, text, args.repeat, count_tokens),
+        ]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"📊 {report['input_mb']} MB input, tokens counted with {args.tokenizer or 'word estimate'}")
+    print(f"{'chunker':<22}{'chunks':>9}{'chunks/s':>12}{'MB/s':>8}{'avg tok':>9}{'max tok':>9}{'contained':>11}")
+    for row in report["results"]:
+        print(f"{row['chunker']:<22}{row['chunks']:>9}{row['chunks_per_sec']:>12}{row['mb_per_sec']:>8}"
+              f"{row['avg_tokens']:>9}{row['max_tokens']:>9}{row['contained_chunks']:>11}")
+
+if __name__ == "__main__":
+    main()
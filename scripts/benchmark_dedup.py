@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark search result deduplication
+
+Compares the MinHash/LSH deduplicator with the previous pairwise approach
+(title Jaccard against every kept title, plus a dense TF-IDF cosine matrix
+when scikit-learn is installed) on synthetic result sets where each story is
+reported several times with small edits, by different providers and under
+URL variants.
+
+Reports time, results/sec, unique results left, and accuracy against the
+known stories: missed duplicates (extra results left per story) and false
+merges (results merged into a different story).
+
+Usage:
+    python scripts/benchmark_dedup.py                    # 50, 500 and 5000 results
+    python scripts/benchmark_dedup.py --sizes 200 2000 --repeat 5
+    python scripts/benchmark_dedup.py --skip-previous --sizes 50000
+"""
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.search.dedup import ResultDeduplicator
+
+PROVIDERS = ["Database", "DuckDuckGo", "Google (SERP)", "Exa AI", "Venice AI (Uncensored)"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark search result deduplication")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000], help="Result counts")
+    parser.add_argument("--copies", type=float, default=3.0, help="Average reports per story")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method (best is reported)")
+    parser.add_argument("--skip-previous", action="store_true", help="Only run the MinHash deduplicator")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    return parser.parse_args()
+
+def synthetic_results(size: int, copies: float, seed: int = 42):
+    rng = random.Random(seed)
+    vocabulary = [f"{stem}{suffix}" for stem in (
+        "market revenue clinical trial property rental payment growth policy vaccine "
+        "startup funding merger analysis forecast regulation patient tenant lease quarter"
+    ).split() for suffix in ("", "s", "ing", "ed")]
+
+    results, story = [], 0
+    while len(results) < size:
+        title = " ".join(rng.choices(vocabulary, k=rng.randint(5, 10))).capitalize()
+        content = " ".join(rng.choices(vocabulary, k=rng.randint(30, 80)))
+        url = f"https://news{story % 50}.example.com/{story}/{title.split()[0].lower()}"
+        for copy_number in range(max(1, round(rng.expovariate(1 / copies)))):
+            if len(results) >= size:
+                break
+            variant = {"title": title, "content": content, "url": url}
+            edit = rng.random()
+            if copy_number and edit < 0.3:
+                variant["url"] = url.replace("https://", "http://") + rng.choice(["/", "#top", ""])
+            elif copy_number and edit < 0.6:
+                # Same story re-titled slightly under another URL
+                words = title.split()
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+                variant["title"] = " ".join(words) + " - " + rng.choice(["Reuters", "AP", "Blog"])
+                variant["url"] = f"https://mirror{rng.randint(1, 9)}.example.org/{story}"
+            elif copy_number:
+                # Different snippet length of the same text
+                words = content.split()
+                cut = rng.randint(len(words) * 3 // 4, len(words))
+                variant["content"] = " ".join(words[:cut])
+                variant["title"] = rng.choice(["", title])
+                variant["url"] = f"https://syndicate.example.net/{story}-{copy_number}"
+            variant.update({
+                "original_source": rng.choice(PROVIDERS),
+                "relevance_score": rng.random(),
+                "metadata": {},
+                "story": story,
+            })
+            results.append(variant)
+        story += 1
+    rng.shuffle(results)
+    return results
+
+# === Previous implementation ===
+
+def _string_similarity(s1: str, s2: str) -> float:
+    if not s1 or not s2:
+        return 0.0
+    words1, words2 = set(s1.lower().split()), set(s2.lower().split())
+    union = words1 | words2
+    return len(words1 & words2) / len(union) if union else 0.0
+
+def previous_deduplicate(results):
+    """The blender's former pairwise deduplication, kept for comparison"""
+    seen_urls, seen_titles, unique_results, duplicate_count = set(), {}, [], 0
+
+    similarity_matrix = None
+    texts = [f"{r.get('title', '')} {r.get('content', '')}" for r in results]
+    if len(texts) > 5:
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.metrics.pairwise import cosine_similarity
+            vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+            similarity_matrix = cosine_similarity(vectorizer.fit_transform(texts))
+        except ImportError:
+            pass
+
+    for i, result in enumerate(results):
+        url, title = result.get('url', ''), result.get('title', '')
+        if url and url in seen_urls:
+            duplicate_count += 1
+            continue
+        is_duplicate = False
+        for seen_title, seen_idx in seen_titles.items():
+            if _string_similarity(title, seen_title) > 0.85:
+                unique_results[seen_idx].setdefault('sources', []).append(result['original_source'])
+                duplicate_count += 1
+                is_duplicate = True
+                break
+        if is_duplicate:
+            continue
+        if similarity_matrix is not None:
+            for j in range(i):
+                if similarity_matrix[i][j] > 0.8:
+                    duplicate_count += 1
+                    is_duplicate = True
+                    break
+        if not is_duplicate:
+            result['sources'] = [result['original_source']]
+            unique_results.append(result)
+            if url:
+                seen_urls.add(url)
+            if title:
+                seen_titles[title] = len(unique_results) - 1
+    return unique_results, duplicate_count
+
+# === Measurement ===
+
+def measure(name, dedup_fn, results, repeat):
+    best, unique = None, []
+    for _ in range(repeat):
+        batch = copy.deepcopy(results)
+        started = time.perf_counter()
+        unique, _ = dedup_fn(batch)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    stories = {r["story"] for r in results}
+    kept_per_story = {}
+    for result in unique:
+        kept_per_story[result["story"]] = kept_per_story.get(result["story"], 0) + 1
+    missed = sum(count - 1 for count in kept_per_story.values())
+    false_merges = len(stories) - len(kept_per_story)  # stories with no result left
+    return {
+        "method": name,
+        "results": len(results),
+        "stories": len(stories),
+        "unique": len(unique),
+        "seconds": round(best, 4),
+        "results_per_sec": round(len(results) / best) if best else 0,
+        "missed_duplicates": missed,
+        "lost_stories": false_merges,
+        "avg_sources_per_result": round(sum(len(r.get("sources", [])) for r in unique) / len(unique), 2) if unique else 0,
+    }
+
+def main():
+    args = parse_args()
+    deduplicator = ResultDeduplicator()
+
+    rows = []
+    for size in args.sizes:
+        results = synthetic_results(size, args.copies)
+        if not args.skip_previous:
+            rows.append(measure("pairwise (previous)", previous_deduplicate, results, args.repeat))
+        rows.append(measure("minhash-lsh", deduplicator.deduplicate, results, args.repeat))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"📊 Deduplication, {args.copies:g} reports per story on average (best of {args.repeat})")
+    print(f"{'method':<22}{'results':>9}{'stories':>9}{'unique':>8}{'seconds':>10}{'results/s':>11}"
+          f"{'missed':>8}{'lost':>6}{'sources':>9}")
+    for row in rows:
+        print(f"{row['method']:<22}{row['results']:>9}{row['stories']:>9}{row['unique']:>8}{row['seconds']:>10}"
+              f"{row['results_per_sec']:>11}{row['missed_duplicates']:>8}{row['lost_stories']:>6}"
+              f"{row['avg_sources_per_result']:>9}")
+
+if __name__ == "__main__":
+    main()
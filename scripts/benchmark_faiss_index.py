@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark FAISS collection index settings
+
+Prints recall@k against exact search and per-query latency for each nprobe /
+efSearch setting, to pick index parameters for the current corpus size.
+
+Usage:
+    python scripts/benchmark_faiss_index.py documents --queries 200 --top-k 10
+    python scripts/benchmark_faiss_index.py documents --nprobe 8 32 128
+"""
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from database.vector_store import FAISSStore
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark a FAISS collection")
+    parser.add_argument("collection", help="Collection name, e.g. documents")
+    parser.add_argument("--queries", type=int, default=100, help="Number of sampled queries")
+    parser.add_argument("--top-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--nprobe", type=int, nargs="*", help="IVF nprobe values to sweep")
+    parser.add_argument("--ef-search", type=int, nargs="*", help="HNSW efSearch values to sweep")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+
+    settings = None
+    if args.nprobe:
+        settings = [{"nprobe": n} for n in args.nprobe]
+    elif args.ef_search:
+        settings = [{"ef_search": ef} for ef in args.ef_search]
+
+    store = FAISSStore()
+    if not await store.initialize():
+        sys.exit(1)
+
+    report = await store.benchmark_collection(args.collection, settings, args.queries, args.top_k)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"📊 {report['collection']}: {report.get('vectors', 0)} vectors, "
+          f"index={report['index_type']}, top_k={args.top_k}")
+    print(f"{'params':<24}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in report["results"]:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items()) or "exact"
+        print(f"{params:<24}{row['recall_at_k']:>10.3f}{row['latency_ms_p50']:>10.3f}{row['latency_ms_p95']:>10.3f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Standalone ingest worker
+
+Processes queued uploads from the processing_jobs table. Run as many of these
+as ingest throughput needs, next to or instead of the worker inside the API
+(set INGEST_WORKER_INLINE=false on the API to leave all processing to them).
+
+Usage:
+    python scripts/ingest_worker.py
+    python scripts/ingest_worker.py --concurrency 8
+"""
+import sys
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from database.connection import init_database, close_database
+from database.vector_store import vector_store
+from services.file_service import enhanced_file_service
+from services.extraction_pool import extraction_pool
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run an ingest job worker")
+    parser.add_argument("--concurrency", type=int, help="Jobs run at once (default: INGEST_WORKER_CONCURRENCY)")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+
+    await init_database()
+    await enhanced_file_service.initialize()
+    await vector_store.initialize()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker = enhanced_file_service.start_worker(args.concurrency)
+    print(f"🚀 Ingest worker {worker.worker_id} running {worker.concurrency} jobs at a time")
+
+    try:
+        await stop.wait()
+        print("🛑 Stopping, waiting for running jobs...")
+    finally:
+        await enhanced_file_service.stop_worker()
+        await vector_store.close()
+        extraction_pool.shutdown()
+        await close_database()
+        print(f"✅ Worker stopped: {worker.stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,299 @@
+"""
+Orchestra AI - Search Result Cache
+
+Caches each provider's results for a query so that repeated searches do not
+pay Exa, SERP or the scrapers again. Entries are keyed by normalised query,
+provider, search mode and persona, and live in two tiers: an in-process LRU
+answers repeats on the same worker without a network hop, and Redis shares
+entries between workers and restarts.
+
+Every provider has its own TTL. Once an entry expires it is still served for
+SEARCH_CACHE_STALE_SECONDS while one background task fetches a fresh copy, so
+a popular query never waits for a slow provider. Providers with a TTL of 0
+(the internal database) bypass the cache. Empty result lists are not stored,
+since providers also return [] when a call fails.
+
+Refresh tasks and the Redis client belong to the caller's event loop, which
+must keep running after the request returns: synchronous callers share one
+long-lived loop (see src/routes/chat_v2.py) rather than a loop per request.
+close() waits for that loop's refreshes before closing its Redis client.
+
+Values are stored as JSON; hits are decoded into new objects, so callers may
+mutate what they get back.
+
+Configuration:
+    SEARCH_CACHE_ENABLED         set to false to bypass the cache (default true)
+    SEARCH_CACHE_LRU_SIZE        entries kept in process (default 1024)
+    SEARCH_CACHE_TTLS            per-provider TTL overrides, e.g. "serp=600,exa_ai=3600"
+    SEARCH_CACHE_STALE_SECONDS   how long expired entries may be served (default 3600)
+    SEARCH_CACHE_REDIS_URL       Redis for the shared tier (default REDIS_HOST/REDIS_PORT)
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import weakref
+import unicodedata
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "search:v1"
+
+# Seconds a provider's results stay fresh
+DEFAULT_TTLS = {
+    "database": 0,
+    "duckduckgo": 3600,
+    "exa_ai": 6 * 3600,
+    "serp": 3600,
+    "venice_ai": 3600,
+    "apify": 24 * 3600,
+    "zenrows": 24 * 3600,
+    "scraping": 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+# A refresh not finished after this long is assumed lost (e.g. its loop stopped)
+REFRESH_TIMEOUT = 60
+
+# Lookup outcomes
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Case, Unicode form and whitespace variants of a query share one key"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query)).strip().casefold()
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "dict"):
+        return value.dict()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+class _Entry:
+    __slots__ = ("payload", "fresh_until", "stale_until")
+
+    def __init__(self, payload: str, fresh_until: float, stale_until: float):
+        self.payload = payload
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class SearchCache:
+    """Two-tier (LRU + Redis) cache of provider results with stale-while-revalidate"""
+
+    def __init__(self):
+        self.enabled = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+        self.lru_size = int(os.getenv("SEARCH_CACHE_LRU_SIZE", "1024"))
+        self.stale_seconds = int(os.getenv("SEARCH_CACHE_STALE_SECONDS", "3600"))
+        self.ttls = dict(DEFAULT_TTLS)
+        for item in os.getenv("SEARCH_CACHE_TTLS", "").split(","):
+            name, _, value = item.partition("=")
+            if name.strip() and value.strip():
+                self.ttls[name.strip()] = int(value)
+        self.redis_url = os.getenv("SEARCH_CACHE_REDIS_URL") or (
+            f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/0"
+        )
+
+        self._lru: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._redis: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._redis_down_until = 0.0
+        self._refreshing: Dict[str, float] = {}
+        self._tasks: set = set()
+        self.counters = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "bypassed": 0,
+            "lru_hits": 0, "redis_hits": 0, "refreshes": 0, "refresh_errors": 0, "redis_errors": 0,
+        }
+
+    def ttl_for(self, provider: str) -> int:
+        return self.ttls.get(provider, DEFAULT_TTL)
+
+    @staticmethod
+    def make_key(provider: str, mode: str, persona: str, query: str, variant: str = "") -> str:
+        digest = hashlib.sha256(f"{normalize_query(query)}\x00{variant}".encode()).hexdigest()[:40]
+        return f"{KEY_PREFIX}:{provider}:{mode}:{persona.lower()}:{digest}"
+
+    # === Lookup ===
+
+    async def get_or_fetch(
+        self,
+        provider: str,
+        mode: str,
+        persona: str,
+        query: str,
+        fetch: Callable[[], Awaitable[Any]],
+        decode: Optional[Callable[[Any], Any]] = None,
+        variant: str = "",
+    ) -> Tuple[Any, str]:
+        """(results, HIT | STALE | MISS) for one provider query
+
+        `fetch` is called on a miss, and again in the background to refresh a
+        stale entry. Cached values come back as decoded JSON, passed through
+        `decode` if given; a miss returns what `fetch` returned. `variant`
+        separates requests that differ in more than the query (e.g. result
+        count).
+        """
+        ttl = self.ttl_for(provider)
+        if not self.enabled or ttl <= 0:
+            self.counters["bypassed"] += 1
+            return await fetch(), MISS
+
+        key = self.make_key(provider, mode, persona, query, variant)
+        entry = await self._lookup(key)
+        now = time.time()
+
+        if entry is not None and now < entry.stale_until:
+            value = json.loads(entry.payload)
+            if decode is not None:
+                value = decode(value)
+            if now < entry.fresh_until:
+                self.counters["hits"] += 1
+                return value, HIT
+            self.counters["stale_hits"] += 1
+            self._refresh(key, ttl, fetch)
+            return value, STALE
+
+        self.counters["misses"] += 1
+        value = await fetch()
+        await self._store(key, ttl, value)
+        return value, MISS
+
+    async def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._lru.get(key)
+        if entry is not None and time.time() < entry.fresh_until:
+            self._lru.move_to_end(key)
+            self.counters["lru_hits"] += 1
+            return entry
+
+        # Missing or expired locally: another worker may have refreshed it
+        client = self._client()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+            except Exception as e:
+                self._redis_failed(e)
+            else:
+                if raw is not None:
+                    stored = json.loads(raw)
+                    shared = _Entry(stored["payload"], stored["fresh_until"], stored["stale_until"])
+                    if entry is None or shared.fresh_until > entry.fresh_until:
+                        entry = shared
+                        self._remember(key, entry)
+                    if time.time() < entry.fresh_until:
+                        self.counters["redis_hits"] += 1
+        return entry
+
+    # === Storage ===
+
+    async def _store(self, key: str, ttl: int, value: Any):
+        if not value:
+            return
+        now = time.time()
+        entry = _Entry(json.dumps(value, default=_json_default), now + ttl, now + ttl + self.stale_seconds)
+        self._remember(key, entry)
+
+        client = self._client()
+        if client is None:
+            return
+        record = json.dumps({"payload": entry.payload, "fresh_until": entry.fresh_until,
+                             "stale_until": entry.stale_until})
+        try:
+            await client.set(key, record, ex=ttl + self.stale_seconds)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _remember(self, key: str, entry: _Entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _refresh(self, key: str, ttl: int, fetch: Callable[[], Awaitable[Any]]):
+        started = self._refreshing.get(key)
+        if started is not None and time.monotonic() - started < REFRESH_TIMEOUT:
+            return
+        self._refreshing[key] = time.monotonic()
+
+        async def refresh():
+            try:
+                await self._store(key, ttl, await fetch())
+                self.counters["refreshes"] += 1
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                logger.warning(f"Search cache refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # === Redis ===
+
+    def _client(self):
+        """Redis client for the running loop; None while Redis is unavailable"""
+        if not REDIS_AVAILABLE or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._redis.get(loop)
+        if client is None:
+            client = redis.Redis.from_url(
+                self.redis_url, decode_responses=True,
+                socket_connect_timeout=0.5, socket_timeout=0.5,
+            )
+            self._redis[loop] = client
+        return client
+
+    def _redis_failed(self, error: Exception):
+        # Fall back to the local tier for a while instead of timing out on every lookup
+        self.counters["redis_errors"] += 1
+        self._redis_down_until = time.monotonic() + 30
+        logger.warning(f"Search cache Redis unavailable, using local tier only: {error}")
+
+    async def close(self, timeout: float = 5.0):
+        """Let the running loop's refreshes finish, then close its Redis client (shutdown hook)"""
+        loop = asyncio.get_running_loop()
+        pending = [task for task in self._tasks if task.get_loop() is loop]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        client = self._redis.pop(loop, None)
+        if client is not None:
+            await client.aclose() if hasattr(client, "aclose") else await client.close()
+        for other in [other for other in self._redis if other.is_closed()]:
+            self._redis.pop(other, None)
+
+    # === Metrics ===
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        served = self.counters["hits"] + self.counters["stale_hits"]
+        return {
+            "enabled": self.enabled,
+            "redis": REDIS_AVAILABLE and time.monotonic() >= self._redis_down_until,
+            "lru_entries": len(self._lru),
+            "lru_size": self.lru_size,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+            "refreshing": len(self._refreshing),
+            "ttls": dict(self.ttls),
+            **self.counters,
+        }
+
+# Global search cache
+search_cache = SearchCache()
@@ -0,0 +1,220 @@
+"""
+Orchestra AI - Provider Fan-out
+
+Runs one search across several providers against a single deadline. Each
+provider finishes on its own: whatever has answered when the deadline passes
+is kept, and the rest are cancelled and reported as timed out, instead of one
+slow provider discarding the whole batch.
+
+A provider still running after its usual p95 latency gets one hedged
+duplicate request; the first attempt to answer wins and the other is
+cancelled. Hedging is based on each provider's recent latencies, so only its
+slow tail (about one request in twenty) is ever sent twice. A hedge is a
+second billable call, so by default only free providers are hedged; paid APIs
+and scrapers have to be listed in SEARCH_HEDGE_PROVIDERS. Outcomes report the
+number of attempts so callers can account for the extra calls.
+
+Every provider gets a ProviderOutcome with its status, latency and result
+count, so callers can see which sources made the cutoff. Outcomes can be
+consumed as they arrive (as_completed) or all at once (run).
+
+Providers answered through the search cache are added with cached=True. Only
+their misses reached the provider, so hits and stale hits are left out of the
+latency history that hedge delays are based on.
+
+Configuration:
+    SEARCH_HEDGE_PROVIDERS   providers that may be hedged (default: duckduckgo)
+    SEARCH_HEDGE_AFTER       seconds before hedging while a provider has too
+                             few latency samples (default 2.0)
+    SEARCH_HEDGE_MIN         lower bound on the hedge delay in seconds (default 0.25)
+"""
+
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+from search_cache import MISS
+
+logger = logging.getLogger(__name__)
+
+# Outcome statuses
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+
+LATENCY_WINDOW = 100
+MIN_SAMPLES = 10
+
+# Providers hedged unless SEARCH_HEDGE_PROVIDERS says otherwise: free to call twice
+DEFAULT_HEDGE_PROVIDERS = "duckduckgo"
+
+class LatencyTracker:
+    """Recent per-provider latencies, used to pick hedge delays"""
+
+    def __init__(self):
+        self.samples: Dict[str, Deque[float]] = {}
+
+    def record(self, provider: str, seconds: float):
+        self.samples.setdefault(provider, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def percentile(self, provider: str, fraction: float) -> Optional[float]:
+        samples = self.samples.get(provider)
+        if not samples or len(samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            provider: {
+                "samples": len(samples),
+                "p50_ms": round(sorted(samples)[len(samples) // 2] * 1000),
+                "p95_ms": round((self.percentile(provider, 0.95) or max(samples)) * 1000),
+            }
+            for provider, samples in self.samples.items() if samples
+        }
+
+class ProviderOutcome:
+    """How one provider fared in a fan-out"""
+
+    __slots__ = ("provider", "status", "results", "latency_ms", "attempts", "hedged", "error", "cache")
+
+    def __init__(self, provider: str, status: str, results: Any = None, latency_ms: int = 0,
+                 attempts: int = 1, hedged: bool = False, error: Optional[str] = None,
+                 cache: Optional[str] = None):
+        self.provider = provider
+        self.status = status
+        self.results = results if results is not None else []
+        self.latency_ms = latency_ms
+        self.attempts = attempts
+        self.hedged = hedged  # a hedged duplicate was sent
+        self.error = error
+        self.cache = cache  # HIT, STALE or MISS for cached providers
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = {
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "result_count": len(self.results),
+            "attempts": self.attempts,
+            "hedged": self.hedged,
+        }
+        if self.error:
+            report["error"] = self.error
+        if self.cache:
+            report["cache"] = self.cache
+        return report
+
+class FanOut:
+    """Fan one query out to providers under a shared deadline, hedging the slow tail"""
+
+    def __init__(self, deadline: float, tracker: Optional["LatencyTracker"] = None):
+        self.deadline = deadline
+        self.tracker = tracker or search_latency
+        self.hedge_providers = {
+            name.strip() for name in os.getenv("SEARCH_HEDGE_PROVIDERS", DEFAULT_HEDGE_PROVIDERS).split(",")
+            if name.strip()
+        }
+        self.hedge_after = float(os.getenv("SEARCH_HEDGE_AFTER", "2.0"))
+        self.hedge_min = float(os.getenv("SEARCH_HEDGE_MIN", "0.25"))
+        self._calls: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._cached: set = set()
+        self._launched: Dict[str, int] = {}
+
+    def add(self, provider: str, fetch: Callable[[], Awaitable[Any]], cached: bool = False):
+        """Register a provider; `fetch` must be callable more than once (hedging)
+
+        A `cached` fetch returns (results, cache status) like
+        SearchCache.get_or_fetch; only its misses count as provider latency.
+        """
+        self._calls[provider] = fetch
+        if cached:
+            self._cached.add(provider)
+
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        if provider not in self.hedge_providers:
+            return None
+        p95 = self.tracker.percentile(provider, 0.95)
+        delay = p95 if p95 is not None else self.hedge_after
+        return max(delay, self.hedge_min)
+
+    async def _race(self, provider: str, fetch: Callable[[], Awaitable[Any]]) -> ProviderOutcome:
+        """First good answer from the original request or its hedge"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        hedge_delay = self._hedge_delay(provider)
+        attempts = {asyncio.ensure_future(fetch()): started}
+        launched = self._launched[provider] = 1
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                timeout = None
+                if launched == 1 and hedge_delay is not None:
+                    timeout = max(started + hedge_delay - loop.time(), 0)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    attempts[asyncio.ensure_future(fetch())] = loop.time()
+                    launched = self._launched[provider] = launched + 1
+                    continue
+                for attempt in done:
+                    attempt_started = attempts.pop(attempt)
+                    if attempt.exception() is None:
+                        finished = loop.time()
+                        results, cache = attempt.result() if provider in self._cached else (attempt.result(), None)
+                        if cache in (None, MISS):
+                            self.tracker.record(provider, finished - attempt_started)
+                        return ProviderOutcome(provider, OK, results, round((finished - started) * 1000),
+                                               launched, launched > 1, cache=cache)
+                    error = attempt.exception()
+            return ProviderOutcome(provider, ERROR, latency_ms=round((loop.time() - started) * 1000),
+                                   attempts=launched, hedged=launched > 1, error=str(error))
+        except asyncio.CancelledError:
+            # Deadline passed; the censored sample still pushes the provider's p95 up
+            self.tracker.record(provider, loop.time() - started)
+            raise
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def as_completed(self) -> AsyncIterator[ProviderOutcome]:
+        """Yield each provider's outcome as it finishes; stragglers are cancelled at the deadline"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        pending = {asyncio.ensure_future(self._race(provider, fetch)): provider
+                   for provider, fetch in self._calls.items()}
+        try:
+            while pending:
+                remaining = started + self.deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        yield ProviderOutcome(provider, ERROR, latency_ms=round((loop.time() - started) * 1000),
+                                              error=str(task.exception()))
+                    else:
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        for provider in pending.values():
+            logger.warning(f"Search provider {provider} missed the {self.deadline}s deadline")
+            launched = self._launched.get(provider, 1)
+            yield ProviderOutcome(provider, TIMEOUT, latency_ms=round(self.deadline * 1000), attempts=launched,
+                                  hedged=launched > 1, error=f"no answer within {self.deadline}s")
+
+    async def run(self) -> Dict[str, ProviderOutcome]:
+        """Every provider's outcome once all have finished or the deadline has passed"""
+        outcomes = {}
+        async for outcome in self.as_completed():
+            outcomes[outcome.provider] = outcome
+        return {provider: outcomes[provider] for provider in self._calls}
+
+# Global provider latency history
+search_latency = LatencyTracker()
@@ -0,0 +1,282 @@
+"""
+Orchestra AI - Search Provider HTTP Client
+
+One pooled HTTP layer shared by every web search provider call in the process,
+instead of a new ClientSession (and with it a DNS lookup and TCP+TLS
+handshake) per provider per query. Connections are kept alive per host, DNS
+answers are cached, and each provider has its own concurrency limit so one
+slow or rate-limited API cannot hold the whole pool.
+
+Sessions belong to an event loop. A server running on one loop (FastAPI) gets
+a single pool, opened and closed by start()/close() from its startup and
+shutdown hooks. Synchronous callers should run their coroutines on one
+long-lived loop as well (the Flask routes share a background loop); code that
+does use a fresh loop must await close() before discarding it, or the loop's
+session is never closed.
+
+With SEARCH_HTTP2 enabled and httpx[http2] installed, requests go through an
+httpx client that negotiates HTTP/2 with each host (falling back to HTTP/1.1),
+so concurrent requests to one provider share a single connection.
+
+stats() reports in-flight requests against the pool size, connection reuse
+and DNS cache hits, and per-provider queueing, for sizing the limits below.
+
+Configuration:
+    SEARCH_HTTP_POOL_SIZE        connections across all hosts (default 100)
+    SEARCH_HTTP_POOL_PER_HOST    connections per host (default 20)
+    SEARCH_HTTP_KEEPALIVE        seconds an idle connection is kept open (default 30)
+    SEARCH_HTTP_DNS_TTL          seconds DNS answers are cached (default 300)
+    SEARCH_HTTP_TIMEOUT          default request timeout in seconds (default 15)
+    SEARCH_HTTP_PROVIDER_LIMIT   concurrent requests per provider (default 8)
+    SEARCH_HTTP_LIMITS           per-provider overrides, e.g. "exa_ai=4,serp=2"
+    SEARCH_HTTP2                 use HTTP/2 where httpx[http2] is available
+"""
+
+import os
+import time
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx needs it to speak HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class ProviderStats:
+    """Request counters for one provider"""
+
+    __slots__ = ("limit", "requests", "errors", "in_flight", "peak_in_flight", "waiting", "wait_seconds")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(self.wait_seconds * 1000 / self.requests, 1) if self.requests else 0.0,
+        }
+
+class _LoopPool:
+    """The session and provider semaphores used on one event loop"""
+
+    def __init__(self, session: Any, backend: str):
+        self.session = session
+        self.backend = backend
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def semaphore(self, provider: str, limit: int) -> asyncio.Semaphore:
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(limit)
+        return self.semaphores[provider]
+
+    async def close(self):
+        if self.backend == "httpx":
+            await self.session.aclose()
+        else:
+            await self.session.close()
+
+class ProviderHTTPClient:
+    """Process-wide pooled HTTP client for search provider APIs"""
+
+    def __init__(self):
+        self.pool_size = int(os.getenv("SEARCH_HTTP_POOL_SIZE", "100"))
+        self.pool_per_host = int(os.getenv("SEARCH_HTTP_POOL_PER_HOST", "20"))
+        self.keepalive = float(os.getenv("SEARCH_HTTP_KEEPALIVE", "30"))
+        self.dns_ttl = int(os.getenv("SEARCH_HTTP_DNS_TTL", "300"))
+        self.timeout = float(os.getenv("SEARCH_HTTP_TIMEOUT", "15"))
+        self.provider_limit = int(os.getenv("SEARCH_HTTP_PROVIDER_LIMIT", "8"))
+        self.provider_limits = self._parse_limits(os.getenv("SEARCH_HTTP_LIMITS", ""))
+        self.http2 = os.getenv("SEARCH_HTTP2", "false").lower() == "true" and HTTP2_AVAILABLE
+
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopPool]" = weakref.WeakKeyDictionary()
+        self.providers: Dict[str, ProviderStats] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections = {"created": 0, "reused": 0, "dns_cache_hits": 0, "dns_cache_misses": 0}
+
+    @staticmethod
+    def _parse_limits(spec: str) -> Dict[str, int]:
+        limits = {}
+        for item in spec.split(","):
+            name, _, value = item.partition("=")
+            if name.strip() and value.strip():
+                limits[name.strip()] = int(value)
+        return limits
+
+    @property
+    def backend(self) -> str:
+        return "httpx-http2" if self.http2 else "aiohttp"
+
+    def limit_for(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.provider_limit)
+
+    # === Lifecycle ===
+
+    async def start(self):
+        """Open the pool for the running loop (startup hook)"""
+        self._pool()
+        logger.info(f"Search HTTP pool started ({self.backend}, {self.pool_size} connections, "
+                    f"{self.pool_per_host} per host)")
+
+    async def close(self):
+        """Close the pool of the running loop and forget pools of closed loops (shutdown hook)"""
+        loop = asyncio.get_running_loop()
+        pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool.close()
+        for other in [other for other in self._pools if other.is_closed()]:
+            self._pools.pop(other, None)
+
+    def _pool(self) -> _LoopPool:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = self._open()
+            self._pools[loop] = pool
+        return pool
+
+    def _open(self) -> _LoopPool:
+        if self.http2:
+            client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive,
+                ),
+            )
+            return _LoopPool(client, "httpx")
+
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp is required for search provider requests")
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._count("created"))
+        trace.on_connection_reuseconn.append(self._count("reused"))
+        trace.on_dns_cache_hit.append(self._count("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(self._count("dns_cache_misses"))
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[trace],
+        )
+        return _LoopPool(session, "aiohttp")
+
+    def _count(self, counter: str):
+        async def on_event(session, context, params):
+            self.connections[counter] += 1
+        return on_event
+
+    # === Requests ===
+
+    async def fetch_json(
+        self,
+        provider: str,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, Any]:
+        """(HTTP status, decoded JSON body) for one provider request
+
+        The body is None unless the status is 200. Waits for a slot under the
+        provider's concurrency limit first; network errors propagate.
+        """
+        pool = self._pool()
+        stats = self.providers.get(provider)
+        if stats is None:
+            stats = self.providers[provider] = ProviderStats(self.limit_for(provider))
+        semaphore = pool.semaphore(provider, stats.limit)
+
+        queued = time.perf_counter()
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.wait_seconds += time.perf_counter() - queued
+
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if pool.backend == "httpx":
+                response = await pool.session.request(
+                    method, url, params=params, json=json, headers=headers,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+                status = response.status_code
+                data = response.json() if status == 200 else None
+            else:
+                options = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+                async with pool.session.request(method, url, params=params, json=json,
+                                                headers=headers, **options) as response:
+                    status = response.status
+                    # Some providers label JSON as text/javascript
+                    data = await response.json(content_type=None) if status == 200 else None
+            if status != 200:
+                stats.errors += 1
+            return status, data
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            self.in_flight -= 1
+            semaphore.release()
+
+    # === Metrics ===
+
+    def stats(self) -> Dict[str, Any]:
+        connections = dict(self.connections)
+        opened = connections["created"] + connections["reused"]
+        connections["reuse_ratio"] = round(connections["reused"] / opened, 3) if opened else 0.0
+        return {
+            "backend": self.backend,
+            "pools": len(self._pools),
+            "pool_size": self.pool_size,
+            "pool_per_host": self.pool_per_host,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "utilization": round(self.in_flight / self.pool_size, 3),
+            "peak_utilization": round(self.peak_in_flight / self.pool_size, 3),
+            "connections": connections,
+            "providers": {name: stats.to_dict() for name, stats in self.providers.items()},
+        }
+
+# Global provider HTTP client
+provider_http = ProviderHTTPClient()
@@ -2,29 +2,47 @@
 Orchestra AI Services Package
 
 This package contains all the microservices for the Orchestra AI admin interface.
+
+Exports are imported on first access, so importing one submodule does not load
+the others. Extraction workers rely on this: they import services.extractors
+and must not pull in the web framework, database and embedding stack.
 """
 
-from .file_service import (
-    enhanced_file_service, 
-    EnhancedFileService,
-    FileUploadRequest, 
-    FileUploadResponse,
-    FileProcessingStatus,
-    FileSearchRequest,
-    FileSearchResult
-)
-from .file_processor import file_processor
-from .websocket_service import websocket_service, heartbeat_task
+import importlib
+
+# Exported name -> submodule defining it
+_EXPORTS = {
+    'enhanced_file_service': 'file_service',
+    'EnhancedFileService': 'file_service',
+    'FileUploadRequest': 'file_service',
+    'FileUploadResponse': 'file_service',
+    'FileProcessingStatus': 'file_service',
+    'FileSearchRequest': 'file_service',
+    'FileSearchResult': 'file_service',
+    'UploadResumeStatus': 'file_service',
+    'file_processor': 'file_processor',
+    'embedding_cache': 'embedding_cache',
+    'EmbeddingCache': 'embedding_cache',
+    'extraction_pool': 'extraction_pool',
+    'ExtractionPool': 'extraction_pool',
+    'embedding_service': 'embedding_service',
+    'EmbeddingService': 'embedding_service',
+    'blob_store': 'blob_store',
+    'BlobStore': 'blob_store',
+    'job_queue': 'job_queue',
+    'JobQueue': 'job_queue',
+    'JobWorker': 'job_queue',
+    'IngestPipeline': 'ingest_pipeline',
+    'websocket_service': 'websocket_service',
+    'heartbeat_task': 'websocket_service'
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'enhanced_file_service',
-    'EnhancedFileService',
-    'FileUploadRequest',
-    'FileUploadResponse', 
-    'FileProcessingStatus',
-    'FileSearchRequest',
-    'FileSearchResult',
-    'file_processor',
-    'websocket_service',
-    'heartbeat_task'
-] 
\ No newline at end of file
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    # Importing the submodule bound its name here; the export takes precedence
+    globals()[name] = value
+    return value
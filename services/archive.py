@@ -0,0 +1,184 @@
+"""
+Archive Reading
+
+Sequential, limit-enforcing access to zip and tar members, and to the one
+member of a gzip, bzip2 or xz compressed file. Members are read
+as streams and spooled one at a time into a scratch directory, so an archive
+is never unpacked as a whole; the caller processes and deletes each spooled
+member. Sizes are counted while reading rather than taken from headers, so
+forged headers do not get past the limits:
+
+    ARCHIVE_MAX_MEMBERS      members extracted per archive
+    ARCHIVE_MAX_MEMBER_MB    uncompressed size of any single member
+    ARCHIVE_MAX_TOTAL_MB     uncompressed size of all members together
+    ARCHIVE_MAX_RATIO        uncompressed bytes per archive byte
+
+Directories, links, devices, encrypted members and nested archives are
+skipped. Member names are only used as labels; nothing is written to a path
+taken from the archive.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Iterator, List, Optional, Tuple
+
+try:
+    from services.file_types import HEADER_BYTES
+except ImportError:
+    from .file_types import HEADER_BYTES
+
+# Single-stream compressions: file type -> opener
+COMPRESSED_OPENERS = {'gz': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+COMPRESSED_SUFFIXES = {'.gz', '.bz2', '.xz'}
+
+NESTED_ARCHIVE_SUFFIXES = {'.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar'}
+COPY_BUFFER = 1024 * 1024
+
+class ArchiveLimitExceeded(Exception):
+    """The archive expands beyond the configured limits (likely a zip bomb)"""
+
+class UnsupportedArchive(Exception):
+    """The file is not an archive or compressed file this reader can stream"""
+
+class SpooledMember:
+    """An archive member copied to a scratch file, with its leading bytes for type detection"""
+
+    __slots__ = ("name", "path", "size", "head")
+
+    def __init__(self, name: str, path: Path, size: int, head: bytes):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.head = head
+
+def compressed_member_name(file_path: Path) -> str:
+    """Name of the file inside a single-stream compressed file: notes.csv.gz -> notes.csv"""
+    if file_path.suffix.lower() in COMPRESSED_SUFFIXES:
+        return file_path.stem
+    return file_path.name
+
+class ArchiveReader:
+    """Stream members out of a zip or tar archive under size limits
+
+    With compression ('gz', 'bz2' or 'xz') the file is a single compressed
+    stream instead, read as an archive of one member under the same limits.
+    """
+
+    def __init__(self, file_path: Path, compression: Optional[str] = None):
+        self.file_path = file_path
+        self.archive_size = max(file_path.stat().st_size, 1)
+        self.max_members = int(os.getenv("ARCHIVE_MAX_MEMBERS", "1000"))
+        self.max_member_bytes = int(os.getenv("ARCHIVE_MAX_MEMBER_MB", "200")) * 1024 * 1024
+        self.max_total_bytes = int(os.getenv("ARCHIVE_MAX_TOTAL_MB", "1024")) * 1024 * 1024
+        self.max_ratio = float(os.getenv("ARCHIVE_MAX_RATIO", "100"))
+
+        self.members = 0
+        self.total_bytes = 0
+        self.skipped: List[Tuple[str, str]] = []
+
+        if compression is not None:
+            if compression not in COMPRESSED_OPENERS:
+                raise UnsupportedArchive(f"unknown compression {compression}")
+            self.kind = compression
+            self._archive = COMPRESSED_OPENERS[compression](file_path, "rb")
+            self._entries = self._compressed_entries(compressed_member_name(file_path))
+        elif zipfile.is_zipfile(file_path):
+            self.kind = "zip"
+            self._archive = zipfile.ZipFile(file_path)
+            self._entries = self._zip_entries()
+        else:
+            try:
+                # Stream mode: one forward pass, no member index built up front
+                self._archive = tarfile.open(file_path, mode="r|*")
+            except tarfile.TarError as e:
+                raise UnsupportedArchive(str(e))
+            self.kind = "tar"
+            self._entries = self._tar_entries()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._archive.close()
+
+    # === Members ===
+
+    def _skip(self, name: str, reason: str):
+        if len(self.skipped) < 100:
+            self.skipped.append((name, reason))
+
+    def _zip_entries(self) -> Iterator[Tuple[str, IO[bytes]]]:
+        for info in self._archive.infolist():
+            if info.is_dir():
+                continue
+            if info.flag_bits & 0x1:
+                self._skip(info.filename, "encrypted")
+                continue
+            with self._archive.open(info) as stream:
+                yield info.filename, stream
+
+    def _tar_entries(self) -> Iterator[Tuple[str, IO[bytes]]]:
+        for info in self._archive:
+            if info.isdir():
+                continue
+            if not info.isfile():
+                self._skip(info.name, "not a regular file")
+                continue
+            stream = self._archive.extractfile(info)
+            if stream is not None:
+                yield info.name, stream
+
+    def _compressed_entries(self, name: str) -> Iterator[Tuple[str, IO[bytes]]]:
+        yield name, self._archive
+
+    def next_member(self, spool_dir: str) -> Optional[SpooledMember]:
+        """Copy the next processable member into spool_dir (blocking); None when done
+
+        Raises ArchiveLimitExceeded as soon as a limit is crossed.
+        """
+        for name, stream in self._entries:
+            suffix = PurePosixPath(name).suffix.lower()
+            if suffix in NESTED_ARCHIVE_SUFFIXES:
+                self._skip(name, "nested archive")
+                continue
+            if self.members >= self.max_members:
+                raise ArchiveLimitExceeded(f"more than {self.max_members} members")
+
+            self.members += 1
+            path = Path(spool_dir) / f"{self.members:06d}{suffix}"
+            size, head = self._copy(name, stream, path)
+            return SpooledMember(name, path, size, head)
+        return None
+
+    def _copy(self, name: str, stream: IO[bytes], path: Path) -> Tuple[int, bytes]:
+        size = 0
+        head = b""
+        try:
+            with open(path, "wb") as out:
+                while True:
+                    block = stream.read(COPY_BUFFER)
+                    if not block:
+                        break
+                    size += len(block)
+                    self.total_bytes += len(block)
+                    if size > self.max_member_bytes:
+                        raise ArchiveLimitExceeded(f"{name} is larger than {self.max_member_bytes // (1024 * 1024)} MB")
+                    if self.total_bytes > self.max_total_bytes:
+                        raise ArchiveLimitExceeded(f"contents exceed {self.max_total_bytes // (1024 * 1024)} MB")
+                    if self.total_bytes / self.archive_size > self.max_ratio:
+                        raise ArchiveLimitExceeded(f"compression ratio above {self.max_ratio:g}")
+                    if not head:
+                        head = block[:HEADER_BYTES]
+                    out.write(block)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return size, head
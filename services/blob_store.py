@@ -0,0 +1,164 @@
+"""
+Content-Addressed Blob Store
+
+Uploaded bytes are stored once per SHA-256 checksum under
+uploads/blobs/<first two hex digits>/<checksum><extension>. A ContentBlob row
+counts the FileRecords referencing the content and keeps the extraction
+results of the first successful processing run, together with the file whose
+id tags its vectors, so a duplicate upload only needs a new FileRecord that
+points at existing data.
+"""
+
+import os
+import asyncio
+from pathlib import Path
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update, delete
+import structlog
+
+try:
+    from database.models import ContentBlob, FileRecord, FileStatus, PersonaType
+except ImportError:
+    from ..database.models import ContentBlob, FileRecord, FileStatus, PersonaType
+
+logger = structlog.get_logger(__name__)
+
+class BlobStore:
+    """Reference-counted file content keyed by checksum"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, checksum: str, suffix: str = "") -> Path:
+        return self.root / checksum[:2] / f"{checksum}{suffix.lower()}"
+
+    def owns(self, storage_path: Optional[str]) -> bool:
+        """Whether a storage path lives in the blob store (older uploads do not)"""
+        if not storage_path:
+            return False
+        return Path(storage_path).resolve().is_relative_to(self.root.resolve())
+
+    # === References ===
+
+    async def acquire(self, db: AsyncSession, checksum: str, source_path: Path,
+                      file_size: int, suffix: str = "") -> ContentBlob:
+        """Add a reference to the content, storing source_path if it is new
+
+        The source file is consumed: moved into the store, or removed when the
+        content is already there. The caller commits.
+        """
+        blob = await self._increment(db, checksum)
+        if blob is None:
+            path = self.path_for(checksum, suffix)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(os.replace, source_path, path)
+            try:
+                async with db.begin_nested():
+                    blob = ContentBlob(checksum=checksum, storage_path=str(path),
+                                       file_size=file_size, ref_count=1)
+                    db.add(blob)
+                return blob
+            except IntegrityError:
+                # A concurrent upload of the same content created the row first
+                blob = await self._increment(db, checksum)
+                if blob is None:
+                    raise
+                if Path(blob.storage_path) != path:
+                    await asyncio.to_thread(path.unlink, missing_ok=True)
+                return blob
+
+        if Path(blob.storage_path).exists():
+            await asyncio.to_thread(source_path.unlink, missing_ok=True)
+        else:
+            # Stored copy went missing; the new upload replaces it
+            await asyncio.to_thread(os.replace, source_path, blob.storage_path)
+        logger.info("Reused stored content", checksum=checksum, references=blob.ref_count)
+        return blob
+
+    async def _increment(self, db: AsyncSession, checksum: str) -> Optional[ContentBlob]:
+        result = await db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.checksum == checksum)
+            .values(ref_count=ContentBlob.ref_count + 1)
+        )
+        if not result.rowcount:
+            return None
+        result = await db.execute(
+            select(ContentBlob)
+            .where(ContentBlob.checksum == checksum)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    async def release(self, db: AsyncSession, checksum: str) -> Optional[Path]:
+        """Drop one reference; returns the file to delete after commit if it was the last"""
+        await db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.checksum == checksum)
+            .values(ref_count=ContentBlob.ref_count - 1)
+        )
+        result = await db.execute(
+            delete(ContentBlob)
+            .where(ContentBlob.checksum == checksum, ContentBlob.ref_count <= 0)
+            .returning(ContentBlob.storage_path)
+        )
+        storage_path = result.scalar_one_or_none()
+        return Path(storage_path) if storage_path else None
+
+    # === Processing results ===
+
+    @staticmethod
+    def vector_key(file_record: FileRecord) -> str:
+        """The file_id that tags this record's vectors in the vector store"""
+        return str(file_record.vector_source_id or file_record.id)
+
+    @staticmethod
+    def can_reuse(blob: ContentBlob, persona_type: PersonaType, embedding_model: str) -> bool:
+        """Stored results apply when the vectors were built the same way"""
+        return (
+            blob.vector_source_id is not None
+            and blob.persona_type == persona_type
+            and blob.embedding_model == embedding_model
+        )
+
+    @staticmethod
+    def apply(blob: ContentBlob, file_record: FileRecord):
+        """Complete a duplicate upload from the stored results, sharing its vectors"""
+        file_record.extracted_text = blob.extracted_text
+        file_record.extracted_metadata = blob.extracted_metadata
+        file_record.embedding_model = blob.embedding_model
+        file_record.embedding_dimensions = blob.embedding_dimensions
+        file_record.chunk_count = blob.chunk_count
+        file_record.vector_source_id = blob.vector_source_id
+        file_record.status = FileStatus.COMPLETED
+        file_record.processing_completed = datetime.utcnow()
+        file_record.processing_progress = 1.0
+
+    @staticmethod
+    def record(blob: ContentBlob, file_record: FileRecord, persona_type: PersonaType):
+        """Keep a completed processing run for later duplicates, unless one is kept already"""
+        if blob.vector_source_id is not None or file_record.status != FileStatus.COMPLETED:
+            return
+        blob.file_type = file_record.file_type
+        blob.mime_type = file_record.mime_type
+        blob.extracted_text = file_record.extracted_text
+        blob.extracted_metadata = file_record.extracted_metadata
+        blob.persona_type = persona_type
+        blob.embedding_model = file_record.embedding_model
+        blob.embedding_dimensions = file_record.embedding_dimensions
+        blob.chunk_count = file_record.chunk_count
+        blob.vector_source_id = BlobStore.vector_key(file_record)
+
+    async def forget_vectors(self, db: AsyncSession, vector_key: str):
+        """Stop offering vectors that are about to be deleted"""
+        await db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.vector_source_id == vector_key)
+            .values(vector_source_id=None)
+        )
+
+# Global blob store instance
+blob_store = BlobStore(Path(os.getenv("UPLOAD_DIR", "./uploads")) / "blobs")
@@ -0,0 +1,211 @@
+"""
+Text Chunking
+
+Token-aware chunking for embedding. Text arrives as a stream of
+(page, text) segments and is cut, in a single pass, into structural units:
+headings, then paragraphs, then sentences. Units are packed into chunks up to
+the embedding model's token limit, carrying a few trailing units over as
+overlap. Headings always start a new chunk. A sentence longer than the limit
+is split on token offsets. Each unit is tokenized once, so chunking is linear
+in the input.
+
+The previous character-based splitter is kept as iter_character_chunks for
+benchmarks (scripts/benchmark_chunker.py).
+"""
+
+import os
+import re
+import bisect
+from collections import deque
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
+
+Segment = Tuple[Optional[int], str]
+Chunk = Tuple[str, Optional[int], Optional[int]]
+
+_PARAGRAPH = re.compile(r"\S[^\n]*(?:\n[ \t]*\S[^\n]*)*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_HEADING = re.compile(r"^(?:#{1,6}\s+\S.*|\d+(?:\.\d+)*\.?\s+[A-Z][^.!?]{0,80})$")
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free token estimate: words and punctuation marks"""
+    return len(_WORD.findall(text))
+
+class _Unit:
+    __slots__ = ("text", "tokens", "page", "separator", "heading")
+
+    def __init__(self, text: str, tokens: int, page: Optional[int], separator: str, heading: bool = False):
+        self.text = text
+        self.tokens = tokens
+        self.page = page
+        self.separator = separator
+        self.heading = heading
+
+class TokenChunker:
+    """Single-pass, structure-aware chunker bounded by model tokens"""
+
+    def __init__(self, tokenizer: Any = None, max_tokens: Optional[int] = None,
+                 overlap_tokens: Optional[int] = None):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens or int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+        overlap = overlap_tokens if overlap_tokens is not None else int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+        self.overlap_tokens = min(overlap, self.max_tokens // 2)
+
+    @classmethod
+    def for_model(cls, model: Any) -> "TokenChunker":
+        """Build a chunker from a loaded SentenceTransformer's tokenizer and sequence limit"""
+        tokenizer = getattr(model, "tokenizer", None)
+        limit = getattr(model, "max_seq_length", None) or 256
+        configured = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+        # Leave room for the [CLS]/[SEP] style special tokens the model adds
+        max_tokens = min(configured, limit - 2) if configured else limit - 2
+        return cls(tokenizer=tokenizer, max_tokens=max_tokens)
+
+    # === Token counting ===
+
+    def _count(self, texts: List[str]) -> List[int]:
+        if self.tokenizer is None or not texts:
+            return [estimate_tokens(text) for text in texts]
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_long(self, text: str) -> List[Tuple[str, int]]:
+        """Cut an over-long sentence into windows of at most max_tokens"""
+        step = self.max_tokens
+        if self.tokenizer is not None:
+            try:
+                offsets = self.tokenizer(text, add_special_tokens=False,
+                                         return_offsets_mapping=True)["offset_mapping"]
+                return [
+                    (text[offsets[i][0]:offsets[min(i + step, len(offsets)) - 1][1]],
+                     min(step, len(offsets) - i))
+                    for i in range(0, len(offsets), step)
+                ]
+            except (NotImplementedError, KeyError, TypeError):
+                pass  # Slow tokenizers have no offsets; fall back to words
+
+        words = [m.span() for m in _WORD.finditer(text)]
+        return [
+            (text[words[i][0]:words[min(i + step, len(words)) - 1][1]], min(step, len(words) - i))
+            for i in range(0, len(words), step)
+        ]
+
+    # === Units ===
+
+    def _units(self, segments: Iterable[Segment]) -> Iterator[_Unit]:
+        first = True
+        for page, text in segments:
+            for match in _PARAGRAPH.finditer(text):
+                paragraph = match.group()
+                if _HEADING.match(paragraph) and "\n" not in paragraph:
+                    sentences, heading = [paragraph], True
+                else:
+                    sentences, heading = [s for s in _SENTENCE_BREAK.split(paragraph) if s], False
+
+                for index, (sentence, tokens) in enumerate(zip(sentences, self._count(sentences))):
+                    separator = "" if first else (" " if index else "\n\n")
+                    first = False
+                    if tokens <= self.max_tokens:
+                        yield _Unit(sentence, tokens, page, separator, heading)
+                        continue
+                    for part_index, (part, part_tokens) in enumerate(self._split_long(sentence)):
+                        yield _Unit(part, part_tokens, page, separator if part_index == 0 else " ")
+
+    # === Chunking ===
+
+    def iter_chunks(self, segments: Iterable[Segment]) -> Iterator[Chunk]:
+        """Yield (chunk text, first page, last page) for a stream of (page, text) segments"""
+        current: Deque[_Unit] = deque()
+        tokens = 0
+        fresh = False  # current holds something beyond carried-over overlap
+
+        def emit() -> Chunk:
+            text = "".join((unit.separator if i else "") + unit.text for i, unit in enumerate(current))
+            return text.strip(), current[0].page, current[-1].page
+
+        for unit in self._units(segments):
+            if fresh and (unit.heading or tokens + unit.tokens > self.max_tokens):
+                yield emit()
+                if unit.heading:
+                    current.clear()
+                    tokens = 0
+                else:
+                    # Keep trailing units that fit in the overlap budget
+                    carried, carried_tokens = [], 0
+                    for previous in reversed(current):
+                        if carried_tokens + previous.tokens > self.overlap_tokens:
+                            break
+                        carried.append(previous)
+                        carried_tokens += previous.tokens
+                    current = deque(reversed(carried))
+                    tokens = carried_tokens
+                    # Drop overlap that would still not leave room for this unit
+                    while current and tokens + unit.tokens > self.max_tokens:
+                        tokens -= current.popleft().tokens
+                fresh = False
+
+            current.append(unit)
+            tokens += unit.tokens
+            fresh = True
+
+        if fresh:
+            yield emit()
+
+    def split(self, text: str) -> List[str]:
+        return [chunk for chunk, _, _ in self.iter_chunks([(None, text)])]
+
+def iter_character_chunks(segments: Iterable[Segment], chunk_size: int = 1000,
+                          overlap: int = 200) -> Iterator[Chunk]:
+    """Previous character-window splitter with rfind boundary search (benchmark baseline)"""
+    buffer = ""
+    offset = 0          # absolute position of buffer[0]
+    start = 0           # absolute position of the next chunk
+    page_offsets: List[int] = []
+    pages: List[Optional[int]] = []
+
+    def page_at(position: int) -> Optional[int]:
+        index = bisect.bisect_right(page_offsets, position) - 1
+        return pages[max(index, 0)] if pages else None
+
+    def next_chunk(final: bool) -> Chunk:
+        nonlocal start
+        local = start - offset
+        end = local + chunk_size
+
+        # Try to break at sentence or paragraph boundary
+        if end < len(buffer):
+            for boundary in ['. ', '.\n', '!\n', '?\n']:
+                boundary_pos = buffer.rfind(boundary, local, end)
+                if boundary_pos > local:
+                    end = boundary_pos + len(boundary)
+                    break
+        end = min(end, len(buffer))
+
+        chunk = (buffer[local:end].strip(), page_at(start), page_at(offset + end - 1))
+        start = len(buffer) + offset if final and end >= len(buffer) else max(offset + end - overlap, start + 1)
+        return chunk
+
+    for page, text in segments:
+        if buffer:
+            buffer += "\n\n"
+        page_offsets.append(offset + len(buffer))
+        pages.append(page)
+        buffer += text
+
+        while len(buffer) - (start - offset) > chunk_size:
+            chunk = next_chunk(final=False)
+            if chunk[0]:
+                yield chunk
+
+        # Discard text before the next chunk start
+        if start > offset:
+            keep = bisect.bisect_right(page_offsets, start) - 1
+            del page_offsets[:max(keep, 0)]
+            del pages[:max(keep, 0)]
+            buffer = buffer[start - offset:]
+            offset = start
+
+    while start < offset + len(buffer):
+        chunk = next_chunk(final=True)
+        if chunk[0]:
+            yield chunk
@@ -0,0 +1,237 @@
+"""
+Embedding Cache
+
+Content-addressed cache for chunk embeddings, keyed by (model name, sha256 of
+the chunk text). A bounded in-memory LRU sits in front of a SQLite file, so
+re-uploaded documents and documents sharing chunks with earlier versions are
+never encoded twice, including across restarts and worker processes.
+
+The async path keeps SQLite off the event loop and coalesces concurrent
+misses: a chunk already being encoded for another request is awaited rather
+than encoded again.
+"""
+
+import os
+import asyncio
+import sqlite3
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, hash)
+) WITHOUT ROWID;
+"""
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + on-disk) embedding cache with hit metrics"""
+
+    def __init__(self, path: Optional[str] = None, memory_size: Optional[int] = None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite")
+        self.memory_size = memory_size or int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+        self.enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Per event loop: (model, hash) -> future of a vector being encoded
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        self.metrics = {
+            "lookups": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "batch_duplicates": 0,
+            "coalesced": 0,
+            "encoded": 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    # === Lookups ===
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the given hashes, memory first then disk"""
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        with self._lock:
+            for content_hash in hashes:
+                key = (model, content_hash)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[content_hash] = vector
+                else:
+                    missing.append(content_hash)
+            self.metrics["memory_hits"] += len(found)
+
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self._connection().execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for content_hash, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[content_hash] = vector
+                    self._remember((model, content_hash), vector)
+                self.metrics["disk_hits"] += len(rows)
+
+            self.metrics["lookups"] += len(hashes)
+            self.metrics["misses"] += len(hashes) - len(found)
+
+        return found
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]):
+        """Store freshly encoded vectors in both tiers"""
+        if not items:
+            return
+        with self._lock:
+            rows = []
+            for content_hash, vector in items.items():
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember((model, content_hash), vector)
+                rows.append((model, content_hash, vector.tobytes()))
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)", rows
+                )
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    # === Encoding ===
+
+    def encode(self, model: str, texts: List[str],
+               encoder: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Embed texts, encoding only chunks not seen before
+
+        Duplicate chunks within the batch are encoded once as well. Returns a
+        (len(texts), dim) float32 matrix in input order.
+        """
+        if not self.enabled:
+            self.metrics["encoded"] += len(texts)
+            return np.asarray(encoder(texts), dtype=np.float32)
+
+        hashes, vectors, pending = self._plan(model, texts)
+        if pending:
+            self._fill(model, vectors, pending, encoder([text for _, text in pending]))
+        return np.vstack([vectors[content_hash] for content_hash in hashes])
+
+    async def aencode(self, model: str, texts: List[str],
+                      encoder: Callable[[List[str]], Awaitable[np.ndarray]]) -> np.ndarray:
+        """Async variant of encode for coroutine encoders such as the embedding service
+
+        Cache reads and writes run in a worker thread. Chunks another caller
+        on this loop is already encoding are awaited instead of re-encoded.
+        """
+        if not self.enabled:
+            self.metrics["encoded"] += len(texts)
+            return np.asarray(await encoder(texts), dtype=np.float32)
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        hashes = [self.content_hash(text) for text in texts]
+        text_by_hash = dict(zip(hashes, texts))
+        self.metrics["batch_duplicates"] += len(hashes) - len(text_by_hash)
+
+        lookup = [h for h in text_by_hash if (model, h) not in inflight]
+        vectors = await asyncio.to_thread(self.get_many, model, lookup) if lookup else {}
+
+        # Checked after the lookup: another caller may have started meanwhile
+        tasks = {}
+        for h in text_by_hash:
+            if h not in vectors and (model, h) in inflight:
+                tasks.setdefault(inflight[(model, h)], []).append(h)
+        self.metrics["coalesced"] += sum(len(waiting) for waiting in tasks.values())
+
+        pending = [(h, text_by_hash[h]) for h in lookup if h not in vectors and (model, h) not in inflight]
+        if pending:
+            # A task of its own, so the encode outlives a cancelled first caller
+            task = loop.create_task(self._encode_pending(model, pending, encoder))
+            for h, _ in pending:
+                inflight[(model, h)] = task
+
+            def forget(done: asyncio.Task):
+                for h, _ in pending:
+                    inflight.pop((model, h), None)
+                if not done.cancelled():
+                    done.exception()  # retrieved even if every caller was cancelled
+
+            task.add_done_callback(forget)
+            tasks[task] = [h for h, _ in pending]
+
+        for task in tasks:
+            vectors.update(await asyncio.shield(task))
+        return np.vstack([vectors[content_hash] for content_hash in hashes])
+
+    async def _encode_pending(self, model: str, pending: List[Tuple[str, str]],
+                              encoder: Callable[[List[str]], Awaitable[np.ndarray]]) -> Dict[str, np.ndarray]:
+        encoded = await encoder([text for _, text in pending])
+        fresh = dict(zip((h for h, _ in pending), np.asarray(encoded, dtype=np.float32)))
+        self.metrics["encoded"] += len(pending)
+        await asyncio.to_thread(self.put_many, model, fresh)
+        return fresh
+
+    def _plan(self, model: str, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray], List[Tuple[str, str]]]:
+        """Hash texts and split them into cached vectors and (hash, text) still to encode"""
+        hashes = [self.content_hash(text) for text in texts]
+        text_by_hash = dict(zip(hashes, texts))
+        self.metrics["batch_duplicates"] += len(hashes) - len(text_by_hash)
+
+        vectors = self.get_many(model, list(text_by_hash))
+        pending = [(h, text) for h, text in text_by_hash.items() if h not in vectors]
+        return hashes, vectors, pending
+
+    def _fill(self, model: str, vectors: Dict[str, np.ndarray],
+              pending: List[Tuple[str, str]], encoded: np.ndarray):
+        fresh = dict(zip((h for h, _ in pending), np.asarray(encoded, dtype=np.float32)))
+        self.put_many(model, fresh)
+        vectors.update(fresh)
+        self.metrics["encoded"] += len(pending)
+
+    # === Metrics ===
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.metrics["lookups"]
+        hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_hit_rate": round(self.metrics["memory_hits"] / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.memory_size,
+        }
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,223 @@
+"""
+Embedding Service
+
+Shared, device-aware sentence embedding engine. Requests from concurrent
+uploads and searches are queued and packed into micro-batches bounded by
+size (EMBEDDING_MAX_BATCH) and wait time (EMBEDDING_MAX_WAIT_MS), then
+encoded on a dedicated worker thread so the event loop never blocks.
+
+Query embeddings have their own queue and are always packed first, so a
+search waits for at most the batch currently being encoded, not for a
+large ingest backlog.
+
+Configuration:
+    EMBEDDING_MODEL        sentence-transformers model name
+    EMBEDDING_DEVICE       auto | cpu | cuda | mps
+    EMBEDDING_BACKEND      torch | onnx | openvino (ONNX/OpenVINO need sentence-transformers>=3.2)
+    EMBEDDING_ONNX_FILE    optional model file, e.g. onnx/model_qint8_avx512_vnni.onnx for a
+                           quantized CPU backend
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np
+import structlog
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SentenceTransformer = None
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+QUERY = "query"
+BULK = "bulk"
+
+class EmbeddingService:
+    """Micro-batching embedding engine with query priority"""
+
+    def __init__(self):
+        self.model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.device = os.getenv("EMBEDDING_DEVICE", "auto").lower()
+        self.backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+        self.onnx_file = os.getenv("EMBEDDING_ONNX_FILE")
+        self.max_batch = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+        self.max_wait = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")) / 1000
+
+        self.model = None
+        self._queues: Dict[str, Deque[Tuple[str, asyncio.Future]]] = {QUERY: deque(), BULK: deque()}
+        self._pending: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._init_lock: Optional[asyncio.Lock] = None
+        # One encoding thread: batches run back to back and torch keeps its own intra-op threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+        self.metrics = {
+            "batches": 0,
+            "texts": 0,
+            "query_texts": 0,
+            "bulk_texts": 0,
+            "encode_seconds": 0.0,
+        }
+
+    # === Model ===
+
+    @staticmethod
+    def _resolve_device(device: str) -> str:
+        if device != "auto":
+            return device
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return "cuda"
+            if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+                return "mps"
+        except ImportError:
+            pass
+        return "cpu"
+
+    def _load_model(self):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise RuntimeError("sentence-transformers is not installed")
+
+        device = self._resolve_device(self.device)
+        if self.backend != "torch":
+            model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+            try:
+                model = SentenceTransformer(self.model_name, device=device, backend=self.backend,
+                                            model_kwargs=model_kwargs)
+                logger.info("Loaded embedding model", model=self.model_name, device=device,
+                            backend=self.backend, file=self.onnx_file)
+                return model
+            except (TypeError, ValueError, ImportError) as e:
+                # Older sentence-transformers or missing optimum/onnxruntime
+                logger.warning("Embedding backend unavailable, using torch",
+                               backend=self.backend, error=str(e))
+                self.backend = "torch"
+
+        model = SentenceTransformer(self.model_name, device=device)
+        logger.info("Loaded embedding model", model=self.model_name, device=device, backend="torch")
+        return model
+
+    async def initialize(self):
+        """Load the model once, off the event loop"""
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.model is None:
+                loop = asyncio.get_running_loop()
+                self.model = await loop.run_in_executor(self._executor, self._load_model)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # === Encoding ===
+
+    async def encode(self, texts: List[str], priority: str = BULK) -> np.ndarray:
+        """Embed texts through the shared micro-batcher, in input order"""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self.model is None:
+            await self.initialize()
+        self._ensure_dispatcher()
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        queue = self._queues[QUERY if priority == QUERY else BULK]
+        for text in texts:
+            future = loop.create_future()
+            queue.append((text, future))
+            futures.append(future)
+        self._pending.set()
+
+        return np.vstack(await asyncio.gather(*futures))
+
+    async def encode_query(self, text: str) -> np.ndarray:
+        """Embed a single search query ahead of any queued ingest work"""
+        return (await self.encode([text], priority=QUERY))[0]
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._pending = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _take_batch(self) -> Tuple[List[Tuple[str, asyncio.Future]], int]:
+        """Pack up to max_batch items, queries first"""
+        batch: List[Tuple[str, asyncio.Future]] = []
+        queries = 0
+        for name in (QUERY, BULK):
+            queue = self._queues[name]
+            while queue and len(batch) < self.max_batch:
+                text, future = queue.popleft()
+                if future.cancelled():
+                    continue
+                batch.append((text, future))
+                queries += name == QUERY
+        return batch, queries
+
+    def _queued(self) -> int:
+        return len(self._queues[QUERY]) + len(self._queues[BULK])
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._pending.wait()
+
+            # Give concurrent callers a moment to fill the batch
+            if self._queued() < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+
+            batch, queries = self._take_batch()
+            if not self._queued():
+                self._pending.clear()
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            started = time.perf_counter()
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+                )
+            except Exception as e:
+                logger.error("Embedding batch failed", size=len(texts), error=str(e))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.metrics["batches"] += 1
+            self.metrics["texts"] += len(texts)
+            self.metrics["query_texts"] += queries
+            self.metrics["bulk_texts"] += len(texts) - queries
+            self.metrics["encode_seconds"] += time.perf_counter() - started
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(np.asarray(vector, dtype=np.float32))
+
+    # === Metrics ===
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.metrics["batches"]
+        return {
+            **self.metrics,
+            "encode_seconds": round(self.metrics["encode_seconds"], 3),
+            "avg_batch_size": round(self.metrics["texts"] / batches, 2) if batches else 0.0,
+            "queued_queries": len(self._queues[QUERY]),
+            "queued_bulk": len(self._queues[BULK]),
+            "model": self.model_name,
+            "backend": self.backend,
+            "device": str(self.model.device) if self.model is not None else None,
+        }
+
+# Global embedding service instance
+embedding_service = EmbeddingService()
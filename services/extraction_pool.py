@@ -0,0 +1,192 @@
+"""
+Extraction Worker Pool
+
+Runs the CPU-bound format handlers of services.extractors (pdfplumber,
+openpyxl, BeautifulSoup, ...) in a bounded process pool so parsing never
+blocks the API event loop. Each format has its own concurrency limit and
+timeout, and every worker process runs under an address-space cap.
+
+Workers are spawned rather than forked: by the time the first file arrives
+the API has loaded the embedding model and started executor threads, and a
+forked child would inherit both. A fresh worker imports only the handlers
+and their parser libraries - not FileProcessor, whose imports bring in the
+database, vector store and embedding stack - and only then caps its address
+space, so the cap is headroom for parsing on top of the interpreter and
+libraries, not a budget they already exhaust.
+
+Configuration:
+    EXTRACTION_WORKERS            pool size (default: CPU count)
+    EXTRACTION_MEMORY_LIMIT_MB    per-worker address space allowed beyond what the
+                                  worker maps at startup (default 2048, 0 = off)
+    EXTRACTION_START_METHOD       multiprocessing start method (default spawn)
+    EXTRACTION_CONCURRENCY        per-format limits, e.g. "pdf=4,xlsx=2"
+    EXTRACTION_TIMEOUTS           per-format seconds, e.g. "default=300,pdf=900"
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, Optional
+import structlog
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+# Memory-hungry parsers get fewer slots than the pool size by default
+DEFAULT_CONCURRENCY = {"xlsx": 2}
+DEFAULT_TIMEOUTS = {"default": 300, "pdf": 900, "xlsx": 600}
+
+class ExtractionTimeout(Exception):
+    """A format handler ran past its timeout and its worker was terminated"""
+
+def _parse_limits(value: Optional[str], defaults: Dict[str, float]) -> Dict[str, float]:
+    limits = dict(defaults)
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, number = item.split("=", 1)
+            limits[key.strip().lower()] = float(number)
+    return limits
+
+def _load_extractors():
+    try:
+        from services import extractors
+    except ImportError:
+        from . import extractors
+    return extractors
+
+def _mapped_bytes() -> Optional[int]:
+    """Current virtual size of this process, where /proc reports it"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _init_worker(memory_limit_mb: int):
+    """Import the handlers, then cap further address space growth
+
+    Keeps one pathological file from taking the host down without counting
+    the interpreter and parser libraries against the limit.
+    """
+    _load_extractors()
+    if memory_limit_mb and RESOURCE_AVAILABLE:
+        limit = memory_limit_mb * 1024 * 1024 + (_mapped_bytes() or 0)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _extract_in_worker(file_type: str, file_path: str) -> Dict[str, Any]:
+    """Run a format handler inside a pool worker"""
+    return _load_extractors().extract(file_type, Path(file_path))
+
+class ExtractionPool:
+    """Bounded process pool with per-format limits, timeouts and memory caps"""
+
+    def __init__(self):
+        self.workers = int(os.getenv("EXTRACTION_WORKERS", "0")) or os.cpu_count() or 2
+        self.memory_limit_mb = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "2048"))
+        self.start_method = os.getenv("EXTRACTION_START_METHOD", "spawn")
+        self.concurrency = _parse_limits(os.getenv("EXTRACTION_CONCURRENCY"), DEFAULT_CONCURRENCY)
+        self.timeouts = _parse_limits(os.getenv("EXTRACTION_TIMEOUTS"), DEFAULT_TIMEOUTS)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        self.metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "pool_restarts": 0,
+        }
+        self.in_flight: Dict[str, int] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb,)
+            )
+        return self._executor
+
+    def _semaphore(self, file_type: str) -> asyncio.Semaphore:
+        if file_type not in self._semaphores:
+            limit = int(self.concurrency.get(file_type, self.workers))
+            self._semaphores[file_type] = asyncio.Semaphore(max(1, min(limit, self.workers)))
+        return self._semaphores[file_type]
+
+    def _timeout(self, file_type: str) -> float:
+        return self.timeouts.get(file_type, self.timeouts["default"])
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Kill a pool whose worker hung or died; the next call starts a fresh one"""
+        if executor is not self._executor:
+            return
+        self._executor = None
+        self.metrics["pool_restarts"] += 1
+        # ProcessPoolExecutor cannot cancel a running task, so stop its processes
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def extract(self, file_type: str, file_path: Path) -> Dict[str, Any]:
+        """Extract content from a file in a worker process"""
+        loop = asyncio.get_running_loop()
+        timeout = self._timeout(file_type)
+
+        async with self._semaphore(file_type):
+            self.metrics["submitted"] += 1
+            self.in_flight[file_type] = self.in_flight.get(file_type, 0) + 1
+            try:
+                # One retry covers tasks caught in a pool recycled for someone else
+                for attempt in range(2):
+                    executor = self._get_executor()
+                    try:
+                        result = await asyncio.wait_for(
+                            loop.run_in_executor(executor, _extract_in_worker, file_type, str(file_path)),
+                            timeout
+                        )
+                        self.metrics["completed"] += 1
+                        return result
+                    except asyncio.TimeoutError:
+                        self.metrics["timeouts"] += 1
+                        self._recycle(executor)
+                        raise ExtractionTimeout(
+                            f"Extracting {file_path.name} ({file_type}) exceeded {timeout:.0f}s"
+                        )
+                    except BrokenProcessPool:
+                        self._recycle(executor)
+                        if attempt:
+                            raise
+                        logger.warning("Extraction worker died, retrying", file_type=file_type,
+                                       filename=file_path.name)
+            except Exception:
+                self.metrics["failed"] += 1
+                raise
+            finally:
+                self.in_flight[file_type] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "workers": self.workers,
+            "memory_limit_mb": self.memory_limit_mb,
+            "start_method": self.start_method,
+            "in_flight": {k: v for k, v in self.in_flight.items() if v},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Global extraction pool instance
+extraction_pool = ExtractionPool()
@@ -0,0 +1,614 @@
+"""
+Format Extractors
+
+Text and metadata extraction for every single-file format FileProcessor
+handles. These are plain synchronous functions with no imports from the rest
+of the app (database, vector store, embedding model), so extraction workers
+import only this module and its parser libraries before their address space
+is capped. FileProcessor runs the header-only handlers inline and everything
+else through services.extraction_pool; archives and compressed files are read
+in FileProcessor itself and fan their members out to these handlers.
+
+Paged handlers (PDF, and CSV/XLSX with TABULAR_ROW_CHUNKS) write their text to
+a JSON-lines sidecar next to the file and return only a bounded preview.
+
+Configuration:
+    EXTRACTED_TEXT_PREVIEW_CHARS  text kept on the record for paged files (default 100000)
+"""
+
+import os
+import json
+from contextlib import nullcontext
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+import structlog
+
+import PyPDF2
+import pdfplumber
+from docx import Document
+from bs4 import BeautifulSoup
+from PIL import Image
+
+try:
+    from services.tabular import (
+        TabularProfile, RowGroupWriter, profile_rows, iter_csv_rows, iter_sheets,
+        row_chunks_enabled, rows_per_chunk
+    )
+except ImportError:
+    from .tabular import (
+        TabularProfile, RowGroupWriter, profile_rows, iter_csv_rows, iter_sheets,
+        row_chunks_enabled, rows_per_chunk
+    )
+
+logger = structlog.get_logger(__name__)
+
+def text_preview_chars() -> int:
+    return int(os.getenv("EXTRACTED_TEXT_PREVIEW_CHARS", "100000"))
+
+class PagePreview:
+    """Accumulates page texts up to a character budget"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+        self.truncated = False
+    
+    def add(self, page_text: str):
+        if self.size >= self.limit:
+            self.truncated = True
+            return
+        part = page_text[:self.limit - self.size]
+        self.truncated = len(part) < len(page_text)
+        self.parts.append(part)
+        self.size += len(part) + 2
+    
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.parts)
+
+def iter_page_groups(pages_path: str) -> Iterator[Tuple[Optional[str], Iterator[Tuple[Optional[int], str]]]]:
+    """Read back (page number, text) pairs written by a paged extractor
+    
+    Pairs are grouped by archive member so chunks never span two members;
+    other extractors write no member and the file is a single group.
+    """
+    with open(pages_path, 'r', encoding='utf-8') as pages:
+        records = (json.loads(line) for line in pages)
+        for member, group in groupby(records, key=lambda record: record.get('member')):
+            yield member, ((record['page'], record['text']) for record in group)
+
+def extract_pdf(file_path: Path) -> Dict[str, Any]:
+    """Process PDF files
+
+    Pages are extracted one at a time and appended to a JSON-lines sidecar
+    next to the upload, so memory stays flat regardless of document size.
+    Only a bounded preview is returned as 'text'; embedding streams the
+    sidecar back through the chunker.
+    """
+    metadata = {}
+    pages_path = f"{file_path}.pages.jsonl"
+    
+    try:
+        # Try pdfplumber first for better text extraction
+        with pdfplumber.open(file_path) as pdf, open(pages_path, 'w', encoding='utf-8') as pages_out:
+            preview = PagePreview(text_preview_chars())
+            for page_number, page in enumerate(pdf.pages, start=1):
+                page_text = page.extract_text()
+                if page_text:
+                    pages_out.write(json.dumps({'page': page_number, 'text': page_text}) + "\n")
+                    preview.add(page_text)
+                # Drop the page's parsed objects before moving on
+                if hasattr(page, 'close'):
+                    page.close()
+                else:
+                    page.flush_cache()
+            
+            text = preview.text
+            metadata.update({
+                'pages': len(pdf.pages),
+                'producer': pdf.metadata.get('Producer', ''),
+                'creator': pdf.metadata.get('Creator', ''),
+                'title': pdf.metadata.get('Title', ''),
+                'author': pdf.metadata.get('Author', ''),
+                'text_truncated': preview.truncated,
+            })
+    
+    except Exception as e:
+        logger.warning("pdfplumber failed, trying PyPDF2", error=str(e))
+        
+        # Fallback to PyPDF2
+        try:
+            with open(file_path, 'rb') as file, open(pages_path, 'w', encoding='utf-8') as pages_out:
+                pdf_reader = PyPDF2.PdfReader(file)
+                preview = PagePreview(text_preview_chars())
+                
+                for page_number, page in enumerate(pdf_reader.pages, start=1):
+                    page_text = page.extract_text()
+                    if page_text:
+                        pages_out.write(json.dumps({'page': page_number, 'text': page_text}) + "\n")
+                        preview.add(page_text)
+                
+                text = preview.text
+                metadata.update({
+                    'pages': len(pdf_reader.pages),
+                    'title': pdf_reader.metadata.get('/Title', ''),
+                    'author': pdf_reader.metadata.get('/Author', ''),
+                    'text_truncated': preview.truncated,
+                })
+        
+        except Exception as e2:
+            logger.error("PDF processing failed", error=str(e2))
+            if os.path.exists(pages_path):
+                os.remove(pages_path)
+            raise
+    
+    return {
+        'text': text,
+        'metadata': metadata,
+        'content_type': 'document',
+        'pages_path': pages_path
+    }
+
+def extract_docx(file_path: Path) -> Dict[str, Any]:
+    """Process DOCX files"""
+    try:
+        doc = Document(file_path)
+        
+        # Extract text from paragraphs
+        paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
+        text = "\n\n".join(paragraphs)
+        
+        # Extract metadata
+        metadata = {
+            'title': doc.core_properties.title or '',
+            'author': doc.core_properties.author or '',
+            'created': str(doc.core_properties.created) if doc.core_properties.created else '',
+            'modified': str(doc.core_properties.modified) if doc.core_properties.modified else '',
+            'paragraphs': len(paragraphs),
+            'tables': len(doc.tables),
+            'images': len(doc.inline_shapes)
+        }
+        
+        return {
+            'text': text,
+            'metadata': metadata,
+            'content_type': 'document'
+        }
+        
+    except Exception as e:
+        logger.error("DOCX processing failed", error=str(e))
+        raise
+
+def extract_text(file_path: Path) -> Dict[str, Any]:
+    """Process plain text files"""
+    try:
+        encodings = ['utf-8', 'latin-1', 'cp1252']
+        text = ""
+        
+        for encoding in encodings:
+            try:
+                with open(file_path, 'r', encoding=encoding) as file:
+                    text = file.read()
+                break
+            except UnicodeDecodeError:
+                continue
+        
+        if not text:
+            raise Exception("Could not decode text file")
+        
+        # Basic text analysis
+        lines = text.split('\n')
+        words = text.split()
+        
+        metadata = {
+            'lines': len(lines),
+            'words': len(words),
+            'characters': len(text),
+            'encoding': encoding
+        }
+        
+        return {
+            'text': text,
+            'metadata': metadata,
+            'content_type': 'text'
+        }
+        
+    except Exception as e:
+        logger.error("Text processing failed", error=str(e))
+        raise
+
+def extract_markdown(file_path: Path) -> Dict[str, Any]:
+    """Process Markdown files"""
+    result = extract_text(file_path)
+    result['content_type'] = 'markdown'
+    
+    # Count markdown elements
+    text = result['text']
+    result['metadata'].update({
+        'headers': text.count('#'),
+        'links': text.count(']('),
+        'code_blocks': text.count('```'),
+        'bold_text': text.count('**'),
+        'italic_text': text.count('*')
+    })
+    
+    return result
+
+def extract_html(file_path: Path) -> Dict[str, Any]:
+    """Process HTML files"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extract text content
+        text = soup.get_text(separator='\n', strip=True)
+        
+        # Extract metadata
+        title = soup.find('title')
+        meta_tags = soup.find_all('meta')
+        
+        metadata = {
+            'title': title.get_text() if title else '',
+            'links': len(soup.find_all('a')),
+            'images': len(soup.find_all('img')),
+            'headings': len(soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])),
+            'meta_tags': len(meta_tags)
+        }
+        
+        # Extract meta tag information
+        for meta in meta_tags:
+            name = meta.get('name') or meta.get('property')
+            content = meta.get('content')
+            if name and content:
+                metadata[f'meta_{name}'] = content
+        
+        return {
+            'text': text,
+            'metadata': metadata,
+            'content_type': 'html'
+        }
+        
+    except Exception as e:
+        logger.error("HTML processing failed", error=str(e))
+        raise
+
+def extract_xml(file_path: Path) -> Dict[str, Any]:
+    """Process XML files"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        
+        soup = BeautifulSoup(content, 'xml')
+        
+        # Extract text content
+        text = soup.get_text(separator='\n', strip=True)
+        
+        # Count XML elements
+        all_tags = soup.find_all()
+        tag_counts = {}
+        for tag in all_tags:
+            tag_name = tag.name
+            if tag_name:
+                tag_counts[tag_name] = tag_counts.get(tag_name, 0) + 1
+        
+        # Basic XML analysis
+        metadata = {
+            'total_elements': len(all_tags),
+            'unique_tags': len(tag_counts),
+            'tag_counts': tag_counts,
+            'root_element': soup.find().name if soup.find() else 'unknown',
+            'namespaces': len(set(tag.prefix for tag in all_tags if tag.prefix))
+        }
+        
+        return {
+            'text': text,
+            'metadata': metadata,
+            'content_type': 'xml'
+        }
+        
+    except Exception as e:
+        logger.error("XML processing failed", error=str(e))
+        # Fallback to text processing
+        return extract_text(file_path)
+
+def extract_json(file_path: Path) -> Dict[str, Any]:
+    """Process JSON files"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        
+        # Convert to readable text
+        text = json.dumps(data, indent=2)
+        
+        # Analyze structure
+        def count_elements(obj, counts=None):
+            if counts is None:
+                counts = {'objects': 0, 'arrays': 0, 'primitives': 0}
+            
+            if isinstance(obj, dict):
+                counts['objects'] += 1
+                for value in obj.values():
+                    count_elements(value, counts)
+            elif isinstance(obj, list):
+                counts['arrays'] += 1
+                for item in obj:
+                    count_elements(item, counts)
+            else:
+                counts['primitives'] += 1
+            
+            return counts
+        
+        structure = count_elements(data)
+        
+        metadata = {
+            'size_bytes': len(text),
+            'objects': structure['objects'],
+            'arrays': structure['arrays'],
+            'primitives': structure['primitives'],
+            'top_level_keys': list(data.keys()) if isinstance(data, dict) else []
+        }
+        
+        return {
+            'text': text,
+            'metadata': metadata,
+            'content_type': 'structured_data'
+        }
+        
+    except Exception as e:
+        logger.error("JSON processing failed", error=str(e))
+        raise
+
+def extract_csv(file_path: Path) -> Dict[str, Any]:
+    """Process CSV files
+
+    Rows are streamed once into a profile (column types, nulls, ranges,
+    reservoir sample); with TABULAR_ROW_CHUNKS, row groups are also
+    written to a sidecar for embedding.
+    """
+    pages_path = f"{file_path}.pages.jsonl" if row_chunks_enabled() else None
+    try:
+        with open(pages_path, 'w', encoding='utf-8') if pages_path else nullcontext() as pages_out:
+            writer = RowGroupWriter(pages_out, rows_per_chunk()) if pages_path else None
+            profile = profile_rows(iter_csv_rows(str(file_path)), writer, label=file_path.name)
+        
+        if profile is None:
+            profile = TabularProfile([])
+        
+        metadata = {
+            'rows': profile.rows,
+            'columns': len(profile.columns),
+            'headers': profile.headers,
+            'column_stats': profile.column_stats(),
+            'sample_data': profile.sample,
+            'sample_method': 'reservoir'
+        }
+        
+        result = {
+            'text': "\n".join(profile.summary_lines()),
+            'metadata': metadata,
+            'content_type': 'tabular_data'
+        }
+        if writer is not None and writer.groups:
+            result['pages_path'] = pages_path
+            metadata['row_chunks'] = writer.groups
+        elif pages_path:
+            os.remove(pages_path)
+        return result
+        
+    except Exception as e:
+        logger.error("CSV processing failed", error=str(e))
+        if pages_path and os.path.exists(pages_path):
+            os.remove(pages_path)
+        raise
+
+def extract_excel(file_path: Path) -> Dict[str, Any]:
+    """Process Excel files
+
+    The workbook is opened read-only and each sheet is streamed once into
+    a profile, as for CSV.
+    """
+    pages_path = f"{file_path}.pages.jsonl" if row_chunks_enabled() else None
+    try:
+        text_parts = []
+        metadata = {}
+        sheet_names = []
+        
+        with open(pages_path, 'w', encoding='utf-8') if pages_path else nullcontext() as pages_out:
+            writer = RowGroupWriter(pages_out, rows_per_chunk()) if pages_path else None
+            for sheet_name, rows in iter_sheets(str(file_path)):
+                sheet_names.append(sheet_name)
+                text_parts.append(f"Sheet: {sheet_name}")
+                
+                profile = profile_rows(rows, writer, label=f"Sheet {sheet_name}")
+                if profile is None:
+                    metadata[f'sheet_{sheet_name}'] = {'rows': 0, 'columns': 0}
+                    continue
+                
+                text_parts.extend(profile.summary_lines())
+                metadata[f'sheet_{sheet_name}'] = {
+                    'rows': profile.rows,  # data rows, header excluded as for CSV
+                    'columns': len(profile.columns),
+                    'headers': profile.headers,
+                    'column_stats': profile.column_stats(),
+                    'sample_data': profile.sample
+                }
+        
+        metadata.update({
+            'sheets': len(sheet_names),
+            'sheet_names': sheet_names,
+            'sample_method': 'reservoir'
+        })
+        
+        result = {
+            'text': "\n".join(text_parts),
+            'metadata': metadata,
+            'content_type': 'spreadsheet'
+        }
+        if writer is not None and writer.groups:
+            result['pages_path'] = pages_path
+            metadata['row_chunks'] = writer.groups
+        elif pages_path:
+            os.remove(pages_path)
+        return result
+        
+    except Exception as e:
+        logger.error("Excel processing failed", error=str(e))
+        if pages_path and os.path.exists(pages_path):
+            os.remove(pages_path)
+        raise
+
+def extract_image(file_path: Path) -> Dict[str, Any]:
+    """Process image files"""
+    try:
+        with Image.open(file_path) as img:
+            # Basic image analysis
+            metadata = {
+                'width': img.width,
+                'height': img.height,
+                'format': img.format,
+                'mode': img.mode,
+                'size_pixels': img.width * img.height
+            }
+            
+            # Extract EXIF data if available
+            if hasattr(img, '_getexif') and img._getexif():
+                exif = img._getexif()
+                if exif:
+                    metadata['exif'] = {str(k): str(v) for k, v in exif.items()}
+            
+            # Generate description text
+            text = f"Image file: {file_path.name}\n"
+            text += f"Dimensions: {img.width}x{img.height} pixels\n"
+            text += f"Format: {img.format}\n"
+            text += f"Color mode: {img.mode}"
+            
+            return {
+                'text': text,
+                'metadata': metadata,
+                'content_type': 'image'
+            }
+        
+    except Exception as e:
+        logger.error("Image processing failed", error=str(e))
+        raise
+
+def extract_code(file_path: Path) -> Dict[str, Any]:
+    """Process code files"""
+    result = extract_text(file_path)
+    result['content_type'] = 'code'
+    
+    # Analyze code structure
+    text = result['text']
+    extension = file_path.suffix.lower()
+    
+    # Basic code analysis
+    code_metrics = {
+        'functions': 0,
+        'classes': 0,
+        'imports': 0,
+        'comments': 0
+    }
+    
+    lines = text.split('\n')
+    for line in lines:
+        line = line.strip()
+        if extension in ['.py']:
+            if line.startswith('def '):
+                code_metrics['functions'] += 1
+            elif line.startswith('class '):
+                code_metrics['classes'] += 1
+            elif line.startswith('import ') or line.startswith('from '):
+                code_metrics['imports'] += 1
+            elif line.startswith('#'):
+                code_metrics['comments'] += 1
+        elif extension in ['.js', '.ts']:
+            if 'function ' in line or '=>' in line:
+                code_metrics['functions'] += 1
+            elif line.startswith('class '):
+                code_metrics['classes'] += 1
+            elif line.startswith('import ') or line.startswith('require('):
+                code_metrics['imports'] += 1
+            elif line.startswith('//') or line.startswith('/*'):
+                code_metrics['comments'] += 1
+    
+    result['metadata'].update(code_metrics)
+    result['metadata']['language'] = extension
+    
+    return result
+
+def extract_audio(file_path: Path) -> Dict[str, Any]:
+    """Process audio files"""
+    # Basic audio file analysis
+    file_size = file_path.stat().st_size
+    
+    metadata = {
+        'format': file_path.suffix.lower(),
+        'size_bytes': file_size,
+        'processing_note': 'Audio transcription not implemented'
+    }
+    
+    text = f"Audio file: {file_path.name}\n"
+    text += f"Format: {file_path.suffix.upper()}\n"
+    text += f"Size: {file_size} bytes"
+    
+    return {
+        'text': text,
+        'metadata': metadata,
+        'content_type': 'audio'
+    }
+
+def extract_video(file_path: Path) -> Dict[str, Any]:
+    """Process video files"""
+    # Basic video file analysis
+    file_size = file_path.stat().st_size
+    
+    metadata = {
+        'format': file_path.suffix.lower(),
+        'size_bytes': file_size,
+        'processing_note': 'Video analysis not implemented'
+    }
+    
+    text = f"Video file: {file_path.name}\n"
+    text += f"Format: {file_path.suffix.upper()}\n"
+    text += f"Size: {file_size} bytes"
+    
+    return {
+        'text': text,
+        'metadata': metadata,
+        'content_type': 'video'
+    }
+
+# File type -> handler; unknown types are read as text
+EXTRACTORS: Dict[str, Callable[[Path], Dict[str, Any]]] = {
+    'pdf': extract_pdf,
+    'docx': extract_docx,
+    'txt': extract_text,
+    'md': extract_markdown,
+    'html': extract_html,
+    'xml': extract_xml,
+    'json': extract_json,
+    'csv': extract_csv,
+    'xlsx': extract_excel,
+    'jpg': extract_image,
+    'jpeg': extract_image,
+    'png': extract_image,
+    'gif': extract_image,
+    'bmp': extract_image,
+    'mp3': extract_audio,
+    'wav': extract_audio,
+    'mp4': extract_video,
+    'avi': extract_video,
+    'py': extract_code,
+    'js': extract_code,
+    'ts': extract_code,
+    'css': extract_code,
+    'sql': extract_code,
+}
+
+def extract(file_type: str, file_path: Path) -> Dict[str, Any]:
+    """Run the handler for file_type"""
+    return EXTRACTORS.get(file_type, extract_text)(file_path)
@@ -9,28 +9,34 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTa
 from fastapi.responses import JSONResponse
 from typing import List, Optional, Dict, Any, BinaryIO
 import asyncio
-import aiofiles
 import os
-import hashlib
 import json
 import uuid
 from datetime import datetime, timedelta
 from pydantic import BaseModel
-import mimetypes
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy.orm import load_only
 import structlog
 
 # Use absolute imports that work when running directly
 try:
     # When running as a module
-    from database.models import FileRecord, FileStatus, PersonaType, ProcessingJob, VectorChunk, User
-    from database.connection import get_db
+    from database.models import FileRecord, ContentBlob, FileStatus, PersonaType, ProcessingJob, VectorChunk, User
+    from database.connection import get_db, db_manager
+    from services.resumable_upload import ResumableUpload
+    from services.blob_store import blob_store
+    from services.file_types import detect
+    from services.job_queue import job_queue, JobWorker
 except ImportError:
     # Fallback for relative imports
-    from ..database.models import FileRecord, FileStatus, PersonaType, ProcessingJob, VectorChunk, User
-    from ..database.connection import get_db
+    from ..database.models import FileRecord, ContentBlob, FileStatus, PersonaType, ProcessingJob, VectorChunk, User
+    from ..database.connection import get_db, db_manager
+    from .resumable_upload import ResumableUpload
+    from .blob_store import blob_store
+    from .file_types import detect
+    from .job_queue import job_queue, JobWorker
 
 # Make file_processor import optional to avoid dependency issues
 file_processor = None
@@ -54,6 +60,8 @@ except ImportError:
 
 logger = structlog.get_logger(__name__)
 
+INGEST_JOB = "ingest"
+
 class FileMetadata(BaseModel):
     persona: str
     file_type: str
@@ -87,6 +95,7 @@ class FileUploadRequest(BaseModel):
     file_size: int
     persona_type: PersonaType
     metadata: Dict[str, Any]
+    replaces_file_id: Optional[str] = None  # upload new content for an existing file
 
 class FileUploadResponse(BaseModel):
     file_id: str
@@ -95,6 +104,14 @@ class FileUploadResponse(BaseModel):
     max_file_size: int
     status: str
 
+class UploadResumeStatus(BaseModel):
+    file_id: str
+    status: FileStatus
+    chunk_size: int
+    total_bytes: int
+    received_bytes: int
+    missing_ranges: List[List[int]]
+
 class FileProcessingStatus(BaseModel):
     file_id: str
     status: FileStatus
@@ -134,21 +151,43 @@ class EnhancedFileService:
         self.chunk_size = 8 * 1024 * 1024  # 8MB chunks
         self.max_file_size = 2 * 1024 * 1024 * 1024  # 2GB max
         
-        # Active uploads tracking
-        self.active_uploads: Dict[str, Dict[str, Any]] = {}
+        # Active uploads tracking; the durable state lives in temp_dir so any
+        # worker (or a restarted one) can pick an upload back up
+        self.active_uploads: Dict[str, ResumableUpload] = {}
+        
+        # Processing runs from the durable job queue, in this process and/or
+        # in separate workers (scripts/ingest_worker.py)
+        job_queue.register(INGEST_JOB, self.process_job)
+        self.worker: Optional[JobWorker] = None
     
     async def initialize(self):
         """Initialize the file service"""
         await file_processor.initialize()
         logger.info("Enhanced file service initialized")
     
+    def start_worker(self, concurrency: Optional[int] = None) -> JobWorker:
+        """Run an ingest worker inside this process"""
+        if self.worker is None:
+            self.worker = JobWorker(job_queue, concurrency=concurrency)
+            self.worker.start()
+        return self.worker
+    
+    async def stop_worker(self):
+        if self.worker is not None:
+            await self.worker.stop()
+            self.worker = None
+    
     async def initiate_upload(
         self, 
         request: FileUploadRequest,
         user_id: str,
         db: AsyncSession
     ) -> FileUploadResponse:
-        """Initiate a new file upload"""
+        """Initiate a new file upload
+        
+        With replaces_file_id the upload brings new content for that file,
+        which stays searchable as it is until the upload completes.
+        """
         try:
             # Validate file size
             if request.file_size > self.max_file_size:
@@ -157,30 +196,48 @@ class EnhancedFileService:
                     detail=f"File too large. Maximum size: {self.max_file_size} bytes"
                 )
             
-            # Create file record
-            file_record = FileRecord(
-                user_id=user_id,
-                filename=self._generate_unique_filename(request.filename),
-                original_filename=request.filename,
-                file_size=request.file_size,
-                status=FileStatus.PENDING,
-                file_metadata=request.metadata,
-                upload_started=datetime.utcnow()
+            if request.replaces_file_id:
+                result = await db.execute(
+                    select(FileRecord).where(
+                        FileRecord.id == request.replaces_file_id,
+                        FileRecord.user_id == user_id
+                    )
+                )
+                file_record = result.scalar_one_or_none()
+                if not file_record:
+                    raise HTTPException(status_code=404, detail="File not found")
+                if (file_record.status not in [FileStatus.COMPLETED, FileStatus.ERROR]
+                        or self._get_upload(str(file_record.id)) is not None):
+                    raise HTTPException(status_code=409, detail="File is still being uploaded or processed")
+            else:
+                # Create file record
+                file_record = FileRecord(
+                    user_id=user_id,
+                    filename=self._generate_unique_filename(request.filename),
+                    original_filename=request.filename,
+                    file_size=request.file_size,
+                    status=FileStatus.PENDING,
+                    file_metadata=request.metadata,
+                    upload_started=datetime.utcnow()
+                )
+                
+                # Save to database
+                db.add(file_record)
+                await db.commit()
+                await db.refresh(file_record)
+            
+            # Preallocate the upload and its durable chunk map
+            self.active_uploads[str(file_record.id)] = await asyncio.to_thread(
+                ResumableUpload.create,
+                self.temp_dir,
+                str(file_record.id),
+                request.file_size,
+                self.chunk_size,
+                request.persona_type.value,
+                bool(request.replaces_file_id),
+                request.filename
             )
             
-            # Save to database
-            db.add(file_record)
-            await db.commit()
-            await db.refresh(file_record)
-            
-            # Create temporary upload tracking
-            self.active_uploads[str(file_record.id)] = {
-                'expected_size': request.file_size,
-                'received_size': 0,
-                'persona_type': request.persona_type,
-                'temp_path': self.temp_dir / f"{file_record.id}.tmp"
-            }
-            
             logger.info(
                 "File upload initiated",
                 file_id=str(file_record.id),
@@ -196,10 +253,21 @@ class EnhancedFileService:
                 status="pending"
             )
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error("Failed to initiate upload", error=str(e))
             raise HTTPException(status_code=500, detail=f"Upload initiation failed: {str(e)}")
     
+    def _get_upload(self, file_id: str) -> Optional[ResumableUpload]:
+        """Tracked upload for file_id, reloading its state from disk if needed"""
+        upload = self.active_uploads.get(file_id)
+        if upload is None:
+            upload = ResumableUpload.load(self.temp_dir, file_id)
+            if upload is not None:
+                self.active_uploads[file_id] = upload
+        return upload
+    
     async def upload_chunk(
         self,
         file_id: str,
@@ -207,7 +275,11 @@ class EnhancedFileService:
         chunk_offset: int,
         db: AsyncSession
     ) -> Dict[str, Any]:
-        """Upload a chunk of file data"""
+        """Upload a chunk of file data
+
+        Chunks may arrive concurrently and in any order; each is written at
+        chunk_offset (a multiple of chunk_size) into the preallocated file.
+        """
         try:
             # Get file record
             result = await db.execute(
@@ -218,41 +290,43 @@ class EnhancedFileService:
             if not file_record:
                 raise HTTPException(status_code=404, detail="File not found")
             
-            if file_record.status not in [FileStatus.PENDING, FileStatus.UPLOADING]:
-                raise HTTPException(status_code=400, detail="File is not in uploadable state")
-            
             # Get upload tracking info
-            if file_id not in self.active_uploads:
+            upload = self._get_upload(file_id)
+            if upload is None:
                 raise HTTPException(status_code=400, detail="Upload not initiated")
             
-            upload_info = self.active_uploads[file_id]
-            temp_path = upload_info['temp_path']
+            if file_record.status not in [FileStatus.PENDING, FileStatus.UPLOADING] and not upload.replaces:
+                raise HTTPException(status_code=400, detail="File is not in uploadable state")
+            
+            error = upload.validate_chunk(chunk_offset, len(chunk_data))
+            if error:
+                raise HTTPException(status_code=400, detail=error)
             
             # Update status to uploading if not already
             if file_record.status == FileStatus.PENDING:
                 file_record.status = FileStatus.UPLOADING
                 await db.commit()
             
-            # Append chunk to temporary file
-            async with aiofiles.open(temp_path, 'ab') as f:
-                await f.write(chunk_data)
-            
-            # Update received size
-            upload_info['received_size'] += len(chunk_data)
+            # Positional write, then mark the chunk as received
+            await asyncio.to_thread(upload.write_chunk, chunk_offset, chunk_data)
+            async with upload.hash_lock:
+                await asyncio.to_thread(upload.advance_hash, chunk_offset, chunk_data)
             
-            # Calculate progress
-            progress = upload_info['received_size'] / upload_info['expected_size']
+            chunk_map = await asyncio.to_thread(upload.received)
+            received = upload.received_bytes(chunk_map)
+            progress = received / upload.expected_size if upload.expected_size else 1.0
             
             logger.debug(
                 "Chunk uploaded",
                 file_id=file_id,
+                chunk_offset=chunk_offset,
                 chunk_size=len(chunk_data),
                 progress=progress
             )
             
-            # Check if upload is complete
-            if upload_info['received_size'] >= upload_info['expected_size']:
-                await self._complete_upload(file_id, file_record, upload_info, db)
+            # Check if upload is complete; only one request finalizes it
+            if upload.is_complete(chunk_map) and upload.claim_completion():
+                await self._complete_upload(file_id, file_record, upload, db)
                 return {
                     'status': 'completed',
                     'progress': 1.0,
@@ -262,52 +336,96 @@ class EnhancedFileService:
             return {
                 'status': 'uploading',
                 'progress': progress,
-                'received_bytes': upload_info['received_size'],
-                'total_bytes': upload_info['expected_size']
+                'received_bytes': received,
+                'total_bytes': upload.expected_size
             }
             
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error("Chunk upload failed", file_id=file_id, error=str(e))
-            # Update file status to error
-            if file_id in self.active_uploads:
-                await self._mark_upload_error(file_id, str(e), db)
+            # The chunk map only records synced chunks, so the client can resume
+            logger.error("Chunk upload failed", file_id=file_id, chunk_offset=chunk_offset, error=str(e))
             raise HTTPException(status_code=500, detail=f"Chunk upload failed: {str(e)}")
     
+    async def get_upload_status(self, file_id: str, db: AsyncSession) -> UploadResumeStatus:
+        """Report which byte ranges of an upload are still missing"""
+        result = await db.execute(
+            select(FileRecord).where(FileRecord.id == file_id)
+        )
+        file_record = result.scalar_one_or_none()
+        
+        if not file_record:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        upload = self._get_upload(file_id)
+        if upload is None:
+            # Nothing left to resume: either finished or never initiated
+            return UploadResumeStatus(
+                file_id=file_id,
+                status=file_record.status,
+                chunk_size=self.chunk_size,
+                total_bytes=file_record.file_size,
+                received_bytes=file_record.file_size if file_record.upload_completed else 0,
+                missing_ranges=[]
+            )
+        
+        chunk_map = await asyncio.to_thread(upload.received)
+        return UploadResumeStatus(
+            file_id=file_id,
+            status=file_record.status,
+            chunk_size=upload.chunk_size,
+            total_bytes=upload.expected_size,
+            received_bytes=upload.received_bytes(chunk_map),
+            missing_ranges=[list(r) for r in upload.missing_ranges(chunk_map)]
+        )
+    
     async def _complete_upload(
         self,
         file_id: str,
         file_record: FileRecord,
-        upload_info: Dict[str, Any],
+        upload: ResumableUpload,
         db: AsyncSession
     ):
         """Complete file upload and start processing"""
+        if upload.replaces:
+            return await self._complete_replacement(file_id, file_record, upload, db)
+        
         try:
-            temp_path = upload_info['temp_path']
+            temp_path = upload.data_path
             
-            # Calculate checksum
-            file_record.checksum = await self._calculate_checksum(temp_path)
+            # Finish the checksum accumulated while chunks arrived
+            async with upload.hash_lock:
+                file_record.checksum = await asyncio.to_thread(upload.finish_hash)
             
-            # Move to permanent storage
-            storage_path = self.processed_dir / f"{file_record.id}_{file_record.original_filename}"
-            temp_path.rename(storage_path)
-            file_record.storage_path = str(storage_path)
+            # Detect type and MIME type from the first chunk, already in memory
+            file_record.file_type, file_record.mime_type = detect(
+                await asyncio.to_thread(upload.header), file_record.original_filename
+            )
+            
+            # Move into the content-addressed store; identical content is kept once
+            blob = await blob_store.acquire(
+                db, file_record.checksum, temp_path, file_record.file_size,
+                suffix=Path(file_record.original_filename).suffix
+            )
+            file_record.storage_path = blob.storage_path
             
             # Update status
             file_record.status = FileStatus.UPLOADED
             file_record.upload_completed = datetime.utcnow()
             
-            # Detect file type and MIME type
-            file_record.mime_type = mimetypes.guess_type(file_record.original_filename)[0]
-            file_record.file_type = self._detect_file_type(storage_path)
-            
+            # Queue processing in the same transaction that completes the upload
+            job_queue.enqueue(
+                db, INGEST_JOB, file_record.id,
+                config={"persona_type": PersonaType(upload.persona_type).value}
+            )
             await db.commit()
             
             # Clean up upload tracking
-            del self.active_uploads[file_id]
+            self.active_uploads.pop(file_id, None)
+            await asyncio.to_thread(upload.cleanup)
             
-            # Start background processing
-            persona_type = upload_info['persona_type']
-            asyncio.create_task(self._process_file_background(file_record, persona_type, db))
+            if self.worker is not None:
+                self.worker.notify()
             
             logger.info(
                 "Upload completed",
@@ -321,41 +439,80 @@ class EnhancedFileService:
             await self._mark_upload_error(file_id, str(e), db)
             raise
     
-    async def _process_file_background(
+    async def process_job(self, job: ProcessingJob):
+        """Run an ingest job; raising lets the queue retry it"""
+        async with db_manager.async_session() as db:
+            file_record = await db.get(FileRecord, job.file_record_id)
+            if file_record is None:
+                logger.warning("File deleted before processing", job_id=str(job.id))
+                return
+            
+            persona_type = PersonaType(job.config["persona_type"])
+            await self._process_file(file_record, persona_type, db)
+            
+            if file_record.status == FileStatus.ERROR:
+                if job.retry_count < job.max_retries:
+                    # Queued again; the error stays visible until the retry runs
+                    file_record.status = FileStatus.UPLOADED
+                    await db.commit()
+                raise RuntimeError(file_record.error_message or "File processing failed")
+    
+    async def _process_file(
         self,
         file_record: FileRecord,
         persona_type: PersonaType,
         db: AsyncSession
     ):
-        """Background file processing task"""
+        """Process an uploaded file, leaving the outcome on the record"""
         try:
             # Update status
             file_record.status = FileStatus.PROCESSING
             file_record.processing_started = datetime.utcnow()
             await db.commit()
             
-            # Process with file processor
-            with open(file_record.storage_path, 'rb') as file_data:
-                processed_record = await file_processor.process_upload(
-                    file_data=file_data,
-                    filename=file_record.original_filename,
-                    file_size=file_record.file_size,
-                    persona_type=persona_type,
-                    metadata=file_record.file_metadata
+            # Identical content processed the same way before: share its results
+            blob = await db.get(ContentBlob, file_record.checksum) if file_record.checksum else None
+            if blob is not None and blob_store.can_reuse(blob, persona_type, file_processor.embedding_model_name):
+                if str(blob.vector_source_id) != blob_store.vector_key(file_record):
+                    await self._release_vectors(file_record, db)
+                blob_store.apply(blob, file_record)
+                await db.commit()
+                logger.info(
+                    "File processing reused stored content",
+                    file_id=str(file_record.id),
+                    checksum=file_record.checksum,
+                    vector_source_id=str(file_record.vector_source_id)
                 )
-            
-            # Update file record with processed information
-            file_record.extracted_text = processed_record.extracted_text
-            file_record.extracted_metadata = processed_record.extracted_metadata
-            file_record.embedding_model = processed_record.embedding_model
-            file_record.embedding_dimensions = processed_record.embedding_dimensions
-            file_record.chunk_count = processed_record.chunk_count
-            file_record.status = FileStatus.COMPLETED
-            file_record.processing_completed = datetime.utcnow()
-            file_record.processing_progress = 1.0
-            
+                return
+            
+            # Process the stored file in place; the record is updated directly.
+            # Chunks that already have a stored row keep their vectors.
+            existing = await self._stored_chunks(file_record, db)
+            changes = await file_processor.process_file(file_record, persona_type, existing)
+            if changes is not None:
+                db.add_all(changes.added)
+                for row in changes.removed:
+                    await db.delete(row)
+            if blob is not None:
+                blob_store.record(blob, file_record, persona_type)
             await db.commit()
             
+            # Vanished chunks leave the vector store once their rows are gone
+            if changes is not None and changes.removed:
+                deleted = await file_processor.vector_store.delete_vectors(
+                    "documents", [row.vector_id for row in changes.removed]
+                )
+                if not deleted:
+                    logger.warning("Some vectors were not deleted", file_id=str(file_record.id), **deleted.to_dict())
+            
+            if file_record.status == FileStatus.ERROR:
+                logger.error(
+                    "File processing failed",
+                    file_id=str(file_record.id),
+                    error=file_record.error_message
+                )
+                return
+            
             logger.info(
                 "File processing completed",
                 file_id=str(file_record.id),
@@ -432,38 +589,40 @@ class EnhancedFileService:
             # If we have a search query, use vector search
             if request.query.strip():
                 # Generate query embedding
-                query_embedding = file_processor.embedding_model.encode([request.query])[0]
+                query_embedding = await file_processor.embedding_service.encode_query(request.query)
+                
+                # Duplicate uploads share the vectors of the file that was processed
+                files_by_key: Dict[str, List[FileRecord]] = {}
+                for f in files:
+                    files_by_key.setdefault(blob_store.vector_key(f), []).append(f)
+                
+                # Restrict the vector search to this user's matching files up front
+                filters = {'file_id': list(files_by_key.keys())}
+                if request.persona_types:
+                    filters['persona_type'] = [p.value for p in request.persona_types]
                 
                 # Search vector store
                 vector_results = await file_processor.vector_store.search_vectors(
                     collection_name="documents",
                     query_vector=query_embedding.tolist(),
-                    top_k=request.limit * 2,  # Get more results for better filtering
-                    filters=None
+                    top_k=request.limit,
+                    filters=filters
                 )
                 
                 # Match vector results with database files
                 results = []
-                file_dict = {str(f.id): f for f in files}
                 
                 for vector_result in vector_results:
-                    file_id = vector_result['metadata'].get('file_id')
-                    if file_id in file_dict:
-                        file_record = file_dict[file_id]
-                        
-                        # Apply persona filter if specified
-                        if request.persona_types and file_record.persona_id:
-                            # Would need to check persona type from persona table
-                            pass
-                        
+                    vector_key = vector_result['metadata'].get('file_id')
+                    for file_record in files_by_key.get(vector_key, []):
                         results.append(FileSearchResult(
                             file_id=str(file_record.id),
                             filename=file_record.original_filename,
                             file_type=file_record.file_type,
-                            persona_type=None,  # Would need to join with persona table
+                            persona_type=vector_result['metadata'].get('persona_type'),
                             relevance_score=vector_result['score'],
                             snippet=vector_result['metadata'].get('content', '')[:200],
-                            metadata=file_record.file_metadata,
+                            metadata=self._hit_metadata(file_record, vector_result['metadata']),
                             created_at=file_record.created_at
                         ))
                 
@@ -505,19 +664,25 @@ class EnhancedFileService:
             if not file_record:
                 raise HTTPException(status_code=404, detail="File not found")
             
-            # Delete from vector store
-            if file_record.chunk_count > 0:
-                chunk_ids = [f"{file_id}_{i}" for i in range(file_record.chunk_count)]
-                await file_processor.vector_store.delete_vectors("documents", chunk_ids)
+            storage_path = file_record.storage_path
             
-            # Delete physical file
-            if file_record.storage_path and os.path.exists(file_record.storage_path):
-                os.remove(file_record.storage_path)
+            # Delete from vector store once no other file shares the vectors
+            await self._release_vectors(file_record, db)
             
             # Delete from database (cascading deletes will handle related records)
             await db.delete(file_record)
+            await db.flush()
+            
+            # Stored content goes with its last reference
+            if blob_store.owns(storage_path):
+                removable = await blob_store.release(db, file_record.checksum)
+            else:
+                removable = Path(storage_path) if storage_path else None
             await db.commit()
             
+            if removable is not None and removable.exists():
+                removable.unlink()
+            
             logger.info("File deleted", file_id=file_id, filename=file_record.original_filename)
             return True
             
@@ -525,6 +690,151 @@ class EnhancedFileService:
             logger.error("File deletion failed", file_id=file_id, error=str(e))
             raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
     
+    # === Vectors ===
+    
+    async def _vector_users(self, db: AsyncSession, vector_key: str, exclude: Any = None) -> int:
+        """Number of files whose search results come from the vectors tagged vector_key"""
+        query = select(func.count()).select_from(FileRecord).where(
+            or_(
+                and_(FileRecord.id == vector_key, FileRecord.vector_source_id.is_(None)),
+                FileRecord.vector_source_id == vector_key
+            )
+        )
+        if exclude is not None:
+            query = query.where(FileRecord.id != exclude)
+        return await db.scalar(query)
+    
+    async def _stored_chunks(self, file_record: FileRecord, db: AsyncSession) -> Dict[str, VectorChunk]:
+        """The record's chunk rows by vector ID, for diffing a re-index against"""
+        result = await db.execute(
+            select(VectorChunk)
+            .where(VectorChunk.file_record_id == file_record.id)
+            .options(load_only(VectorChunk.id, VectorChunk.vector_id, VectorChunk.chunk_index))
+        )
+        return {row.vector_id: row for row in result.scalars()}
+    
+    async def _delete_vector_key(self, vector_key: str):
+        deleted = await file_processor.vector_store.delete_by_filter("documents", {"file_id": vector_key})
+        if not deleted:
+            logger.warning("Some vectors were not deleted", vector_key=vector_key, **deleted.to_dict())
+    
+    async def _release_vectors(self, file_record: FileRecord, db: AsyncSession):
+        """Stop using the record's vectors, deleting them if no other file shows them"""
+        vector_key = blob_store.vector_key(file_record)
+        await db.execute(delete(VectorChunk).where(VectorChunk.file_record_id == file_record.id))
+        if not file_record.chunk_count or await self._vector_users(db, vector_key, exclude=file_record.id):
+            return
+        await blob_store.forget_vectors(db, vector_key)
+        await self._delete_vector_key(vector_key)
+    
+    async def _prepare_reindex(self, file_record: FileRecord, db: AsyncSession):
+        """Set up the vectors new content for the record is diffed against
+        
+        Vectors other files still show are left to them and the record starts
+        over under a key of its own. Vectors indexed without chunk rows (before
+        incremental re-indexing, or inherited from a deleted duplicate) cannot
+        be diffed and are deleted.
+        """
+        vector_key = blob_store.vector_key(file_record)
+        if await self._vector_users(db, vector_key, exclude=file_record.id):
+            await db.execute(delete(VectorChunk).where(VectorChunk.file_record_id == file_record.id))
+            file_record.vector_source_id = uuid.uuid4()
+            file_record.chunk_count = 0
+            return
+        
+        # The old content's blob must not offer vectors that are about to change
+        await blob_store.forget_vectors(db, vector_key)
+        stored = await db.scalar(
+            select(func.count()).select_from(VectorChunk).where(VectorChunk.file_record_id == file_record.id)
+        )
+        if file_record.chunk_count and not stored:
+            await self._delete_vector_key(vector_key)
+            file_record.chunk_count = 0
+    
+    async def _complete_replacement(
+        self,
+        file_id: str,
+        file_record: FileRecord,
+        upload: ResumableUpload,
+        db: AsyncSession
+    ):
+        """Swap in the new content of a replaced file and queue its re-index
+        
+        Chunks whose text and location are unchanged keep their vectors, so
+        only the edited parts of the document are embedded again.
+        """
+        try:
+            async with upload.hash_lock:
+                checksum = await asyncio.to_thread(upload.finish_hash)
+            filename = upload.filename or file_record.original_filename
+            
+            if checksum == file_record.checksum and file_record.status == FileStatus.COMPLETED:
+                # Same bytes: nothing to re-index
+                file_record.original_filename = filename
+                await db.commit()
+                self.active_uploads.pop(file_id, None)
+                await asyncio.to_thread(upload.cleanup)
+                logger.info("Replacement identical to stored content", file_id=file_id)
+                return
+            
+            file_type, mime_type = detect(await asyncio.to_thread(upload.header), filename)
+            blob = await blob_store.acquire(
+                db, checksum, upload.data_path, upload.expected_size, suffix=Path(filename).suffix
+            )
+            
+            # The old content goes with its last reference
+            if blob_store.owns(file_record.storage_path):
+                removable = await blob_store.release(db, file_record.checksum)
+            else:
+                removable = Path(file_record.storage_path) if file_record.storage_path else None
+            
+            await self._prepare_reindex(file_record, db)
+            
+            file_record.checksum = checksum
+            file_record.storage_path = blob.storage_path
+            file_record.file_size = upload.expected_size
+            file_record.original_filename = filename
+            file_record.file_type, file_record.mime_type = file_type, mime_type
+            file_record.status = FileStatus.UPLOADED
+            file_record.upload_completed = datetime.utcnow()
+            file_record.processing_progress = 0.0
+            file_record.error_message = None
+            
+            job_queue.enqueue(
+                db, INGEST_JOB, file_record.id,
+                config={"persona_type": PersonaType(upload.persona_type).value}
+            )
+            await db.commit()
+            
+            if removable is not None and removable.exists():
+                removable.unlink()
+            self.active_uploads.pop(file_id, None)
+            await asyncio.to_thread(upload.cleanup)
+            
+            if self.worker is not None:
+                self.worker.notify()
+            
+            logger.info(
+                "Replacement upload completed",
+                file_id=file_id,
+                filename=filename,
+                size=upload.expected_size
+            )
+            
+        except Exception as e:
+            logger.error("Replacement upload completion failed", file_id=file_id, error=str(e))
+            await self._abort_replacement(file_id, upload, db)
+            raise
+    
+    async def _abort_replacement(self, file_id: str, upload: ResumableUpload, db: AsyncSession):
+        """Drop a failed replacement upload; the record keeps its current content and status"""
+        try:
+            await db.rollback()
+            self.active_uploads.pop(file_id, None)
+            await asyncio.to_thread(upload.cleanup)
+        except Exception as e:
+            logger.error("Failed to clean up replacement upload", file_id=file_id, error=str(e))
+    
     async def _mark_upload_error(self, file_id: str, error_message: str, db: AsyncSession):
         """Mark upload as failed"""
         try:
@@ -536,26 +846,14 @@ class EnhancedFileService:
             await db.commit()
             
             # Clean up upload tracking
-            if file_id in self.active_uploads:
-                upload_info = self.active_uploads[file_id]
-                if upload_info['temp_path'].exists():
-                    upload_info['temp_path'].unlink()
-                del self.active_uploads[file_id]
+            upload = self._get_upload(file_id)
+            if upload is not None:
+                upload.cleanup()
+                self.active_uploads.pop(file_id, None)
                 
         except Exception as e:
             logger.error("Failed to mark upload error", file_id=file_id, error=str(e))
     
-    async def _calculate_checksum(self, file_path: Path) -> str:
-        """Calculate SHA-256 checksum of file"""
-        hash_sha256 = hashlib.sha256()
-        async with aiofiles.open(file_path, 'rb') as f:
-            while True:
-                chunk = await f.read(8192)
-                if not chunk:
-                    break
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
-    
     def _generate_unique_filename(self, original_filename: str) -> str:
         """Generate unique filename with timestamp"""
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
@@ -563,41 +861,15 @@ class EnhancedFileService:
         # Clean filename for safety
         safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
         return f"{timestamp}_{safe_name}{ext}"
-    
-    def _detect_file_type(self, file_path: Path) -> str:
-        """Detect file type from extension"""
-        ext = file_path.suffix.lower()
-        
-        type_mapping = {
-            '.pdf': 'pdf',
-            '.docx': 'docx', '.doc': 'docx',
-            '.txt': 'txt',
-            '.md': 'md',
-            '.html': 'html', '.htm': 'html',
-            '.xml': 'xml',
-            '.json': 'json',
-            '.csv': 'csv',
-            '.xlsx': 'xlsx', '.xls': 'xlsx',
-            '.zip': 'zip',
-            '.tar': 'tar', '.gz': 'tar',
-            '.7z': '7z',
-            '.jpg': 'jpg', '.jpeg': 'jpg',
-            '.png': 'png',
-            '.gif': 'gif',
-            '.bmp': 'bmp',
-            '.mp3': 'mp3',
-            '.wav': 'wav',
-            '.mp4': 'mp4',
-            '.avi': 'avi',
-            '.py': 'py',
-            '.js': 'js',
-            '.ts': 'ts',
-            '.css': 'css',
-            '.sql': 'sql'
-        }
-        
-        return type_mapping.get(ext, 'unknown')
-    
+
+    @staticmethod
+    def _hit_metadata(file_record: FileRecord, chunk_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """File metadata for a search hit, naming the archive member the chunk came from"""
+        member = chunk_metadata.get('archive_member')
+        if not member:
+            return file_record.file_metadata
+        return {**(file_record.file_metadata or {}), 'archive_member': member}
+
     async def get_file_content(self, file_id: str, user_id: str, db: AsyncSession) -> Dict[str, Any]:
         """Get file content and metadata"""
         try:
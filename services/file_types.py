@@ -0,0 +1,197 @@
+"""
+File Type Detection
+
+One detector for every place that needs a file's type: uploads, direct
+processing and archive members. It classifies from the first HEADER_BYTES of
+the content (already in memory while an upload arrives) against a table of
+magic numbers, so there is no libmagic call and at most one small read per
+file. The file name only settles what the bytes cannot: OOXML documents whose
+part names lie past the header, and the flavour of a plain-text file.
+
+gzip, bzip2 and xz are compressions, not containers. Their header is
+decompressed far enough to look for a tar header ('ustar' at offset 257);
+only then is the file a 'tar', otherwise it is a single compressed stream
+('gz', 'bz2', 'xz') whose contents are detected again once decompressed.
+
+detect() returns (file_type, mime_type) where file_type is a key of
+services.extractors.EXTRACTORS, an archive or compression type, or 'unknown'.
+"""
+
+import bz2
+import lzma
+import zlib
+from pathlib import Path, PurePath
+from typing import Optional, Tuple
+
+HEADER_BYTES = 8192
+
+MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'zip': 'application/zip',
+    'tar': 'application/x-tar',
+    'gz': 'application/gzip',
+    'bz2': 'application/x-bzip2',
+    'xz': 'application/x-xz',
+    '7z': 'application/x-7z-compressed',
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'mp4': 'video/mp4',
+    'avi': 'video/x-msvideo',
+    'txt': 'text/plain',
+    'md': 'text/markdown',
+    'html': 'text/html',
+    'xml': 'application/xml',
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'py': 'text/x-python',
+    'js': 'text/javascript',
+    'ts': 'application/typescript',
+    'css': 'text/css',
+    'sql': 'application/sql',
+}
+
+# Extensions for content that has no magic number of its own
+TEXT_EXTENSIONS = {
+    '.txt': 'txt', '.text': 'txt', '.log': 'txt',
+    '.md': 'md', '.markdown': 'md',
+    '.html': 'html', '.htm': 'html',
+    '.xml': 'xml',
+    '.json': 'json',
+    '.csv': 'csv', '.tsv': 'csv',
+    '.py': 'py',
+    '.js': 'js',
+    '.ts': 'ts',
+    '.css': 'css',
+    '.sql': 'sql',
+}
+
+TAR_MAGIC_OFFSET = 257
+TAR_MAGIC = b'ustar'
+
+# Decompressors for the single-stream compressions, by file type
+DECOMPRESSORS = {
+    'gz': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    'bz2': bz2.BZ2Decompressor,
+    'xz': lzma.LZMADecompressor,
+}
+
+# (offset, signature, file type), checked in order
+SIGNATURES = [
+    (0, b'%PDF-', 'pdf'),
+    (0, b'PK\x03\x04', 'zip'),
+    (0, b'PK\x05\x06', 'zip'),  # empty zip
+    (0, b"7z\xbc\xaf'\x1c", '7z'),
+    (0, b'\x1f\x8b', 'gz'),
+    (0, b'BZh', 'bz2'),
+    (0, b'\xfd7zXZ\x00', 'xz'),
+    (TAR_MAGIC_OFFSET, TAR_MAGIC, 'tar'),
+    (0, b'\x89PNG\r\n\x1a\n', 'png'),
+    (0, b'\xff\xd8\xff', 'jpg'),
+    (0, b'GIF87a', 'gif'),
+    (0, b'GIF89a', 'gif'),
+    (0, b'ID3', 'mp3'),
+    (4, b'ftyp', 'mp4'),
+]
+
+def _riff_type(head: bytes) -> Optional[str]:
+    if head[:4] != b'RIFF':
+        return None
+    return {b'WAVE': 'wav', b'AVI ': 'avi'}.get(head[8:12])
+
+def _binary_type(head: bytes, suffix: str) -> Optional[str]:
+    for offset, signature, file_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if file_type == 'zip':
+                return _zip_type(head, suffix)
+            if file_type in DECOMPRESSORS:
+                return _compressed_type(head, file_type)
+            return file_type
+
+    riff = _riff_type(head)
+    if riff:
+        return riff
+    if head[:2] == b'BM' and b'\x00' in head[2:14]:
+        return 'bmp'
+    # MPEG audio frame sync without an ID3 tag
+    if len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and suffix == '.mp3':
+        return 'mp3'
+    return None
+
+def _zip_type(head: bytes, suffix: str) -> str:
+    """Office Open XML files are zips; their part names tell them apart"""
+    if b'word/' in head or suffix == '.docx':
+        return 'docx'
+    if b'xl/' in head or suffix == '.xlsx':
+        return 'xlsx'
+    return 'zip'
+
+def decompress_head(head: bytes, compression: str) -> bytes:
+    """Up to HEADER_BYTES of decompressed content from a compressed header; b'' if unreadable"""
+    try:
+        return DECOMPRESSORS[compression]().decompress(head, HEADER_BYTES)
+    except (OSError, EOFError, ValueError, zlib.error, lzma.LZMAError):
+        return b''
+
+def _compressed_type(head: bytes, compression: str) -> str:
+    """A compressed tar is an archive; anything else is a single compressed stream"""
+    inner = decompress_head(head, compression)
+    if inner[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+        return 'tar'
+    return compression
+
+def _is_text(head: bytes) -> bool:
+    if head.startswith((b'\xff\xfe', b'\xfe\xff', b'\xef\xbb\xbf')):
+        return True
+    if b'\x00' in head:
+        return False
+    # The header may end inside a multi-byte character
+    for cut in range(4):
+        try:
+            head[:len(head) - cut].decode('utf-8')
+            return True
+        except UnicodeDecodeError:
+            continue
+    # Legacy single-byte encodings: mostly printable
+    control = sum(1 for byte in head if byte < 0x09 or 0x0E <= byte < 0x20)
+    return control <= len(head) // 100
+
+def _text_type(head: bytes, suffix: str) -> str:
+    if suffix in TEXT_EXTENSIONS:
+        return TEXT_EXTENSIONS[suffix]
+    start = head.lstrip(b'\xef\xbb\xbf \t\r\n')[:256].lower()
+    if start.startswith((b'<!doctype html', b'<html')):
+        return 'html'
+    if start.startswith(b'<?xml'):
+        return 'html' if b'<html' in head[:1024].lower() else 'xml'
+    if start.startswith((b'{', b'[')):
+        return 'json'
+    return 'txt'
+
+def detect(head: bytes, filename: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """(file_type, mime_type) from a file's first bytes and, optionally, its name"""
+    suffix = PurePath(filename).suffix.lower() if filename else ''
+    head = head[:HEADER_BYTES]
+
+    if not head:
+        file_type = TEXT_EXTENSIONS.get(suffix, 'unknown')
+    else:
+        file_type = _binary_type(head, suffix)
+        if file_type is None:
+            file_type = _text_type(head, suffix) if _is_text(head) else 'unknown'
+
+    return file_type, MIME_TYPES.get(file_type, 'application/octet-stream' if head else None)
+
+def read_header(file_path: Path) -> bytes:
+    """First HEADER_BYTES of a file (blocking)"""
+    with open(file_path, 'rb') as file:
+        return file.read(HEADER_BYTES)
+
+def detect_file(file_path: Path, filename: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """detect() for a file on disk; filename defaults to the path's own name (blocking)"""
+    return detect(read_header(file_path), filename or file_path.name)
@@ -0,0 +1,354 @@
+"""
+Ingest Pipeline
+
+Staged file ingestion: extract -> chunk -> embed -> index. Each stage has its
+own workers and a bounded queue in front of it, so extraction of one file,
+embedding of another and indexing of a third all run at once, and batches of
+one large file flow through embed and index while the rest of it is still
+being chunked. A full queue blocks the stage before it, which bounds memory.
+
+Progress is broadcast per file on the websocket "file_processing" channel and
+kept on the FileRecord. Per-stage throughput and queue depth are in stats().
+
+Chunks are identified by a hash of their text and location, which is also
+their vector ID. Given the VectorChunk rows a file already has, only chunks
+without a row are embedded and indexed; the rest keep their vectors, and rows
+no chunk matched are returned as removed. Re-indexing an edited document
+therefore costs time in proportion to the edit.
+
+Configuration:
+    INGEST_EXTRACT_WORKERS  concurrent extractions (default: extraction pool size)
+    INGEST_CHUNK_WORKERS    files chunked at once
+    INGEST_EMBED_WORKERS    chunk batches embedding at once
+    INGEST_INDEX_WORKERS    chunk batches being written to the vector store
+    INGEST_QUEUE_SIZE       capacity of each inter-stage queue
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import numpy as np
+import structlog
+
+try:
+    from database.models import FileRecord, PersonaType, VectorChunk
+    from services.blob_store import BlobStore
+    from services.websocket_service import websocket_service
+except ImportError:
+    from ..database.models import FileRecord, PersonaType, VectorChunk
+    from .blob_store import BlobStore
+    from .websocket_service import websocket_service
+
+if TYPE_CHECKING:
+    from services.file_processor import FileProcessor
+
+logger = structlog.get_logger(__name__)
+
+# Share of a file's progress reached when extraction finishes
+EXTRACT_SHARE = 0.2
+
+class PendingChunk:
+    """A chunk with no vector in the store yet"""
+
+    __slots__ = ("text", "page_start", "page_end", "member", "index", "content_hash", "vector_id")
+
+    def __init__(self, text: str, page_start: Optional[int], page_end: Optional[int],
+                 member: Optional[str], index: int, content_hash: str, vector_id: str):
+        self.text = text
+        self.page_start = page_start
+        self.page_end = page_end
+        self.member = member
+        self.index = index
+        self.content_hash = content_hash
+        self.vector_id = vector_id
+
+class ChunkChanges:
+    """What indexing a file changed relative to its stored VectorChunk rows"""
+
+    def __init__(self):
+        self.added: List[VectorChunk] = []
+        self.removed: List[VectorChunk] = []
+        self.kept = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"added": len(self.added), "removed": len(self.removed), "kept": self.kept}
+
+def chunk_hash(text: str, page_start: Optional[int], page_end: Optional[int], member: Optional[str]) -> str:
+    return hashlib.sha256(json.dumps([text, page_start, page_end, member]).encode()).hexdigest()
+
+class _FileTask:
+    """One file moving through the pipeline"""
+
+    def __init__(self, file_record: FileRecord, persona_type: PersonaType, done: asyncio.Future,
+                 existing: Dict[str, VectorChunk]):
+        self.file_record = file_record
+        self.persona_type = persona_type
+        self.done = done
+        self.existing = existing  # stored rows by vector ID, not yet matched
+        self.changes = ChunkChanges()
+        self.extracted: Dict[str, Any] = {}
+        self.chunks_total = 0
+        self.chunks_emitted = 0
+        self.chunks_indexed = 0
+        self.chunking_finished = False
+        self.dimensions: Optional[int] = None
+        self.progress = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self.done.done()
+
+class _Batch:
+    __slots__ = ("task", "chunks", "fraction", "embeddings")
+
+    def __init__(self, task: _FileTask, chunks: List[PendingChunk], fraction: float):
+        self.task = task
+        self.chunks = chunks
+        self.fraction = fraction  # share of the file's text consumed up to this batch
+        self.embeddings: Optional[np.ndarray] = None
+
+class _Stage:
+    """Queue, workers and counters for one pipeline stage"""
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.items = 0
+        self.chunks = 0
+        self.busy_seconds = 0.0
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "items": self.items,
+            "chunks": self.chunks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "chunks_per_sec": round(self.chunks / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+        }
+
+class IngestPipeline:
+    """Bounded, multi-stage ingest shared by all files processed in this process"""
+
+    def __init__(self, processor: "FileProcessor"):
+        self.processor = processor
+        queue_size = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+        self.stages = {
+            "extract": _Stage("extract", int(os.getenv("INGEST_EXTRACT_WORKERS", str(processor.extraction_pool.workers))), queue_size),
+            "chunk": _Stage("chunk", int(os.getenv("INGEST_CHUNK_WORKERS", "2")), queue_size),
+            "embed": _Stage("embed", int(os.getenv("INGEST_EMBED_WORKERS", "2")), queue_size),
+            "index": _Stage("index", int(os.getenv("INGEST_INDEX_WORKERS", "2")), queue_size),
+        }
+        self._workers: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+        self.files = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def _ensure_started(self):
+        if self._workers and not all(worker.done() for worker in self._workers):
+            return
+        self._started_at = time.perf_counter()
+        runners = {"extract": self._extract, "chunk": self._chunk, "embed": self._embed, "index": self._index}
+        self._workers = [
+            asyncio.create_task(self._worker(stage, runners[name]))
+            for name, stage in self.stages.items()
+            for _ in range(stage.workers)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # === Entry ===
+
+    async def process(self, file_record: FileRecord, persona_type: PersonaType,
+                      existing: Optional[Dict[str, VectorChunk]] = None) -> ChunkChanges:
+        """Run a file through every stage, indexing only chunks missing from `existing`
+
+        `existing` maps vector IDs to the file's stored VectorChunk rows; kept
+        rows get their new chunk_index. Raises the first error any stage hit
+        for this file, after removing the vectors it had already indexed.
+        """
+        self._ensure_started()
+        task = _FileTask(file_record, persona_type, asyncio.get_running_loop().create_future(),
+                         dict(existing or {}))
+        self.files["submitted"] += 1
+        await self.stages["extract"].queue.put(task)
+        try:
+            await task.done
+        except Exception:
+            self.files["failed"] += 1
+            # Their rows are never saved, so the vectors would be orphans
+            await self._discard(task, task.changes.added)
+            raise
+        self.files["completed"] += 1
+        return task.changes
+
+    # === Workers ===
+
+    async def _worker(self, stage: _Stage, run):
+        while True:
+            item = await stage.queue.get()
+            task = item if isinstance(item, _FileTask) else item.task
+            try:
+                if task.failed:
+                    continue  # Another stage already failed this file
+                started = time.perf_counter()
+                await run(item)
+                stage.busy_seconds += time.perf_counter() - started
+                stage.items += 1
+                if isinstance(item, _Batch):
+                    stage.chunks += len(item.chunks)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ingest stage failed", stage=stage.name,
+                             filename=task.file_record.original_filename, error=str(e))
+                if not task.failed:
+                    task.done.set_exception(e)
+            finally:
+                stage.queue.task_done()
+
+    async def _extract(self, task: _FileTask):
+        await self._report(task, "extracting", 0.0)
+        task.extracted = await self.processor._extract_content(task.file_record)
+        task.file_record.extracted_text = task.extracted.get('text', '')
+        task.file_record.extracted_metadata = task.extracted.get('metadata', {})
+        await self._report(task, "extracted", EXTRACT_SHARE)
+        await self.stages["chunk"].queue.put(task)
+
+    async def _chunk(self, task: _FileTask):
+        """Cut the file into batches off the event loop, handing each on as it is ready"""
+        pages_path = task.extracted.get('pages_path')
+        try:
+            if pages_path:
+                groups = self.processor._iter_page_groups(pages_path)
+                total = os.path.getsize(pages_path)
+            else:
+                text = task.file_record.extracted_text or ''
+                groups = [(None, [(None, text)] if len(text.strip()) >= 10 else [])]
+                total = len(text)
+
+            # Archive members are chunked separately so each chunk has one source
+            chunks = (
+                (chunk, member)
+                for member, segments in groups
+                for chunk in self.processor.chunker.iter_chunks(segments)
+            )
+            size = self.processor.embedding_batch_size
+            vector_key = BlobStore.vector_key(task.file_record)
+            occurrences: Dict[str, int] = {}
+
+            def take() -> Tuple[List[PendingChunk], int]:
+                """Next `size` chunks; those with a stored row are matched and not returned"""
+                pending, chars = [], 0
+                for _, ((text, page_start, page_end), member) in zip(range(size), chunks):
+                    index = task.chunks_total
+                    task.chunks_total += 1
+                    chars += len(text)
+                    digest = chunk_hash(text, page_start, page_end, member)
+                    # Repeated chunks (boilerplate) get one vector per occurrence
+                    seen = occurrences.get(digest, 0)
+                    occurrences[digest] = seen + 1
+                    vector_id = f"{vector_key}_{digest[:32]}" + (f"_{seen}" if seen else "")
+
+                    row = task.existing.pop(vector_id, None)
+                    if row is not None:
+                        row.chunk_index = index
+                        task.changes.kept += 1
+                    else:
+                        pending.append(PendingChunk(text, page_start, page_end, member, index, digest, vector_id))
+                return pending, chars
+
+            emitted_chars = 0
+            while not task.failed:
+                consumed = task.chunks_total
+                batch, chars = await asyncio.to_thread(take)
+                if task.chunks_total == consumed:
+                    break
+                self.stages["chunk"].chunks += task.chunks_total - consumed
+                # Overlap makes this run slightly ahead; completion reports 1.0
+                emitted_chars += chars
+                fraction = min(emitted_chars / max(total, 1), 0.99)
+                if batch:
+                    await self.stages["embed"].queue.put(_Batch(task, batch, fraction))
+                    task.chunks_emitted += len(batch)
+        finally:
+            if pages_path and os.path.exists(pages_path):
+                os.remove(pages_path)
+
+        task.chunking_finished = True
+        await self._maybe_finish(task)
+
+    async def _embed(self, batch: _Batch):
+        batch.embeddings = await self.processor._embed_chunks([chunk.text for chunk in batch.chunks])
+        await self.stages["index"].queue.put(batch)
+
+    async def _index(self, batch: _Batch):
+        task = batch.task
+        rows = await self.processor._index_chunks(
+            task.file_record, task.persona_type, batch.chunks, batch.embeddings
+        )
+        if task.failed:
+            # Another stage failed this file while the batch was being written
+            await self._discard(task, rows)
+            return
+        task.changes.added.extend(rows)
+        task.dimensions = rows[0].embedding_dimensions
+        task.chunks_indexed += len(batch.chunks)
+        progress = EXTRACT_SHARE + (1.0 - EXTRACT_SHARE) * batch.fraction
+        await self._report(task, "indexing", progress, f"{task.chunks_indexed} chunks indexed")
+        await self._maybe_finish(task)
+
+    async def _maybe_finish(self, task: _FileTask):
+        if task.failed or not task.chunking_finished or task.chunks_indexed < task.chunks_emitted:
+            return
+        file_record = task.file_record
+        file_record.chunk_count = task.chunks_total
+        if task.chunks_indexed:
+            file_record.embedding_model = self.processor.embedding_model_name
+            file_record.embedding_dimensions = task.dimensions
+        task.changes.removed = list(task.existing.values())
+        task.done.set_result(None)
+        changes = task.changes
+        await self._report(task, "completed", 1.0,
+                           f"{task.chunks_total} chunks ({len(changes.added)} new, {len(changes.removed)} removed)")
+
+    async def _discard(self, task: _FileTask, rows: List[VectorChunk]):
+        if not rows:
+            return
+        try:
+            deleted = await self.processor.vector_store.delete_vectors("documents", [row.vector_id for row in rows])
+            if not deleted:
+                logger.warning("Some vectors of a failed file were not deleted",
+                               filename=task.file_record.original_filename, **deleted.to_dict())
+        except Exception as e:
+            logger.error("Deleting vectors of a failed file failed",
+                         filename=task.file_record.original_filename, error=str(e))
+
+    # === Progress and metrics ===
+
+    async def _report(self, task: _FileTask, stage: str, progress: float, details: Optional[str] = None):
+        # Batches can finish out of order; progress only moves forward
+        task.progress = max(task.progress, progress)
+        task.file_record.processing_progress = round(task.progress, 3)
+        try:
+            await websocket_service.broadcast_file_processing_update(
+                str(task.file_record.id), stage, task.file_record.processing_progress, details
+            )
+        except Exception as e:
+            logger.warning("Progress broadcast failed", error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "files": dict(self.files),
+            "stages": {name: stage.stats(elapsed) for name, stage in self.stages.items()},
+        }
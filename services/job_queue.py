@@ -0,0 +1,310 @@
+"""
+Processing Job Queue
+
+Durable background jobs on the processing_jobs table. A worker claims jobs
+with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can share
+the table without handing out a job twice, and holds each job under a lease
+that it renews while the job runs. A job whose worker died becomes claimable
+again once its lease expires. Failed jobs are retried with exponential
+backoff until max_retries, then marked failed.
+
+Workers run inside the API process (INGEST_WORKER_INLINE, on by default) and
+as separate processes (scripts/ingest_worker.py), so ingest throughput scales
+with the number of workers.
+
+Configuration:
+    INGEST_WORKER_CONCURRENCY   jobs run at once per worker
+    INGEST_LEASE_SECONDS        lease length; renewed every third of it
+    INGEST_POLL_SECONDS         idle poll interval
+    INGEST_RETRY_BASE_SECONDS   first retry delay, doubled per attempt
+    INGEST_RETRY_MAX_SECONDS    retry delay cap
+"""
+
+import os
+import socket
+import random
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy import select, update, and_, or_, func
+import structlog
+
+try:
+    from database.models import ProcessingJob
+    from database.connection import db_manager
+except ImportError:
+    from ..database.models import ProcessingJob
+    from ..database.connection import db_manager
+
+logger = structlog.get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+JobHandler = Callable[[ProcessingJob], Awaitable[None]]
+
+class JobQueue:
+    """Lease-based job queue over the processing_jobs table"""
+
+    def __init__(self):
+        self.lease_seconds = float(os.getenv("INGEST_LEASE_SECONDS", "120"))
+        self.retry_base = float(os.getenv("INGEST_RETRY_BASE_SECONDS", "5"))
+        self.retry_max = float(os.getenv("INGEST_RETRY_MAX_SECONDS", "300"))
+        self.handlers: Dict[str, JobHandler] = {}
+
+    def register(self, job_type: str, handler: JobHandler):
+        """Route claimed jobs of a type to a coroutine handler"""
+        self.handlers[job_type] = handler
+
+    # === Producers ===
+
+    def enqueue(self, db, job_type: str, file_record_id: Any = None,
+                config: Optional[Dict[str, Any]] = None, max_retries: int = 3) -> ProcessingJob:
+        """Add a job in the caller's transaction, so it exists iff the caller commits"""
+        job = ProcessingJob(
+            file_record_id=file_record_id,
+            job_type=job_type,
+            status=PENDING,
+            config=config or {},
+            retry_count=0,
+            max_retries=max_retries,
+            run_after=datetime.utcnow()
+        )
+        db.add(job)
+        return job
+
+    # === Workers ===
+
+    def _lease_until(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based), with jitter"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def claim(self, worker_id: str, limit: int) -> List[ProcessingJob]:
+        """Lease up to `limit` due jobs to this worker"""
+        now = datetime.utcnow()
+        claimed: List[ProcessingJob] = []
+
+        async with db_manager.async_session() as db:
+            result = await db.execute(
+                select(ProcessingJob)
+                .where(
+                    ProcessingJob.job_type.in_(list(self.handlers)),
+                    or_(
+                        and_(ProcessingJob.status == PENDING, ProcessingJob.run_after <= now),
+                        and_(ProcessingJob.status == RUNNING, ProcessingJob.lease_expires_at < now)
+                    )
+                )
+                .order_by(ProcessingJob.run_after)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+
+            for job in result.scalars().all():
+                values: Dict[str, Any] = {
+                    "status": RUNNING,
+                    "worker_id": worker_id,
+                    "lease_expires_at": self._lease_until(),
+                    "started_at": now,
+                }
+                if job.status == RUNNING:
+                    # Previous worker lost its lease; that attempt counts as a failure
+                    values["retry_count"] = job.retry_count + 1
+                    if job.retry_count + 1 > job.max_retries:
+                        values.update(status=FAILED, error_message="Lease expired", completed_at=now)
+
+                # Matching on the observed state keeps databases without row
+                # locks (SQLite) from handing the same job to two workers
+                won = await db.execute(
+                    update(ProcessingJob)
+                    .where(
+                        ProcessingJob.id == job.id,
+                        ProcessingJob.status == job.status,
+                        ProcessingJob.worker_id.is_(None) if job.worker_id is None
+                        else ProcessingJob.worker_id == job.worker_id
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                if won.rowcount and values["status"] == RUNNING:
+                    claimed.append(job)
+                elif won.rowcount:
+                    logger.warning("Job abandoned after lease expiry", job_id=str(job.id), job_type=job.job_type)
+
+            await db.commit()
+            for job in claimed:
+                await db.refresh(job)
+        return claimed
+
+    async def renew(self, job: ProcessingJob, worker_id: str) -> bool:
+        """Extend a running job's lease; False means another worker took it over"""
+        async with db_manager.async_session() as db:
+            result = await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job.id, ProcessingJob.worker_id == worker_id,
+                       ProcessingJob.status == RUNNING)
+                .values(lease_expires_at=self._lease_until())
+            )
+            await db.commit()
+            return bool(result.rowcount)
+
+    async def complete(self, job: ProcessingJob, worker_id: str, output: Optional[Dict[str, Any]] = None):
+        async with db_manager.async_session() as db:
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job.id, ProcessingJob.worker_id == worker_id)
+                .values(status=COMPLETED, progress=1.0, output_data=output or {},
+                        lease_expires_at=None, completed_at=datetime.utcnow())
+            )
+            await db.commit()
+
+    async def fail(self, job: ProcessingJob, worker_id: str, error: str) -> bool:
+        """Record a failed attempt; returns True if the job will be retried"""
+        attempt = job.retry_count + 1
+        retry = attempt <= job.max_retries
+        values: Dict[str, Any] = {"retry_count": attempt, "error_message": error, "lease_expires_at": None}
+        if retry:
+            values.update(status=PENDING, run_after=datetime.utcnow() + timedelta(seconds=self.backoff(attempt)))
+        else:
+            values.update(status=FAILED, completed_at=datetime.utcnow())
+
+        async with db_manager.async_session() as db:
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job.id, ProcessingJob.worker_id == worker_id)
+                .values(**values)
+            )
+            await db.commit()
+        return retry
+
+    # === Metrics ===
+
+    async def stats(self) -> Dict[str, Any]:
+        async with db_manager.async_session() as db:
+            result = await db.execute(
+                select(ProcessingJob.status, func.count()).group_by(ProcessingJob.status)
+            )
+            counts = {status: count for status, count in result.all()}
+        return {status: counts.get(status, 0) for status in (PENDING, RUNNING, COMPLETED, FAILED)}
+
+class JobWorker:
+    """Claims jobs from the queue and runs up to `concurrency` of them at once"""
+
+    def __init__(self, queue: JobQueue, concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None, worker_id: Optional[str] = None):
+        self.queue = queue
+        self.concurrency = concurrency or int(os.getenv("INGEST_WORKER_CONCURRENCY", "4"))
+        self.poll_interval = poll_interval or float(os.getenv("INGEST_POLL_SECONDS", "2"))
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+
+        self.metrics = {
+            "claimed": 0,
+            "completed": 0,
+            "retried": 0,
+            "failed": 0,
+            "lost_leases": 0,
+        }
+
+    def start(self) -> asyncio.Task:
+        self._loop_task = asyncio.create_task(self.run())
+        return self._loop_task
+
+    def notify(self):
+        """Poll right away, e.g. after enqueueing from this process"""
+        self._wakeup.set()
+
+    async def run(self):
+        logger.info("Job worker started", worker_id=self.worker_id, concurrency=self.concurrency)
+        while not self._stopping:
+            free = self.concurrency - len(self._running)
+            jobs: List[ProcessingJob] = []
+            if free > 0:
+                try:
+                    jobs = await self.queue.claim(self.worker_id, free)
+                except Exception as e:
+                    logger.error("Job claim failed", worker_id=self.worker_id, error=str(e))
+
+            for job in jobs:
+                self.metrics["claimed"] += 1
+                task = asyncio.create_task(self._run_job(job))
+                self._running.add(task)
+                task.add_done_callback(self._job_done)
+
+            # Full, or nothing due: wait for a slot, a notification or the next poll
+            if not jobs or len(self._running) >= self.concurrency:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _job_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _run_job(self, job: ProcessingJob):
+        handler = self.queue.handlers[job.job_type]
+        work = asyncio.create_task(handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, work))
+        try:
+            await work
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # Lease lost: the job belongs to whoever reclaimed it, so report nothing
+                return
+            raise
+        except Exception as e:
+            retry = await self.queue.fail(job, self.worker_id, str(e))
+            self.metrics["retried" if retry else "failed"] += 1
+            logger.error("Job failed", job_id=str(job.id), job_type=job.job_type,
+                         attempt=job.retry_count + 1, retry=retry, error=str(e))
+        else:
+            await self.queue.complete(job, self.worker_id)
+            self.metrics["completed"] += 1
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: ProcessingJob, work: asyncio.Task):
+        """Renew the lease until the job ends; cancel the job if the lease is lost"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.queue.renew(job, self.worker_id):
+                    self.metrics["lost_leases"] += 1
+                    logger.warning("Job lease lost, cancelling", job_id=str(job.id), worker_id=self.worker_id)
+                    work.cancel()
+                    return
+            except Exception as e:
+                logger.error("Job lease renewal failed", job_id=str(job.id), error=str(e))
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop claiming and give running jobs `timeout` seconds to finish
+
+        Jobs still running afterwards are cancelled; their leases expire and
+        another worker picks them up.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._loop_task is not None:
+            await self._loop_task
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.metrics, "worker_id": self.worker_id, "active": len(self._running),
+                "concurrency": self.concurrency}
+
+# Global job queue instance
+job_queue = JobQueue()
@@ -0,0 +1,226 @@
+"""
+Resumable Uploads
+
+On-disk state for chunked uploads that may arrive concurrently, out of order
+and across API restarts or worker processes. Each upload keeps three files in
+the temp directory:
+
+    <file_id>.tmp           preallocated data file, chunks land via pwrite
+    <file_id>.upload.json   manifest: expected size, chunk size, persona,
+                            and for replacements the new file name
+    <file_id>.chunks        one byte per chunk, set once that chunk is on disk
+
+The chunk map uses a whole byte per chunk so concurrent writers never
+read-modify-write shared state, and it is only updated after the chunk's data
+has been synced, so a resumed upload never trusts bytes that were lost.
+
+The SHA-256 is computed while chunks arrive. SHA-256 cannot combine
+independently hashed ranges, so the hash follows the contiguous frontier:
+a chunk landing at the frontier is hashed from memory, then any chunks that
+arrived ahead of it are read back (normally still in the page cache). Only
+the part a process has not hashed itself is read at completion.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from services.file_types import HEADER_BYTES
+except ImportError:
+    from .file_types import HEADER_BYTES
+
+class ResumableUpload:
+    """A chunked upload whose progress survives restarts"""
+
+    def __init__(self, temp_dir: Path, file_id: str, manifest: Dict[str, Any]):
+        self.file_id = file_id
+        self.expected_size = int(manifest["expected_size"])
+        self.chunk_size = int(manifest["chunk_size"])
+        self.persona_type = manifest.get("persona_type")
+        # Replacement uploads bring new content for an existing, already processed file
+        self.replaces = bool(manifest.get("replaces"))
+        self.filename = manifest.get("filename")
+
+        self.data_path = temp_dir / f"{file_id}.tmp"
+        self.manifest_path = temp_dir / f"{file_id}.upload.json"
+        self.map_path = temp_dir / f"{file_id}.chunks"
+        self.completion_path = temp_dir / f"{file_id}.completing"
+
+        # Per-process hash state; lost on restart, when finish_hash reads the rest
+        self.hash_lock = asyncio.Lock()
+        self._hasher = hashlib.sha256()
+        self.hashed_upto = 0
+        self._head: Optional[bytes] = None
+
+    @property
+    def num_chunks(self) -> int:
+        return max(1, -(-self.expected_size // self.chunk_size))
+
+    # === Lifecycle ===
+
+    @classmethod
+    def create(cls, temp_dir: Path, file_id: str, expected_size: int, chunk_size: int,
+               persona_type: Optional[str] = None, replaces: bool = False,
+               filename: Optional[str] = None) -> "ResumableUpload":
+        manifest = {"expected_size": expected_size, "chunk_size": chunk_size, "persona_type": persona_type}
+        if replaces:
+            manifest.update(replaces=True, filename=filename)
+        upload = cls(temp_dir, file_id, manifest)
+
+        fd = os.open(upload.data_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if expected_size and hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, expected_size)
+            else:
+                os.ftruncate(fd, expected_size)
+        finally:
+            os.close(fd)
+
+        with open(upload.map_path, "wb") as f:
+            f.write(bytes(upload.num_chunks))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The manifest is written last: its presence means the upload is usable
+        tmp_path = upload.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, upload.manifest_path)
+        return upload
+
+    @classmethod
+    def load(cls, temp_dir: Path, file_id: str) -> Optional["ResumableUpload"]:
+        manifest_path = temp_dir / f"{file_id}.upload.json"
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path) as f:
+            return cls(temp_dir, file_id, json.load(f))
+
+    def cleanup(self):
+        """Remove upload state; the data file is removed only if still in temp"""
+        for path in (self.manifest_path, self.map_path, self.completion_path, self.data_path):
+            if path.exists():
+                path.unlink()
+
+    # === Chunks ===
+
+    def validate_chunk(self, offset: int, size: int) -> Optional[str]:
+        """Return an error message if the chunk does not fit the upload layout"""
+        if offset < 0 or offset % self.chunk_size:
+            return f"Chunk offset must be a multiple of {self.chunk_size}"
+        if offset + size > self.expected_size:
+            return "Chunk extends past the declared file size"
+        if size != min(self.chunk_size, self.expected_size - offset):
+            return f"Chunk at offset {offset} must be {min(self.chunk_size, self.expected_size - offset)} bytes"
+        return None
+
+    def write_chunk(self, offset: int, data: bytes):
+        """Write a chunk at its offset, then record it in the chunk map (blocking)"""
+        fd = os.open(self.data_path, os.O_WRONLY)
+        try:
+            view = memoryview(data)
+            written = 0
+            while written < len(view):
+                written += os.pwrite(fd, view[written:], offset + written)
+            if hasattr(os, "fdatasync"):
+                os.fdatasync(fd)
+            else:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        fd = os.open(self.map_path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, b"\x01", offset // self.chunk_size)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def received(self) -> bytes:
+        with open(self.map_path, "rb") as f:
+            return f.read()
+
+    def received_bytes(self, chunk_map: Optional[bytes] = None) -> int:
+        chunk_map = self.received() if chunk_map is None else chunk_map
+        return sum(
+            min(self.chunk_size, self.expected_size - i * self.chunk_size)
+            for i in range(self.num_chunks) if chunk_map[i]
+        ) if self.expected_size else 0
+
+    def missing_ranges(self, chunk_map: Optional[bytes] = None) -> List[Tuple[int, int]]:
+        """Byte ranges [start, end) not yet received, adjacent chunks merged"""
+        chunk_map = self.received() if chunk_map is None else chunk_map
+        ranges: List[Tuple[int, int]] = []
+        for i in range(self.num_chunks):
+            if chunk_map[i] or self.expected_size == 0:
+                continue
+            start, end = i * self.chunk_size, min((i + 1) * self.chunk_size, self.expected_size)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def is_complete(self, chunk_map: Optional[bytes] = None) -> bool:
+        return not self.missing_ranges(chunk_map)
+
+    # === Checksum ===
+
+    def _read_range(self, start: int, end: int):
+        fd = os.open(self.data_path, os.O_RDONLY)
+        try:
+            while start < end:
+                block = os.pread(fd, min(self.chunk_size, end - start), start)
+                if not block:
+                    break
+                yield block
+                start += len(block)
+        finally:
+            os.close(fd)
+
+    def advance_hash(self, offset: int, data: bytes):
+        """Extend the running hash with a chunk that landed at the frontier (blocking)
+
+        Chunks that arrive out of order are left for the walk that follows
+        the frontier chunk, so every byte is hashed once.
+        """
+        if offset == 0:
+            self._head = bytes(data[:HEADER_BYTES])
+        if offset != self.hashed_upto:
+            return
+        self._hasher.update(data)
+        self.hashed_upto += len(data)
+
+        chunk_map = self.received()
+        while self.hashed_upto < self.expected_size and chunk_map[self.hashed_upto // self.chunk_size]:
+            end = min(self.hashed_upto + self.chunk_size, self.expected_size)
+            for block in self._read_range(self.hashed_upto, end):
+                self._hasher.update(block)
+            self.hashed_upto = end
+
+    def finish_hash(self) -> str:
+        """Hash whatever this process has not seen yet and return the hex digest (blocking)"""
+        for block in self._read_range(self.hashed_upto, self.expected_size):
+            self._hasher.update(block)
+        self.hashed_upto = self.expected_size
+        return self._hasher.hexdigest()
+
+    def header(self) -> bytes:
+        """Leading bytes for type detection; read back only if this process never saw the first chunk (blocking)"""
+        if self._head is None:
+            self._head = b"".join(self._read_range(0, min(HEADER_BYTES, self.expected_size)))
+        return self._head
+
+    def claim_completion(self) -> bool:
+        """Let exactly one request (in any worker) finalize the upload"""
+        try:
+            os.close(os.open(self.completion_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
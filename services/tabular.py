@@ -0,0 +1,239 @@
+"""
+Tabular Profiling
+
+Single-pass readers for CSV and XLSX files. Rows are streamed (csv iterator,
+openpyxl read-only mode) into a TabularProfile that keeps per-column type,
+null and range statistics, the first few rows for a preview and a reservoir
+sample of the whole file, so memory does not grow with the number of rows.
+
+When TABULAR_ROW_CHUNKS is enabled, groups of TABULAR_ROWS_PER_CHUNK rows are
+also written as segments to a JSON-lines sidecar, which embedding streams
+back like PDF pages so the table contents become searchable.
+"""
+
+import os
+import re
+import csv
+import json
+import random
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
+import openpyxl
+
+_INT = re.compile(r"^[+-]?\d+$")
+_FLOAT = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?")
+_BOOLEANS = {"true", "false", "yes", "no"}
+
+def value_type(value: Any) -> Optional[str]:
+    """Type name for a cell value; None for empty cells"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, (datetime, date, time)):
+        return "date"
+
+    text = str(value).strip()
+    if not text:
+        return None
+    if _INT.match(text):
+        return "integer"
+    if _FLOAT.match(text):
+        return "float"
+    if text.lower() in _BOOLEANS:
+        return "boolean"
+    if _DATE.match(text):
+        return "date"
+    return "text"
+
+def cell_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+class ColumnStats:
+    """Running statistics for one column"""
+
+    __slots__ = ("name", "nulls", "types", "minimum", "maximum", "max_length")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nulls = 0
+        self.types: Dict[str, int] = {}
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.max_length = 0
+
+    def add(self, value: Any):
+        kind = value_type(value)
+        if kind is None:
+            self.nulls += 1
+            return
+        self.types[kind] = self.types.get(kind, 0) + 1
+        if kind in ("integer", "float"):
+            number = float(value)
+            self.minimum = number if self.minimum is None else min(self.minimum, number)
+            self.maximum = number if self.maximum is None else max(self.maximum, number)
+        self.max_length = max(self.max_length, len(cell_text(value)))
+
+    @property
+    def dominant_type(self) -> str:
+        if not self.types:
+            return "empty"
+        if set(self.types) <= {"integer", "float"}:
+            return "float" if "float" in self.types else "integer"
+        return max(self.types, key=self.types.get)
+
+    def to_dict(self, rows: int) -> Dict[str, Any]:
+        stats = {
+            "name": self.name,
+            "type": self.dominant_type,
+            "nulls": self.nulls,
+            "null_ratio": round(self.nulls / rows, 4) if rows else 0.0,
+            "max_length": self.max_length,
+        }
+        if len(self.types) > 1:
+            stats["types"] = dict(self.types)
+        if self.minimum is not None:
+            stats["min"] = self.minimum
+            stats["max"] = self.maximum
+        return stats
+
+class TabularProfile:
+    """One-pass profile of a table: counts, column statistics, head and reservoir sample"""
+
+    def __init__(self, headers: Sequence[Any], head_size: int = 10, sample_size: int = 5,
+                 seed: int = 0):
+        self.headers = [cell_text(h) for h in headers]
+        self.columns = [ColumnStats(name) for name in self.headers]
+        self.rows = 0
+        self.head: List[List[str]] = []
+        self.sample: List[List[str]] = []
+        self.head_size = head_size
+        self.sample_size = sample_size
+        self._random = random.Random(seed)
+
+    def add(self, row: Sequence[Any]):
+        # Rows wider than the header get generated column names
+        while len(self.columns) < len(row):
+            column = ColumnStats(f"column_{len(self.columns) + 1}")
+            column.nulls = self.rows
+            self.columns.append(column)
+        for index, column in enumerate(self.columns):
+            column.add(row[index] if index < len(row) else None)
+
+        self.rows += 1
+        if len(self.head) < self.head_size:
+            self.head.append([cell_text(value) for value in row])
+
+        # Reservoir sampling (Algorithm R): every row is kept with equal probability
+        if len(self.sample) < self.sample_size:
+            self.sample.append([cell_text(value) for value in row])
+        else:
+            slot = self._random.randrange(self.rows)
+            if slot < self.sample_size:
+                self.sample[slot] = [cell_text(value) for value in row]
+
+    def column_stats(self) -> List[Dict[str, Any]]:
+        return [column.to_dict(self.rows) for column in self.columns]
+
+    def summary_lines(self) -> List[str]:
+        lines = [f"Headers: {', '.join(self.headers)}", ""]
+        lines += [f"Row {i + 1}: {', '.join(row)}" for i, row in enumerate(self.head)]
+        if self.rows > len(self.head):
+            lines.append(f"\n... and {self.rows - len(self.head)} more rows")
+        lines.append("")
+        lines += [
+            f"Column {stats['name']}: {stats['type']}, {stats['nulls']} empty"
+            + (f", range {stats['min']:g} to {stats['max']:g}" if 'min' in stats else "")
+            for stats in self.column_stats()
+        ]
+        return lines
+
+class RowGroupWriter:
+    """Writes groups of rows as (page, text) segments to a JSON-lines sidecar"""
+
+    def __init__(self, out: TextIO, rows_per_group: int):
+        self.out = out
+        self.rows_per_group = rows_per_group
+        self.groups = 0
+        self._label = ""
+        self._headers: List[str] = []
+        self._rows: List[str] = []
+        self._first_row = 0
+
+    def start_table(self, label: str, headers: Sequence[Any]):
+        self.flush()
+        self._label = label
+        self._headers = [cell_text(h) for h in headers]
+
+    def add(self, row_number: int, row: Sequence[Any]):
+        if not self._rows:
+            self._first_row = row_number
+        cells = [
+            f"{self._headers[i] if i < len(self._headers) and self._headers[i] else f'column_{i + 1}'}: {cell_text(value)}"
+            for i, value in enumerate(row) if value is not None and cell_text(value).strip()
+        ]
+        self._rows.append("; ".join(cells))
+        if len(self._rows) >= self.rows_per_group:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        last_row = self._first_row + len(self._rows) - 1
+        text = f"{self._label} rows {self._first_row}-{last_row}\n" + "\n".join(self._rows)
+        self.out.write(json.dumps({'page': None, 'text': text}) + "\n")
+        self.groups += 1
+        self._rows = []
+
+def row_chunks_enabled() -> bool:
+    return os.getenv("TABULAR_ROW_CHUNKS", "false").lower() == "true"
+
+def rows_per_chunk() -> int:
+    return int(os.getenv("TABULAR_ROWS_PER_CHUNK", "20"))
+
+# === Readers ===
+
+def iter_csv_rows(file_path: str) -> Iterator[List[str]]:
+    """Stream CSV rows, sniffing the dialect from the first few KB"""
+    with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as file:
+        head = file.read(64 * 1024)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(file, dialect)
+
+def iter_sheets(file_path: str) -> Iterator[tuple]:
+    """Yield (sheet name, row iterator) pairs from a workbook opened read-only"""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = (row for row in sheet.iter_rows(values_only=True)
+                    if any(cell is not None for cell in row))
+            yield sheet.title, rows
+    finally:
+        workbook.close()
+
+def profile_rows(rows: Iterable[Sequence[Any]], writer: Optional[RowGroupWriter] = None,
+                 label: str = "Table") -> Optional[TabularProfile]:
+    """Profile a row stream whose first row is the header; None if it is empty"""
+    rows = iter(rows)
+    headers = next(rows, None)
+    if headers is None:
+        return None
+    profile = TabularProfile(headers)
+    if writer is not None:
+        writer.start_table(label, headers)
+    for row_number, row in enumerate(rows, start=1):
+        profile.add(row)
+        if writer is not None:
+            writer.add(row_number, row)
+    if writer is not None:
+        writer.flush()
+    return profile
@@ -85,6 +85,15 @@ manager = ConnectionManager()
 class WebSocketService:
     def __init__(self):
         self.manager = manager
+        self.search_tasks: Set[asyncio.Task] = set()
+    
+    async def connect(self, websocket: WebSocket, user_id: str):
+        """Accept a connection and register it with the connection manager"""
+        await self.manager.connect(websocket, user_id)
+    
+    async def disconnect(self, user_id: str):
+        """Forget a connection and its subscriptions"""
+        self.manager.disconnect(user_id)
     
     async def handle_connection(self, websocket: WebSocket, user_id: str):
         """Handle a new WebSocket connection"""
@@ -131,6 +140,9 @@ class WebSocketService:
             elif message_type == "get_status":
                 await self.send_connection_status(user_id)
             
+            elif message_type == "search_query":
+                self.start_search(message, user_id)
+            
             else:
                 logger.warning(f"Unknown message type: {message_type}")
                 
@@ -139,6 +151,43 @@ class WebSocketService:
         except Exception as e:
             logger.error(f"Error handling message from user {user_id}: {e}")
     
+    def start_search(self, message: dict, user_id: str):
+        """Run a search in the background, streaming its events to the user"""
+        task = asyncio.create_task(self.stream_search(message, user_id))
+        self.search_tasks.add(task)
+        task.add_done_callback(self.search_tasks.discard)
+    
+    async def stream_search(self, message: dict, user_id: str):
+        """Send each search event (provider results, re-blended ranking, summary) as it happens
+        
+        The message carries the search fields of SearchRequest (query, persona,
+        search_mode, ...) and an optional search_id that is echoed on every event.
+        """
+        search_id = message.get("search_id")
+        try:
+            from advanced_search_engine import SearchRequest, event_payload, search_orchestrator
+            
+            fields = {key: value for key, value in message.items() if key not in ("type", "search_id")}
+            events = search_orchestrator.stream_search(SearchRequest(**fields))
+            try:
+                async for event in events:
+                    if user_id not in self.manager.active_connections:
+                        break  # Closing the stream cancels providers still running
+                    payload = event_payload(event)
+                    payload["search_id"] = search_id
+                    payload["timestamp"] = datetime.now().isoformat()
+                    await self.manager.send_personal_message(payload, user_id)
+            finally:
+                await events.aclose()
+        except Exception as e:
+            logger.error(f"Streaming search failed for user {user_id}: {e}")
+            await self.manager.send_personal_message({
+                "type": "search_failed",
+                "search_id": search_id,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }, user_id)
+    
     async def send_connection_status(self, user_id: str):
         """Send connection status to user"""
         subscriptions = list(self.manager.user_subscriptions.get(user_id, set()))
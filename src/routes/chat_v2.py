@@ -3,10 +3,17 @@ Orchestra AI - Chat v2 API Routes (CLEANED)
 Integrates with LangGraph orchestrator for enhanced search and chat
 """
 
-from flask import Blueprint, request, jsonify
-from typing import Dict, Any
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from typing import Dict, Any, Awaitable, Optional, TypeVar
 import asyncio
+import atexit
+import json
 import logging
+import threading
+import time
+
+from search_cache import search_cache
+from search_http_client import provider_http
 
 # Fixed imports - removed non-existent modules
 try:
@@ -22,6 +29,48 @@ chat_v2_bp = Blueprint('chat_v2', __name__)
 # Global orchestrator instance
 orchestrator = None
 
+T = TypeVar('T')
+
+# Flask handles requests on plain threads. Their coroutines all run on one
+# long-lived loop in a background thread instead of a new loop per request:
+# the provider HTTP pool and the search cache's Redis client are kept per
+# loop, so a loop per request would open new connections for every search and
+# leave them unclosed, and stale-cache refreshes scheduled on a discarded loop
+# would never run.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The shared event loop, started on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='chat-v2-loop', daemon=True).start()
+            atexit.register(_stop_background_loop, loop)
+            _loop = loop
+    return _loop
+
+def run_async(awaitable: Awaitable[T]) -> T:
+    """Run a coroutine on the shared loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(awaitable, _background_loop()).result()
+
+async def _close_clients():
+    # Cache refreshes still in flight need the HTTP pool, so the cache closes first
+    await search_cache.close()
+    await provider_http.close()
+
+def _stop_background_loop(loop: asyncio.AbstractEventLoop):
+    """Close pooled clients on the shared loop, then stop it (at exit)"""
+    if not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_close_clients(), loop).result(timeout=10)
+    except Exception as e:
+        logger.warning(f"Closing search clients failed: {str(e)}")
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+
 def get_orchestrator():
     """Get or create orchestrator instance"""
     global orchestrator
@@ -82,11 +131,8 @@ def chat_with_search():
                 'session_id': session_id
             }), 200
         
-        # Execute orchestration
-        # Run async function in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(orch.execute({
+        # Execute orchestration on the shared loop
+        result = run_async(orch.execute({
             'query': message,
             'persona': persona,
             'search_mode': search_mode,
@@ -167,16 +213,14 @@ def unified_search():
             return jsonify({'error': 'Search manager not available'}), 503
         
         # Execute search
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        results = loop.run_until_complete(search_manager.execute_search(
+        search = run_async(search_manager.execute_search_detailed(
             query=query,
             mode=search_mode,
             persona=persona,
             blend_ratio=blend_ratio,
             max_results=50
         ))
+        results = search['results_by_provider']
         
         # Blend results
         try:
@@ -191,7 +235,7 @@ def unified_search():
                 'blend_ratio_applied': blend_ratio or {'database': 0.5, 'web': 0.5}
             }
         else:
-            blended = loop.run_until_complete(blender.blend_results(
+            blended = run_async(blender.blend_results(
                 results_by_source=results,
                 query=query,
                 persona=persona,
@@ -206,6 +250,7 @@ def unified_search():
             'sources_used': blended['sources_used'],
             'search_mode': search_mode,
             'blend_ratio_applied': blended['blend_ratio_applied'],
+            'providers': search['providers'],
             'processing_time_ms': 0  # TODO: Add timing
         }
         
@@ -218,6 +263,103 @@ def unified_search():
             'details': str(e) if request.headers.get('X-Debug') else None
         }), 500
 
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@chat_v2_bp.route('/api/search/v2/stream', methods=['POST'])
+def unified_search_stream():
+    """
+    Streaming variant of /api/search/v2 (Server-Sent Events)
+    
+    Same request body. Emits provider_results as each provider answers,
+    blended (the ranking of everything received so far) after each provider
+    with results, and search_completed with the final ranking, summary and
+    per-provider status.
+    """
+    data = request.get_json()
+    
+    if not data or 'query' not in data:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    query = data['query']
+    persona = data.get('persona', 'cherry')
+    search_mode = data.get('search_mode', 'normal')
+    blend_ratio = data.get('blend_ratio') or {'database': 0.5, 'web': 0.5}
+    
+    orch = get_orchestrator()
+    if not orch:
+        return jsonify({'error': 'Advanced search system is being set up'}), 503
+    
+    try:
+        from ..search.unified_search_manager import UnifiedSearchManager
+        from ..search.result_blender import SearchResultBlender
+    except ImportError:
+        return jsonify({'error': 'Search manager not available'}), 503
+    
+    search_manager = UnifiedSearchManager()
+    blender = SearchResultBlender(orch.redis_client, orch.pinecone_index)
+    
+    def blend(results_by_provider):
+        # The blender annotates result dicts in place, so each pass gets fresh copies
+        return run_async(blender.blend_results(
+            results_by_source={
+                provider: [dict(result) for result in results]
+                for provider, results in results_by_provider.items()
+            },
+            query=query,
+            persona=persona,
+            blend_ratio=blend_ratio
+        ))
+    
+    def events():
+        started = time.time()
+        stream = search_manager.stream_search(query=query, mode=search_mode, persona=persona, max_results=50)
+        received = {}
+        try:
+            while True:
+                try:
+                    event = run_async(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+                
+                if event['type'] == 'provider_results':
+                    yield _sse(event)
+                    if event['status'] == 'ok' and event['results']:
+                        received[event['provider']] = event['results']
+                        blended = blend(received)
+                        yield _sse({
+                            'type': 'blended',
+                            'total_results': len(blended['results']),
+                            'results': blended['results'][:20]
+                        })
+                    continue
+                
+                blended = blend(event['results_by_provider'])
+                yield _sse({
+                    'type': 'search_completed',
+                    'query': query,
+                    'total_results': len(blended['results']),
+                    'results': blended['results'][:20],
+                    'summary': blended.get('summary', ''),
+                    'sources_used': blended['sources_used'],
+                    'search_mode': search_mode,
+                    'blend_ratio_applied': blended['blend_ratio_applied'],
+                    'providers': event['providers'],
+                    'processing_time_ms': int((time.time() - started) * 1000)
+                })
+        except Exception as e:
+            logger.error(f"Search v2 stream error: {str(e)}", exc_info=True)
+            yield _sse({'type': 'search_failed', 'error': 'Search failed'})
+        finally:
+            # Also runs when the client disconnects: cancels providers still running
+            run_async(stream.aclose())
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @chat_v2_bp.route('/api/search/modes', methods=['GET'])
 def get_search_modes():
     """Get available search modes and their descriptions"""
@@ -267,13 +409,10 @@ def get_chat_context(session_id):
         
         # Load context from Redis
         context_key = f"context:{session_id}"
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        context_data = loop.run_until_complete(orch.redis_client.lrange(context_key, 0, -1))
+        context_data = run_async(orch.redis_client.lrange(context_key, 0, -1))
         
         context = []
         for entry in context_data:
-            import json
             context.append(json.loads(entry))
         
         return jsonify({
@@ -7,11 +7,11 @@ import asyncio
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import hashlib
 import logging
 
+from .dedup import ResultDeduplicator
+
 logger = logging.getLogger(__name__)
 
 class SearchResultBlender:
@@ -20,7 +20,7 @@ class SearchResultBlender:
     def __init__(self, redis_client, pinecone_index):
         self.redis = redis_client
         self.pinecone = pinecone_index
-        self.tfidf_vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        self.deduplicator = ResultDeduplicator()
         
     async def blend_results(
         self,
@@ -108,88 +108,16 @@ class SearchResultBlender:
     async def _deduplicate_results(self, results: List[Dict]) -> Tuple[List[Dict], int]:
         """
         Deduplicate results using multiple strategies:
-        1. Exact URL matching
-        2. Title similarity
-        3. Content similarity using TF-IDF
-        """
-        
-        # Track seen URLs and similar content
-        seen_urls = set()
-        seen_titles = {}
-        unique_results = []
-        duplicate_count = 0
-        
-        # Extract text for similarity comparison
-        texts = [f"{r.get('title', '')} {r.get('content', '')}" for r in results]
-        
-        # Compute TF-IDF vectors if we have enough results
-        similarity_matrix = None
-        if len(texts) > 5:
-            try:
-                tfidf_matrix = self.tfidf_vectorizer.fit_transform(texts)
-                similarity_matrix = cosine_similarity(tfidf_matrix)
-            except Exception as e:
-                logger.warning(f"TF-IDF calculation failed: {e}")
-        
-        for i, result in enumerate(results):
-            url = result.get('url', '')
-            title = result.get('title', '')
-            
-            # Check exact URL match
-            if url and url in seen_urls:
-                duplicate_count += 1
-                continue
-            
-            # Check title similarity
-            is_duplicate = False
-            for seen_title, seen_idx in seen_titles.items():
-                if self._calculate_string_similarity(title, seen_title) > 0.85:
-                    # Merge metadata from duplicate
-                    unique_results[seen_idx]['sources'] = unique_results[seen_idx].get('sources', [])
-                    unique_results[seen_idx]['sources'].append(result['original_source'])
-                    duplicate_count += 1
-                    is_duplicate = True
-                    break
-            
-            if is_duplicate:
-                continue
-            
-            # Check content similarity using TF-IDF
-            if similarity_matrix is not None:
-                similarities = similarity_matrix[i]
-                for j in range(i):
-                    if similarities[j] > 0.8:  # High similarity threshold
-                        duplicate_count += 1
-                        is_duplicate = True
-                        break
-            
-            if not is_duplicate:
-                result['sources'] = [result['original_source']]
-                unique_results.append(result)
-                if url:
-                    seen_urls.add(url)
-                if title:
-                    seen_titles[title] = len(unique_results) - 1
-        
-        return unique_results, duplicate_count
-    
-    def _calculate_string_similarity(self, s1: str, s2: str) -> float:
-        """Calculate similarity between two strings using Jaccard similarity"""
-        if not s1 or not s2:
-            return 0.0
+        1. Exact URL matching (normalized)
+        2. Title similarity (word Jaccard >= 0.85)
+        3. Content similarity (shingle Jaccard >= 0.6)
         
-        # Convert to lowercase and split into words
-        words1 = set(s1.lower().split())
-        words2 = set(s2.lower().split())
-        
-        # Calculate Jaccard similarity
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        if not union:
-            return 0.0
+        Similar results are found through MinHash/LSH buckets rather than by
+        comparing every pair; each kept result lists the sources of all its
+        duplicates.
+        """
         
-        return len(intersection) / len(union)
+        return self.deduplicator.deduplicate(results)
     
     async def _calculate_relevance_scores(
         self,
@@ -4,13 +4,14 @@ Handles parallel search execution across multiple providers
 """
 
 import os
-import asyncio
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import logging
-import aiohttp
 import json
 
+from search_cache import search_cache
+from search_fanout import OK, TIMEOUT, FanOut, ProviderOutcome
+from search_http_client import provider_http
 from ..database.models import SearchResult
 from ..utils.api_config import get_api_config
 
@@ -88,55 +89,115 @@ class UnifiedSearchManager:
     ) -> Dict[str, List[Dict]]:
         """Execute unified search across configured providers"""
         
-        mode_config = self.search_modes.get(mode, self.search_modes["normal"])
-        providers = mode_config["providers"]
+        search = await self.execute_search_detailed(query, mode, persona, blend_ratio, max_results)
+        return search["results_by_provider"]
+    
+    async def execute_search_detailed(
+        self,
+        query: str,
+        mode: str = "normal",
+        persona: str = "cherry",
+        blend_ratio: Optional[Dict[str, float]] = None,
+        max_results: int = 20
+    ) -> Dict[str, Any]:
+        """Execute unified search and report how each provider fared
+        
+        Returns results_by_provider (every provider of the mode, [] for those
+        that failed, timed out or are disabled) and providers, each
+        provider's status, latency and result count.
+        """
         
-        # Use custom blend ratio if provided
-        if not blend_ratio:
-            blend_ratio = mode_config["blend_ratio"]
+        fanout = self.build_fanout(query, mode, persona, max_results)
+        outcomes = await fanout.run()
         
-        # Execute searches in parallel
-        search_tasks = []
+        return self.summarize_outcomes(mode, outcomes)
+    
+    async def stream_search(
+        self,
+        query: str,
+        mode: str = "normal",
+        persona: str = "cherry",
+        max_results: int = 20
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield provider_results as each provider finishes, then search_completed
+        
+        search_completed carries what execute_search_detailed returns.
+        """
+        
+        fanout = self.build_fanout(query, mode, persona, max_results)
+        outcomes = {}
+        async for outcome in fanout.as_completed():
+            outcomes[outcome.provider] = outcome
+            yield {
+                "type": "provider_results",
+                "provider": outcome.provider,
+                **outcome.to_dict(),
+                "results": outcome.results
+            }
         
-        for provider in providers:
+        yield {"type": "search_completed", **self.summarize_outcomes(mode, outcomes)}
+    
+    def build_fanout(self, query: str, mode: str, persona: str, max_results: int) -> FanOut:
+        """FanOut over the enabled providers of a mode, bounded by its max_time"""
+        
+        mode_config = self.search_modes.get(mode, self.search_modes["normal"])
+        fanout = FanOut(deadline=mode_config["max_time"])
+        
+        for provider in mode_config["providers"]:
             if provider == "database":
-                task = self._search_database(query, persona, max_results)
+                fetch = lambda: self._search_database(query, persona, max_results)
             elif provider == "duckduckgo":
-                task = self._search_duckduckgo(query, max_results)
+                fetch = lambda: self._search_duckduckgo(query, max_results)
             elif provider == "exa_ai" and self.api_configs["exa_ai"]["enabled"]:
-                task = self._search_exa_ai(query, max_results)
+                fetch = lambda: self._search_exa_ai(query, max_results)
             elif provider == "serp" and self.api_configs["serp"]["enabled"]:
-                task = self._search_serp(query, max_results)
+                fetch = lambda: self._search_serp(query, max_results)
             elif provider == "venice_ai" and self.api_configs["venice_ai"]["enabled"]:
-                task = self._search_venice_ai(query, max_results)
+                fetch = lambda: self._search_venice_ai(query, max_results)
             elif provider == "apify" and self.api_configs["apify"]["enabled"]:
-                task = self._search_apify(query, max_results)
+                fetch = lambda: self._search_apify(query, max_results)
             elif provider == "zenrows" and self.api_configs["zenrows"]["enabled"]:
-                task = self._search_zenrows(query, max_results)
+                fetch = lambda: self._search_zenrows(query, max_results)
             else:
                 continue
             
-            search_tasks.append(task)
+            fanout.add(provider, self._cached_fetch(provider, mode, persona, query, max_results, fetch), cached=True)
         
-        # Wait for all searches with timeout
-        try:
-            results = await asyncio.wait_for(
-                asyncio.gather(*search_tasks, return_exceptions=True),
-                timeout=mode_config["max_time"]
-            )
-        except asyncio.TimeoutError:
-            logger.warning(f"Search timeout after {mode_config['max_time']}s")
-            results = []
+        return fanout
+    
+    def summarize_outcomes(self, mode: str, outcomes: Dict[str, ProviderOutcome]) -> Dict[str, Any]:
+        """Results and status by provider, including the mode's disabled providers"""
         
-        # Aggregate results by provider
+        mode_config = self.search_modes.get(mode, self.search_modes["normal"])
         results_by_provider = {}
-        for i, provider in enumerate(providers):
-            if i < len(results) and not isinstance(results[i], Exception):
-                results_by_provider[provider] = results[i]
-            else:
+        providers = {}
+        for provider in mode_config["providers"]:
+            outcome = outcomes.get(provider)
+            if outcome is None:
                 results_by_provider[provider] = []
+                providers[provider] = {"status": "disabled", "latency_ms": 0, "result_count": 0}
+                continue
+            results_by_provider[provider] = outcome.results if outcome.status == OK else []
+            providers[provider] = outcome.to_dict()
         
-        return results_by_provider
+        missed = [name for name, report in providers.items() if report["status"] == TIMEOUT]
+        if missed:
+            logger.warning(f"Search providers missed the {mode_config['max_time']}s deadline: {missed}")
+        
+        return {
+            "results_by_provider": results_by_provider,
+            "providers": providers,
+            "deadline_ms": mode_config["max_time"] * 1000
+        }
+    
+    def _cached_fetch(self, provider: str, mode: str, persona: str, query: str,
+                      max_results: int, fetch):
+        """Wrap a provider fetch so it is answered from the search cache when possible"""
+        async def cached() -> Tuple[List[Dict], str]:
+            return await search_cache.get_or_fetch(
+                provider, mode, persona, query, fetch, variant=str(max_results)
+            )
+        return cached
     
     async def _search_database(self, query: str, persona: str, max_results: int) -> List[Dict]:
         """Search internal database"""
@@ -195,44 +256,39 @@ class UnifiedSearchManager:
             return []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {config['api_key']}",
-                    "Content-Type": "application/json"
-                }
-                
-                data = {
-                    "query": query,
-                    "num_results": max_results,
-                    "use_autoprompt": True,
-                    "type": "neural"
+            headers = {
+                "Authorization": f"Bearer {config['api_key']}",
+                "Content-Type": "application/json"
+            }
+            
+            data = {
+                "query": query,
+                "num_results": max_results,
+                "use_autoprompt": True,
+                "type": "neural"
+            }
+            
+            status, result_data = await provider_http.fetch_json(
+                "exa_ai", "POST", config["endpoint"], headers=headers, json=data
+            )
+            if result_data is None:
+                logger.error(f"Exa AI error: {status}")
+                return []
+            
+            return [
+                {
+                    "title": r.get("title", ""),
+                    "content": r.get("text", ""),
+                    "url": r.get("url", ""),
+                    "source": "Exa AI",
+                    "relevance_score": r.get("score", 0.0),
+                    "metadata": {
+                        "published_date": r.get("published_date"),
+                        "author": r.get("author")
+                    }
                 }
-                
-                async with session.post(
-                    config["endpoint"],
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status == 200:
-                        result_data = await response.json()
-                        
-                        return [
-                            {
-                                "title": r.get("title", ""),
-                                "content": r.get("text", ""),
-                                "url": r.get("url", ""),
-                                "source": "Exa AI",
-                                "relevance_score": r.get("score", 0.0),
-                                "metadata": {
-                                    "published_date": r.get("published_date"),
-                                    "author": r.get("author")
-                                }
-                            }
-                            for r in result_data.get("results", [])
-                        ]
-                    else:
-                        logger.error(f"Exa AI error: {response.status}")
-                        return []
+                for r in result_data.get("results", [])
+            ]
                         
         except Exception as e:
             logger.error(f"Exa AI search error: {e}")
@@ -245,40 +301,36 @@ class UnifiedSearchManager:
             return []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "q": query,
-                    "api_key": config["api_key"],
-                    "engine": "google",
-                    "num": max_results,
-                    "output": "json"
-                }
-                
-                async with session.get(
-                    config["endpoint"],
-                    params=params
-                ) as response:
-                    if response.status == 200:
-                        result_data = await response.json()
-                        
-                        results = []
-                        for r in result_data.get("organic_results", []):
-                            results.append({
-                                "title": r.get("title", ""),
-                                "content": r.get("snippet", ""),
-                                "url": r.get("link", ""),
-                                "source": "Google (SERP)",
-                                "relevance_score": r.get("position", 100) / 100,
-                                "metadata": {
-                                    "date": r.get("date"),
-                                    "displayed_link": r.get("displayed_link")
-                                }
-                            })
-                        
-                        return results
-                    else:
-                        logger.error(f"SERP API error: {response.status}")
-                        return []
+            params = {
+                "q": query,
+                "api_key": config["api_key"],
+                "engine": "google",
+                "num": max_results,
+                "output": "json"
+            }
+            
+            status, result_data = await provider_http.fetch_json(
+                "serp", "GET", config["endpoint"], params=params
+            )
+            if result_data is None:
+                logger.error(f"SERP API error: {status}")
+                return []
+            
+            results = []
+            for r in result_data.get("organic_results", []):
+                results.append({
+                    "title": r.get("title", ""),
+                    "content": r.get("snippet", ""),
+                    "url": r.get("link", ""),
+                    "source": "Google (SERP)",
+                    "relevance_score": r.get("position", 100) / 100,
+                    "metadata": {
+                        "date": r.get("date"),
+                        "displayed_link": r.get("displayed_link")
+                    }
+                })
+            
+            return results
                         
         except Exception as e:
             logger.error(f"SERP API search error: {e}")
@@ -291,44 +343,39 @@ class UnifiedSearchManager:
             return []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {config['api_key']}",
-                    "Content-Type": "application/json"
-                }
-                
-                data = {
-                    "query": query,
-                    "max_results": max_results,
-                    "safe_mode": False,  # Uncensored mode
-                    "include_adult": True
+            headers = {
+                "Authorization": f"Bearer {config['api_key']}",
+                "Content-Type": "application/json"
+            }
+            
+            data = {
+                "query": query,
+                "max_results": max_results,
+                "safe_mode": False,  # Uncensored mode
+                "include_adult": True
+            }
+            
+            status, result_data = await provider_http.fetch_json(
+                "venice_ai", "POST", config["endpoint"], headers=headers, json=data
+            )
+            if result_data is None:
+                logger.error(f"Venice AI error: {status}")
+                return []
+            
+            return [
+                {
+                    "title": r.get("title", ""),
+                    "content": r.get("description", ""),
+                    "url": r.get("url", ""),
+                    "source": "Venice AI (Uncensored)",
+                    "relevance_score": r.get("relevance", 0.0),
+                    "metadata": {
+                        "content_type": r.get("content_type"),
+                        "uncensored": True
+                    }
                 }
-                
-                async with session.post(
-                    config["endpoint"],
-                    headers=headers,
-                    json=data
-                ) as response:
-                    if response.status == 200:
-                        result_data = await response.json()
-                        
-                        return [
-                            {
-                                "title": r.get("title", ""),
-                                "content": r.get("description", ""),
-                                "url": r.get("url", ""),
-                                "source": "Venice AI (Uncensored)",
-                                "relevance_score": r.get("relevance", 0.0),
-                                "metadata": {
-                                    "content_type": r.get("content_type"),
-                                    "uncensored": True
-                                }
-                            }
-                            for r in result_data.get("results", [])
-                        ]
-                    else:
-                        logger.error(f"Venice AI error: {response.status}")
-                        return []
+                for r in result_data.get("results", [])
+            ]
                         
         except Exception as e:
             logger.error(f"Venice AI search error: {e}")
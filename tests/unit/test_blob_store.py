@@ -0,0 +1,153 @@
+"""
+Orchestra AI - Blob Store Unit Tests
+Tests reference counting and storage of content-addressed upload blobs
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import hashlib
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+pytest.importorskip("services.blob_store")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from database.models import Base, ContentBlob
+from services.blob_store import BlobStore
+
+CONTENT = b"quarterly numbers\n"
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'blobs.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+def upload(tmp_path, name, content=CONTENT):
+    """A finished upload in the temp directory"""
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+def acquire(sessions, store, source_path, checksum=CHECKSUM):
+    async def run():
+        async with sessions() as db:
+            blob = await store.acquire(db, checksum, source_path, source_path.stat().st_size, suffix=".TXT")
+            await db.commit()
+            return blob.storage_path, blob.ref_count
+    return asyncio.run(run())
+
+def release(sessions, store, checksum=CHECKSUM):
+    async def run():
+        async with sessions() as db:
+            removable = await store.release(db, checksum)
+            await db.commit()
+            return removable
+    return asyncio.run(run())
+
+def ref_count(sessions, checksum=CHECKSUM):
+    async def run():
+        async with sessions() as db:
+            blob = (await db.execute(select(ContentBlob).where(ContentBlob.checksum == checksum))).scalar_one_or_none()
+            return blob.ref_count if blob else None
+    return asyncio.run(run())
+
+class TestAcquire:
+    """Content is stored once per checksum"""
+
+    def test_first_upload_is_moved_into_the_store(self, sessions, store, tmp_path):
+        source = upload(tmp_path, "a.tmp")
+
+        storage_path, references = acquire(sessions, store, source)
+
+        assert storage_path == str(store.path_for(CHECKSUM, ".txt"))
+        assert storage_path.endswith(f"/{CHECKSUM[:2]}/{CHECKSUM}.txt")
+        assert open(storage_path, "rb").read() == CONTENT
+        assert references == 1
+        assert not source.exists()
+        assert store.owns(storage_path)
+
+    def test_duplicate_adds_a_reference_and_drops_its_copy(self, sessions, store, tmp_path):
+        first_path, _ = acquire(sessions, store, upload(tmp_path, "a.tmp"))
+        duplicate = upload(tmp_path, "b.tmp")
+
+        storage_path, references = acquire(sessions, store, duplicate)
+
+        assert storage_path == first_path
+        assert references == 2
+        assert ref_count(sessions) == 2
+        assert not duplicate.exists()
+
+    def test_missing_stored_copy_is_replaced(self, sessions, store, tmp_path):
+        storage_path, _ = acquire(sessions, store, upload(tmp_path, "a.tmp"))
+        os.remove(storage_path)
+
+        acquire(sessions, store, upload(tmp_path, "b.tmp"))
+
+        assert open(storage_path, "rb").read() == CONTENT
+
+    def test_paths_outside_the_store(self, store, tmp_path):
+        assert not store.owns(str(tmp_path / "uploads" / "legacy.pdf"))
+        assert not store.owns(None)
+
+class TestRelease:
+    """The last reference removes the row and hands back the file"""
+
+    def test_release_keeps_shared_content(self, sessions, store, tmp_path):
+        acquire(sessions, store, upload(tmp_path, "a.tmp"))
+        acquire(sessions, store, upload(tmp_path, "b.tmp"))
+
+        assert release(sessions, store) is None
+        assert ref_count(sessions) == 1
+
+    def test_last_release_returns_the_file_to_delete(self, sessions, store, tmp_path):
+        storage_path, _ = acquire(sessions, store, upload(tmp_path, "a.tmp"))
+        acquire(sessions, store, upload(tmp_path, "b.tmp"))
+
+        release(sessions, store)
+        removable = release(sessions, store)
+
+        assert str(removable) == storage_path
+        assert ref_count(sessions) is None
+        # Deleting the file is left to the caller, after its commit
+        assert removable.exists()
+
+    def test_content_can_be_stored_again_after_removal(self, sessions, store, tmp_path):
+        acquire(sessions, store, upload(tmp_path, "a.tmp"))
+        release(sessions, store).unlink()
+
+        storage_path, references = acquire(sessions, store, upload(tmp_path, "b.tmp"))
+
+        assert references == 1
+        assert open(storage_path, "rb").read() == CONTENT
+
+    def test_unknown_checksum(self, sessions, store):
+        assert release(sessions, store, "0" * 64) is None
+
+    def test_release_is_rolled_back_with_its_transaction(self, sessions, store, tmp_path):
+        acquire(sessions, store, upload(tmp_path, "a.tmp"))
+
+        async def run():
+            async with sessions() as db:
+                removable = await store.release(db, CHECKSUM)
+                await db.rollback()
+                return removable
+
+        assert asyncio.run(run()) is not None
+        assert ref_count(sessions) == 1
@@ -0,0 +1,117 @@
+"""
+Orchestra AI - Token Chunker Unit Tests
+Tests token limits, overlap, headings and page tracking of TokenChunker
+"""
+
+import pytest
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+chunker_module = pytest.importorskip("services.chunker")
+TokenChunker = chunker_module.TokenChunker
+estimate_tokens = chunker_module.estimate_tokens
+
+def sentences(count, words=8, prefix="s"):
+    return [" ".join(f"{prefix}{i}w{j}" for j in range(words)) + "." for i in range(count)]
+
+class TestTokenLimits:
+    """Chunks never exceed the model limit and lose no text"""
+
+    def test_chunks_fit_max_tokens(self):
+        chunker = TokenChunker(max_tokens=40, overlap_tokens=10)
+        text = " ".join(sentences(30))
+
+        chunks = chunker.split(text)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+
+    def test_every_sentence_is_kept_in_order(self):
+        chunker = TokenChunker(max_tokens=40, overlap_tokens=10)
+        parts = sentences(30)
+
+        joined = " ".join(chunker.split(" ".join(parts)))
+
+        positions = [joined.find(sentence) for sentence in parts]
+        assert -1 not in positions
+        assert positions == sorted(positions)
+
+    def test_short_text_is_one_chunk(self):
+        chunker = TokenChunker(max_tokens=100)
+        assert chunker.split("One sentence. Another one.") == ["One sentence. Another one."]
+
+    def test_empty_text_has_no_chunks(self):
+        assert TokenChunker(max_tokens=100).split("  \n\n ") == []
+
+    def test_long_sentence_is_split_on_tokens(self):
+        chunker = TokenChunker(max_tokens=10, overlap_tokens=0)
+        words = [f"word{i}" for i in range(35)]
+
+        chunks = chunker.split(" ".join(words))
+
+        assert [estimate_tokens(chunk) for chunk in chunks] == [10, 10, 10, 5]
+        assert " ".join(chunks).split() == words
+
+class TestOverlapAndStructure:
+    """Overlap carried between chunks, headings and paragraphs"""
+
+    def test_trailing_sentences_are_carried_over(self):
+        chunker = TokenChunker(max_tokens=40, overlap_tokens=10)
+        chunks = chunker.split(" ".join(sentences(12)))
+
+        for previous, current in zip(chunks, chunks[1:]):
+            last_sentence = previous.rsplit(". ", 1)[-1]
+            assert current.startswith(last_sentence.rstrip("."))
+
+    def test_no_overlap_when_disabled(self):
+        chunker = TokenChunker(max_tokens=40, overlap_tokens=0)
+        parts = sentences(12)
+
+        chunks = chunker.split(" ".join(parts))
+
+        assert " ".join(chunks) == " ".join(parts)
+
+    def test_overlap_is_capped_at_half_the_limit(self):
+        assert TokenChunker(max_tokens=40, overlap_tokens=100).overlap_tokens == 20
+
+    def test_heading_starts_a_new_chunk(self):
+        chunker = TokenChunker(max_tokens=200, overlap_tokens=20)
+        text = "Intro sentence here.\n\n# Methods\n\nWe measured things.\n\n2.1 Results\n\nIt worked."
+
+        chunks = chunker.split(text)
+
+        assert chunks == ["Intro sentence here.", "# Methods\n\nWe measured things.", "2.1 Results\n\nIt worked."]
+
+    def test_paragraphs_keep_blank_line_separator(self):
+        chunker = TokenChunker(max_tokens=200)
+        assert chunker.split("First paragraph.\n\n\nSecond paragraph.") == ["First paragraph.\n\nSecond paragraph."]
+
+class TestPages:
+    """Chunks report the pages they span"""
+
+    def test_page_range_of_chunks(self):
+        chunker = TokenChunker(max_tokens=40, overlap_tokens=0)
+        segments = [(page, " ".join(sentences(3, prefix=f"p{page}s"))) for page in (1, 2, 3)]
+
+        chunks = list(chunker.iter_chunks(segments))
+
+        assert chunks[0][1] == 1
+        assert chunks[-1][2] == 3
+        for text, first, last in chunks:
+            assert first <= last
+            assert f"p{first}s" in text and f"p{last}s" in text
+
+    def test_tokenizer_counts_are_used(self):
+        class CharTokenizer:
+            """One token per character"""
+            def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+                if isinstance(texts, str):
+                    return {"input_ids": list(texts), "offset_mapping": [(i, i + 1) for i in range(len(texts))]}
+                return {"input_ids": [list(text) for text in texts]}
+
+        chunker = TokenChunker(tokenizer=CharTokenizer(), max_tokens=12, overlap_tokens=0)
+
+        assert chunker.split("abc. defghij. klmnopqrstuvwxyz") == ["abc. defghij.", "klmnopqrstuv", "wxyz"]
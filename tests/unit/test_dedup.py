@@ -0,0 +1,137 @@
+"""
+Orchestra AI - Result Deduplication Unit Tests
+Tests URL normalization, near-duplicate matching and source merging of ResultDeduplicator
+"""
+
+import pytest
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.search.dedup import ResultDeduplicator, jaccard, normalize_url, shingles, words
+
+def result(url, title, content="", source=None):
+    item = {"url": url, "title": title, "content": content}
+    if source:
+        item["original_source"] = source
+    return item
+
+LONG_CONTENT = (
+    "The event loop runs asynchronous tasks and callbacks, performs network IO operations "
+    "and runs subprocesses. Application developers should typically use the high level "
+    "asyncio functions such as asyncio run and should rarely need to reference the loop object."
+)
+
+class TestNormalizeUrl:
+    """URL variants that point at the same page"""
+
+    @pytest.mark.parametrize("variant", [
+        "https://Example.com/docs/page",
+        "HTTPS://EXAMPLE.COM/docs/page/",
+        "https://example.com/docs/page#section-2",
+        "  https://example.com/docs/page  ",
+    ])
+    def test_equivalent_forms(self, variant):
+        assert normalize_url(variant) == "https://example.com/docs/page"
+
+    def test_path_case_and_query_are_kept(self):
+        assert normalize_url("https://example.com/Docs?q=1") == "https://example.com/Docs?q=1"
+        assert normalize_url("https://example.com/docs?q=1") != normalize_url("https://example.com/docs?q=2")
+
+    def test_empty_url(self):
+        assert normalize_url("   ") == ""
+
+class TestFeatures:
+    """Word and shingle features"""
+
+    def test_shingles(self):
+        assert shingles(words("One two three four")) == {"one two three", "two three four"}
+        assert shingles(words("Short title")) == {"short title"}
+        assert shingles([]) == set()
+
+    def test_jaccard(self):
+        assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+        assert jaccard(set(), {"a"}) == 0.0
+
+class TestDeduplicate:
+    """Collapsing duplicates and merging their sources"""
+
+    def test_same_url_variants_collapse(self):
+        results = [
+            result("https://example.com/a", "First title", source="exa_ai"),
+            result("https://EXAMPLE.com/a/#top", "A different headline", source="serp"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 1
+        assert len(unique) == 1
+        assert unique[0]["sources"] == ["exa_ai", "serp"]
+        assert unique[0]["duplicate_urls"] == ["https://EXAMPLE.com/a/#top"]
+
+    def test_near_identical_titles_collapse(self):
+        results = [
+            result("https://a.example/1", "Python asyncio event loop explained in depth for developers", source="exa_ai"),
+            result("https://b.example/2", "Python asyncio event loop explained in depth for developers!", source="duckduckgo"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 1
+        assert unique[0]["url"] == "https://a.example/1"
+        assert unique[0]["sources"] == ["exa_ai", "duckduckgo"]
+        assert unique[0]["duplicate_urls"] == ["https://b.example/2"]
+
+    def test_near_identical_content_collapses(self):
+        results = [
+            result("https://a.example/1", "Event loop", LONG_CONTENT, source="serp"),
+            result("https://b.example/2", "Asyncio reference", LONG_CONTENT.replace("typically", "usually"),
+                   source="apify"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 1
+        assert unique[0]["sources"] == ["serp", "apify"]
+
+    def test_distinct_results_are_kept_in_order(self):
+        results = [
+            result("https://a.example/1", "Installing PostgreSQL on Ubuntu", "apt install postgresql"),
+            result("https://b.example/2", "Baking sourdough bread at home", "flour water salt starter"),
+            result("https://c.example/3", "History of the Roman empire", "emperors legions provinces"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 0
+        assert [item["url"] for item in unique] == ["https://a.example/1", "https://b.example/2", "https://c.example/3"]
+
+    def test_sources_are_not_repeated(self):
+        results = [
+            result("https://example.com/a", "Title", source="serp"),
+            result("https://example.com/a/", "Title", source="serp"),
+            result("https://example.com/a#x", "Title", source="exa_ai"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 2
+        assert unique[0]["sources"] == ["serp", "exa_ai"]
+        assert unique[0]["duplicate_urls"] == ["https://example.com/a/", "https://example.com/a#x"]
+
+    def test_results_without_source_or_url(self):
+        results = [
+            result("", "Completely untitled note about gardening", "tomatoes need sun"),
+            result("", "Completely untitled note about gardening", "tomatoes need sun"),
+        ]
+
+        unique, duplicates = ResultDeduplicator().deduplicate(results)
+
+        assert duplicates == 1
+        assert unique[0]["sources"] == []
+        assert "duplicate_urls" not in unique[0]
+
+    def test_empty_input(self):
+        assert ResultDeduplicator().deduplicate([]) == ([], 0)
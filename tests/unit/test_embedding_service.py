@@ -0,0 +1,146 @@
+"""
+Orchestra AI - Embedding Service Unit Tests
+Tests micro-batching, query priority and failure handling of EmbeddingService
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import numpy as np
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+pytest.importorskip("services.embedding_service")
+from services.embedding_service import BULK, QUERY, EmbeddingService
+
+class FakeModel:
+    """Embeds each text as [len(text), batch number] and records the batches"""
+
+    device = "cpu"
+
+    def __init__(self, fail_batches=()):
+        self.batches = []
+        self.fail_batches = set(fail_batches)
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        self.batches.append(list(texts))
+        if len(self.batches) in self.fail_batches:
+            raise RuntimeError("CUDA out of memory")
+        return np.array([[len(text), len(self.batches)] for text in texts], dtype=np.float32)
+
+@pytest.fixture
+def make_service(monkeypatch):
+    services = []
+
+    def make(max_batch=64, max_wait_ms=5, model=None):
+        monkeypatch.setenv("EMBEDDING_MAX_BATCH", str(max_batch))
+        monkeypatch.setenv("EMBEDDING_MAX_WAIT_MS", str(max_wait_ms))
+        service = EmbeddingService()
+        service.model = model or FakeModel()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service._executor.shutdown(wait=True)
+
+class TestMicroBatching:
+    """Concurrent callers share batches and get their own vectors back"""
+
+    def test_concurrent_callers_share_one_batch(self, make_service):
+        service = make_service()
+
+        async def run():
+            return await asyncio.gather(
+                service.encode(["a", "bb"]),
+                service.encode(["ccc"]),
+                service.encode_query("dddd")
+            )
+
+        first, second, query = asyncio.run(run())
+
+        assert service.model.batches == [["dddd", "a", "bb", "ccc"]]
+        assert first[:, 0].tolist() == [1, 2]
+        assert second[:, 0].tolist() == [3]
+        assert query.tolist() == [4, 1]
+
+    def test_batches_are_bounded(self, make_service):
+        service = make_service(max_batch=3)
+
+        vectors = asyncio.run(service.encode([str(i) * i for i in range(1, 8)]))
+
+        assert [len(batch) for batch in service.model.batches] == [3, 3, 1]
+        # Input order is kept across batches
+        assert vectors[:, 0].tolist() == [1, 2, 3, 4, 5, 6, 7]
+        assert vectors[:, 1].tolist() == [1, 1, 1, 2, 2, 2, 3]
+        assert service.stats()["avg_batch_size"] == round(7 / 3, 2)
+
+    def test_empty_input(self, make_service):
+        service = make_service()
+
+        assert asyncio.run(service.encode([])).shape == (0, 2)
+        assert service.model.batches == []
+
+class TestQueryPriority:
+    """Queries are packed ahead of queued ingest work"""
+
+    def test_query_jumps_the_bulk_backlog(self, make_service):
+        service = make_service(max_batch=4)
+        bulk = [f"chunk-{i}" for i in range(10)]
+
+        async def run():
+            return await asyncio.gather(service.encode(bulk), service.encode_query("what is hnsw"))
+
+        asyncio.run(run())
+
+        assert service.model.batches[0] == ["what is hnsw"] + bulk[:3]
+        assert sum(service.model.batches, []).count("what is hnsw") == 1
+        assert service.stats()["query_texts"] == 1
+        assert service.stats()["bulk_texts"] == 10
+
+    def test_take_batch_packs_queries_first(self, make_service):
+        service = make_service(max_batch=3)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for name, text in [(BULK, "b1"), (BULK, "b2"), (QUERY, "q1"), (BULK, "b3"), (QUERY, "q2")]:
+                service._queues[name].append((text, loop.create_future()))
+            batch, queries = service._take_batch()
+            return [text for text, _ in batch], queries, service._queued()
+
+        assert asyncio.run(run()) == (["q1", "q2", "b1"], 2, 2)
+
+    def test_cancelled_requests_are_dropped(self, make_service):
+        service = make_service(max_batch=4)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            abandoned = loop.create_future()
+            abandoned.cancel()
+            service._queues[QUERY].append(("abandoned query", abandoned))
+            return await service.encode(["kept"])
+
+        asyncio.run(run())
+
+        assert service.model.batches == [["kept"]]
+
+class TestFailures:
+    """A failed batch fails its callers but not the dispatcher"""
+
+    def test_failed_batch_raises_and_next_batch_runs(self, make_service):
+        service = make_service(model=FakeModel(fail_batches={1}))
+
+        async def run():
+            with pytest.raises(RuntimeError, match="out of memory"):
+                await service.encode(["first"])
+            return await service.encode(["second"])
+
+        vectors = asyncio.run(run())
+
+        assert vectors.tolist() == [[6, 2]]
+        assert service.stats()["batches"] == 1
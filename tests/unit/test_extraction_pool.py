@@ -0,0 +1,68 @@
+"""
+Orchestra AI - Extraction Pool Unit Tests
+Runs real format handlers in spawned, memory-capped worker processes
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import json
+import resource
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+# Workers import only the format handlers; skip where their parsers are not installed
+pytest.importorskip("services.extractors")
+
+from services.extraction_pool import ExtractionPool, _mapped_bytes
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setenv("EXTRACTION_WORKERS", "1")
+    monkeypatch.setenv("EXTRACTION_MEMORY_LIMIT_MB", "512")
+    pool = ExtractionPool()
+    yield pool
+    pool.shutdown()
+
+class TestExtractionPool:
+    """Extraction through the process pool with the memory cap enabled"""
+
+    def test_extracts_text_under_memory_limit(self, pool, tmp_path):
+        path = tmp_path / "notes.txt"
+        path.write_text("first line\nsecond line\n")
+
+        result = asyncio.run(pool.extract("txt", path))
+
+        assert result["text"] == "first line\nsecond line\n"
+        assert result["metadata"]["lines"] == 3
+        assert pool.stats()["completed"] == 1
+        assert pool.stats()["start_method"] == "spawn"
+
+    def test_extracts_json_under_memory_limit(self, pool, tmp_path):
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps({"rows": [1, 2, 3]}))
+
+        result = asyncio.run(pool.extract("json", path))
+
+        assert json.loads(result["text"]) == {"rows": [1, 2, 3]}
+
+    def test_worker_address_space_is_capped_above_startup_size(self, pool):
+        executor = pool._get_executor()
+        soft, hard = executor.submit(resource.getrlimit, resource.RLIMIT_AS).result(timeout=120)
+        worker_mapped = executor.submit(_mapped_bytes).result(timeout=120)
+
+        assert soft == hard != resource.RLIM_INFINITY
+        # The cap leaves the configured headroom beyond the worker's own mappings
+        assert soft - worker_mapped > 256 * 1024 * 1024
+
+    def test_worker_imports_only_the_handlers(self, pool):
+        executor = pool._get_executor()
+        modules = executor.submit(eval, "list(__import__('sys').modules)").result(timeout=120)
+
+        assert "services.extractors" in modules
+        for module in ("services.file_processor", "services.file_service", "database.vector_store",
+                       "services.embedding_service", "fastapi"):
+            assert module not in modules
@@ -0,0 +1,162 @@
+"""
+Orchestra AI - Format Extractor Unit Tests
+Tests page-by-page PDF extraction into the pages sidecar and reading it back
+"""
+
+import pytest
+import os
+import sys
+import json
+from types import SimpleNamespace
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+extractors = pytest.importorskip("services.extractors")
+
+class FakePage:
+    """pdfplumber page whose parsed objects are released by close()"""
+
+    def __init__(self, text):
+        self.text = text
+        self.closed = False
+
+    def extract_text(self):
+        assert not self.closed
+        return self.text
+
+    def close(self):
+        self.closed = True
+
+class FakePdf:
+    def __init__(self, texts):
+        self.pages = [FakePage(text) for text in texts]
+        self.metadata = {"Title": "Quarterly report", "Author": "Ada"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+def use_pdf(monkeypatch, texts):
+    pdf = FakePdf(texts)
+    monkeypatch.setattr(extractors, "pdfplumber", SimpleNamespace(open=lambda path: pdf))
+    return pdf
+
+def broken_pdfplumber(monkeypatch):
+    def open_pdf(path):
+        raise ValueError("not a pdfplumber document")
+    monkeypatch.setattr(extractors, "pdfplumber", SimpleNamespace(open=open_pdf))
+
+def read_pages(pages_path):
+    with open(pages_path, encoding="utf-8") as pages:
+        return [json.loads(line) for line in pages]
+
+class TestPdfStreaming:
+    """Pages go to the sidecar one at a time; only a preview is returned"""
+
+    def test_pages_are_written_to_sidecar(self, monkeypatch, tmp_path):
+        pdf = use_pdf(monkeypatch, ["first page", None, "third page"])
+        path = tmp_path / "report.pdf"
+        path.write_bytes(b"%PDF-1.7")
+
+        result = extractors.extract_pdf(path)
+
+        assert result["pages_path"] == f"{path}.pages.jsonl"
+        # Pages without text are skipped but keep their numbering
+        assert read_pages(result["pages_path"]) == [
+            {"page": 1, "text": "first page"},
+            {"page": 3, "text": "third page"},
+        ]
+        assert result["text"] == "first page\n\nthird page"
+        assert result["metadata"]["pages"] == 3
+        assert result["metadata"]["title"] == "Quarterly report"
+        assert result["metadata"]["text_truncated"] is False
+        assert all(page.closed for page in pdf.pages)
+
+    def test_preview_is_bounded(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("EXTRACTED_TEXT_PREVIEW_CHARS", "25")
+        use_pdf(monkeypatch, ["a" * 20, "b" * 20, "c" * 20])
+        path = tmp_path / "long.pdf"
+        path.write_bytes(b"%PDF-1.7")
+
+        result = extractors.extract_pdf(path)
+
+        assert result["text"] == "a" * 20 + "\n\n" + "b" * 3
+        assert result["metadata"]["text_truncated"] is True
+        # The sidecar still holds every page in full
+        assert [page["text"] for page in read_pages(result["pages_path"])] == ["a" * 20, "b" * 20, "c" * 20]
+
+    def test_falls_back_to_pypdf2(self, monkeypatch, tmp_path):
+        broken_pdfplumber(monkeypatch)
+        reader = SimpleNamespace(
+            pages=[SimpleNamespace(extract_text=lambda: "only page")],
+            metadata={"/Title": "Scanned", "/Author": ""}
+        )
+        monkeypatch.setattr(extractors, "PyPDF2", SimpleNamespace(PdfReader=lambda file: reader))
+        path = tmp_path / "scan.pdf"
+        path.write_bytes(b"%PDF-1.4")
+
+        result = extractors.extract_pdf(path)
+
+        assert read_pages(result["pages_path"]) == [{"page": 1, "text": "only page"}]
+        assert result["metadata"]["title"] == "Scanned"
+
+    def test_failed_extraction_removes_sidecar(self, monkeypatch, tmp_path):
+        broken_pdfplumber(monkeypatch)
+
+        def unreadable(file):
+            raise ValueError("EOF marker not found")
+        monkeypatch.setattr(extractors, "PyPDF2", SimpleNamespace(PdfReader=unreadable))
+        path = tmp_path / "broken.pdf"
+        path.write_bytes(b"garbage")
+
+        with pytest.raises(ValueError):
+            extractors.extract_pdf(path)
+        assert not os.path.exists(f"{path}.pages.jsonl")
+
+class TestPagePreview:
+    """Character budget of the returned preview"""
+
+    def test_under_budget(self):
+        preview = extractors.PagePreview(100)
+        preview.add("one")
+        preview.add("two")
+
+        assert preview.text == "one\n\ntwo"
+        assert preview.truncated is False
+
+    def test_pages_past_the_budget_are_dropped(self):
+        preview = extractors.PagePreview(5)
+        preview.add("12345")
+        preview.add("more")
+
+        assert preview.text == "12345"
+        assert preview.truncated is True
+
+class TestPageGroups:
+    """Reading a sidecar back for chunking"""
+
+    def test_single_document_is_one_group(self, tmp_path):
+        pages_path = tmp_path / "doc.pages.jsonl"
+        pages_path.write_text(
+            json.dumps({"page": 1, "text": "alpha"}) + "\n" + json.dumps({"page": 2, "text": "beta"}) + "\n"
+        )
+
+        groups = [(member, list(pages)) for member, pages in extractors.iter_page_groups(str(pages_path))]
+
+        assert groups == [(None, [(1, "alpha"), (2, "beta")])]
+
+    def test_archive_members_are_separate_groups(self, tmp_path):
+        pages_path = tmp_path / "bundle.pages.jsonl"
+        records = [
+            {"page": 1, "text": "a1", "member": "a.pdf"},
+            {"page": 2, "text": "a2", "member": "a.pdf"},
+            {"page": None, "text": "notes", "member": "b.txt"},
+        ]
+        pages_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+        groups = [(member, list(pages)) for member, pages in extractors.iter_page_groups(str(pages_path))]
+
+        assert groups == [("a.pdf", [(1, "a1"), (2, "a2")]), ("b.txt", [(None, "notes")])]
@@ -0,0 +1,339 @@
+"""
+Orchestra AI - FAISS Collection Unit Tests
+Tests persistence, tombstones and filtered search of FAISS collections
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import threading
+import numpy as np
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+from database.faiss_collection import FAISS_AVAILABLE, faiss
+
+pytestmark = pytest.mark.skipif(not FAISS_AVAILABLE, reason="faiss is not installed")
+
+DIM = 8
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.RandomState(seed).randn(count, DIM).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_store(path):
+    from database.vector_store import FAISSStore
+    store = FAISSStore()
+    store.storage_path = str(path)
+    return store
+
+@pytest.fixture
+def store(tmp_path):
+    return make_store(tmp_path)
+
+class TestFilteredSearch:
+    """Indexed and residual filters must agree"""
+
+    def setup_store(self, store, schema):
+        vectors = unit_vectors(6)
+        metadata = [
+            {"file_id": "a", "persona": "sophia"},
+            {"file_id": "a"},
+            {"file_id": "b", "persona": "sophia"},
+            {"file_id": "b", "persona": "karen"},
+            {"file_id": "c"},
+            {"file_id": "c", "persona": "sophia"},
+        ]
+        asyncio.run(store.create_collection("docs", DIM, schema))
+        asyncio.run(store.add_vectors("docs", vectors.tolist(), metadata, [f"doc-{i}" for i in range(6)]))
+        return vectors
+
+    def search_ids(self, store, query, filters):
+        results = asyncio.run(store.search_vectors("docs", query.tolist(), top_k=10, filters=filters))
+        return sorted(r["id"] for r in results)
+
+    def test_missing_field_excluded_by_both_paths(self, store, tmp_path):
+        """A document without the filtered field never matches"""
+        vectors = self.setup_store(store, {"file_id": "string"})
+        residual = self.search_ids(store, vectors[0], {"persona": "sophia"})
+
+        indexed = make_store(tmp_path / "indexed")
+        self.setup_store(indexed, {"file_id": "string", "persona": "string"})
+        by_index = self.search_ids(indexed, vectors[0], {"persona": "sophia"})
+
+        assert residual == by_index == ["doc-0", "doc-2", "doc-5"]
+
+    def test_list_values_mean_any_of(self, store):
+        vectors = self.setup_store(store, {"file_id": "string"})
+        assert self.search_ids(store, vectors[0], {"file_id": ["a", "c"], "persona": ["karen", "sophia"]}) == [
+            "doc-0", "doc-5"
+        ]
+
+    def test_delete_by_filter_skips_missing_field(self, store):
+        vectors = self.setup_store(store, {"file_id": "string"})
+        result = asyncio.run(store.delete_by_filter("docs", {"file_id": "a", "persona": "sophia"}))
+        assert result.succeeded == 1
+        assert self.search_ids(store, vectors[0], {"file_id": "a"}) == ["doc-1"]
+
+class TestBackgroundCheckpoints:
+    """Checkpoints scheduled by writes are kept and awaited on close"""
+
+    def test_close_waits_for_scheduled_checkpoint(self, store):
+        store.checkpoint_threshold = 4
+
+        async def run():
+            await store.create_collection("docs", DIM, {"file_id": "string"})
+            await store.add_vectors("docs", unit_vectors(5).tolist(), [{"file_id": "a"}] * 5,
+                                    [f"doc-{i}" for i in range(5)])
+            scheduled = len(store._checkpoints)
+            await store.close()
+            return scheduled
+
+        assert asyncio.run(run()) == 1
+        assert store._checkpoints == set()
+        collection = store.indexes["docs"]
+        assert collection.generation == 1
+        assert collection.base_index.ntotal == 5
+
+    def test_collection_calls_run_off_the_loop(self, store, monkeypatch):
+        from database.faiss_collection import FAISSCollection
+        threads = {}
+        for name in ("add", "delete", "search"):
+            original = getattr(FAISSCollection, name)
+
+            def recorded(self, *args, _name=name, _original=original, **kwargs):
+                threads[_name] = threading.current_thread()
+                return _original(self, *args, **kwargs)
+            monkeypatch.setattr(FAISSCollection, name, recorded)
+        vectors = unit_vectors(4)
+
+        async def run():
+            await store.create_collection("docs", DIM, {"file_id": "string"})
+            await store.add_vectors("docs", vectors.tolist(), [{"file_id": "a"}] * 4,
+                                    [f"doc-{i}" for i in range(4)])
+            await store.delete_vectors("docs", ["doc-0"])
+            return await store.search_vectors("docs", vectors[0].tolist(), top_k=3, filters={"file_id": "a"})
+
+        results = asyncio.run(run())
+
+        assert "doc-0" not in [r["id"] for r in results] and len(results) == 3
+        assert set(threads) == {"add", "delete", "search"}
+        assert threading.main_thread() not in threads.values()
+
+def open_collection(path, schema=None, **kwargs):
+    from database.faiss_collection import FAISSCollection
+    collection = FAISSCollection("docs", str(path), **kwargs)
+    collection.create(DIM, schema or {"file_id": "string"})
+    return collection
+
+def top_ids(collection, query, top_k=10):
+    _, labels = collection.search(query.reshape(1, -1), top_k)
+    entries = collection.fetch([int(label) for label in labels[0] if label != -1])
+    return [entries[int(label)]["id"] for label in labels[0] if label != -1]
+
+class TestCollectionPersistence:
+    """Append log replay and checkpoints"""
+
+    def test_reopen_replays_log(self, tmp_path):
+        vectors = unit_vectors(5)
+        collection = open_collection(tmp_path)
+        collection.add(vectors, [f"doc-{i}" for i in range(5)], [{"file_id": "a"}] * 5)
+
+        reopened = open_collection(tmp_path)
+        assert reopened.generation == 0
+        assert reopened.delta_index.ntotal == 5
+        assert top_ids(reopened, vectors[3], top_k=1) == ["doc-3"]
+
+    def test_other_process_writes_are_synced(self, tmp_path):
+        vectors = unit_vectors(4)
+        writer = open_collection(tmp_path)
+        reader = open_collection(tmp_path)
+        writer.add(vectors, [f"doc-{i}" for i in range(4)], [{"file_id": "a"}] * 4)
+        writer.delete(["doc-1"])
+
+        assert sorted(top_ids(reader, vectors[1])) == ["doc-0", "doc-2", "doc-3"]
+
+    def test_checkpoint_moves_delta_into_snapshot(self, tmp_path):
+        vectors = unit_vectors(6)
+        collection = open_collection(tmp_path)
+        collection.add(vectors, [f"doc-{i}" for i in range(6)], [{"file_id": "a"}] * 6)
+
+        assert collection.checkpoint() is True
+        assert collection.generation == 1
+        assert collection.base_index.ntotal == 6
+        assert collection.delta_index.ntotal == 0
+        assert os.listdir(tmp_path).count("index-1.faiss") == 1
+
+        reopened = open_collection(tmp_path)
+        assert reopened.base_index.ntotal == 6
+        assert top_ids(reopened, vectors[2], top_k=1) == ["doc-2"]
+
+    def test_previous_snapshot_kept_until_next_checkpoint(self, tmp_path):
+        vectors = unit_vectors(6)
+        collection = open_collection(tmp_path)
+        for generation in (1, 2, 3):
+            collection.add(vectors[generation:generation + 1], [f"doc-{generation}"], [{"file_id": "a"}])
+            collection.checkpoint()
+
+        assert sorted(name for name in os.listdir(tmp_path) if name.startswith("index-")) == [
+            "index-2.faiss", "index-3.faiss"
+        ]
+
+    def test_generation_replaced_while_opening_is_reread(self, tmp_path, monkeypatch):
+        vectors = unit_vectors(6)
+        writer = open_collection(tmp_path)
+        writer.add(vectors, [f"doc-{i}" for i in range(6)], [{"file_id": "a"}] * 6)
+        writer.checkpoint()
+        reader = open_collection(tmp_path)
+        open_snapshot = reader._open_snapshot
+        raced = []
+
+        def racing_open(generation):
+            # Two checkpoints land between reading the generation and opening its file
+            if not raced:
+                raced.append(generation)
+                writer.checkpoint()
+                writer.checkpoint()
+            return open_snapshot(generation)
+
+        monkeypatch.setattr(reader, "_open_snapshot", racing_open)
+        reader.load()
+
+        assert raced == [1]
+        assert reader.generation == 3
+        assert reader.base_index.ntotal == 6
+
+    def test_missing_snapshot_raises_instead_of_emptying(self, tmp_path):
+        collection = open_collection(tmp_path)
+        collection.add(unit_vectors(3), ["doc-0", "doc-1", "doc-2"], [{"file_id": "a"}] * 3)
+        collection.checkpoint()
+        os.remove(tmp_path / "index-1.faiss")
+
+        with pytest.raises(FileNotFoundError, match="index-1.faiss"):
+            collection.load()
+
+    def test_readding_an_id_replaces_it(self, tmp_path):
+        vectors = unit_vectors(3)
+        collection = open_collection(tmp_path)
+        collection.add(vectors[:2], ["doc-0", "doc-1"], [{"file_id": "a"}] * 2)
+        collection.add(vectors[2:], ["doc-0"], [{"file_id": "b"}])
+
+        assert sorted(top_ids(collection, vectors[0])) == ["doc-0", "doc-1"]
+        assert [item["id"] for item in collection.entries_matching({"file_id": "a"}).values()] == ["doc-1"]
+
+class TestTombstones:
+    """Deleting snapshot vectors and compacting them away"""
+
+    def snapshot(self, tmp_path, count=10, **kwargs):
+        vectors = unit_vectors(count)
+        collection = open_collection(tmp_path, **kwargs)
+        collection.add(vectors, [f"doc-{i}" for i in range(count)], [{"file_id": "a"}] * count)
+        collection.checkpoint()
+        return collection, vectors
+
+    def test_delta_delete_removes_outright(self, tmp_path):
+        vectors = unit_vectors(3)
+        collection = open_collection(tmp_path)
+        collection.add(vectors, ["doc-0", "doc-1", "doc-2"], [{"file_id": "a"}] * 3)
+
+        assert collection.delete(["doc-1", "missing"]) == 1
+        assert collection.delta_index.ntotal == 2
+        assert collection.tombstone_count == 0
+
+    def test_snapshot_delete_is_tombstoned_and_excluded(self, tmp_path):
+        collection, vectors = self.snapshot(tmp_path)
+
+        assert collection.delete(["doc-4"]) == 1
+        assert collection.tombstone_count == 1
+        assert collection.base_index.ntotal == 10
+        assert "doc-4" not in top_ids(collection, vectors[4])
+
+        candidates = collection.candidates({"file_id": "a"})
+        _, labels = collection.search(vectors[4].reshape(1, -1), 10, candidates=candidates)
+        assert len([label for label in labels[0] if label != -1]) == 9
+
+    def test_tombstones_survive_reopen(self, tmp_path):
+        collection, vectors = self.snapshot(tmp_path)
+        collection.delete(["doc-4"])
+
+        reopened = open_collection(tmp_path)
+        assert reopened.tombstone_count == 1
+        assert "doc-4" not in top_ids(reopened, vectors[4])
+
+    def test_compaction_rebuilds_without_deleted_rows(self, tmp_path):
+        collection, vectors = self.snapshot(tmp_path, compaction_threshold=0.2)
+        collection.delete(["doc-1"])
+        assert collection.needs_compaction() is False
+
+        collection.delete(["doc-2"])
+        assert collection.needs_compaction() is True
+        assert collection.needs_checkpoint() is True
+
+        assert collection.checkpoint() is True
+        stats = collection.stats()
+        assert stats["vectors"] == 8
+        assert stats["base_vectors"] == 8
+        assert stats["tombstones"] == 0
+        assert stats["compactions"] == 1
+        assert stats["last_compaction_reclaimed"] == 2
+
+class TestIndexSelection:
+    """Snapshot index type chosen from the collection's "_index" config"""
+
+    def build(self, tmp_path, index, count=400):
+        vectors = unit_vectors(count, seed=3)
+        collection = open_collection(tmp_path, {"file_id": "string", "_index": index})
+        collection.add(vectors, [f"doc-{i}" for i in range(count)], [{"file_id": "a"}] * count)
+        return collection, vectors
+
+    def test_stays_flat_below_min_vectors(self, tmp_path):
+        collection, _ = self.build(tmp_path, {"type": "hnsw", "min_vectors": 1000})
+
+        assert collection.needs_checkpoint() is False
+        collection.checkpoint()
+        assert collection.snapshot_type == "flat"
+
+    def test_enough_vectors_trigger_first_ann_build(self, tmp_path):
+        collection, _ = self.build(tmp_path, {"type": "hnsw", "min_vectors": 100})
+
+        assert collection.needs_checkpoint() is True
+
+    @pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat", "ivf_pq"])
+    def test_ann_snapshot_is_built_and_searchable(self, tmp_path, index_type):
+        collection, vectors = self.build(tmp_path, {"type": index_type, "min_vectors": 100})
+
+        assert collection.checkpoint() is True
+        assert collection.snapshot_type == index_type
+        assert collection.base_index.ntotal == 400
+
+        reopened = open_collection(tmp_path)
+        assert reopened.snapshot_type == index_type
+        params = {"nprobe": 64, "ef_search": 128}
+        _, labels = reopened.search(vectors[7].reshape(1, -1), 5, params)
+        assert len([label for label in labels[0] if label != -1]) == 5
+        if index_type != "ivf_pq":
+            assert top_ids(reopened, vectors[7], top_k=1) == ["doc-7"]
+
+    def test_ivf_nlist_auto_keeps_enough_training_points(self, tmp_path):
+        collection, _ = self.build(tmp_path, {"type": "ivf_flat", "min_vectors": 100})
+        collection.checkpoint()
+
+        assert faiss.extract_index_ivf(collection.base_index).nlist == 400 // 39
+
+    def test_search_params_are_per_query(self, tmp_path):
+        collection, _ = self.build(tmp_path, {"type": "ivf_flat", "min_vectors": 100, "nprobe": 2})
+        collection.checkpoint()
+
+        assert collection._search_parameters(None).nprobe == 2
+        assert collection._search_parameters({"nprobe": 8}).nprobe == 8
+
+    def test_environment_default_and_unknown_type(self, tmp_path, monkeypatch):
+        from database.faiss_collection import resolve_index_config
+        monkeypatch.setenv("FAISS_INDEX_TYPE", "HNSW")
+
+        assert resolve_index_config({})["type"] == "hnsw"
+        assert resolve_index_config({"_index": {"type": "ivf_flat"}})["type"] == "ivf_flat"
+        assert resolve_index_config({"_index": {"type": "annoy"}})["type"] == "flat"
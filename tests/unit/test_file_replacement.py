@@ -0,0 +1,133 @@
+"""
+Orchestra AI - File Replacement Unit Tests
+Tests completing and failing a replacement upload of an already processed file
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import hashlib
+import uuid
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+file_service_module = pytest.importorskip("services.file_service")
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from database.models import Base, ContentBlob, FileRecord, FileStatus, ProcessingJob
+from services.blob_store import BlobStore
+from services.resumable_upload import ResumableUpload
+
+OLD = b"first version of the handbook\n"
+NEW = b"second version of the handbook, with a new section\n"
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'files.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(file_service_module, "blob_store", BlobStore(tmp_path / "uploads" / "blobs"))
+    return file_service_module.EnhancedFileService()
+
+@pytest.fixture
+def stored_file(sessions, service):
+    """A processed file whose content is in the blob store"""
+    checksum = hashlib.sha256(OLD).hexdigest()
+    path = file_service_module.blob_store.path_for(checksum, ".txt")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(OLD)
+
+    async def add():
+        async with sessions() as db:
+            record = FileRecord(
+                user_id=uuid.uuid4(), filename="handbook.txt", original_filename="handbook.txt",
+                file_size=len(OLD), file_type="txt", storage_path=str(path), checksum=checksum,
+                status=FileStatus.COMPLETED, chunk_count=0
+            )
+            db.add(record)
+            db.add(ContentBlob(checksum=checksum, storage_path=str(path), file_size=len(OLD), ref_count=1))
+            await db.commit()
+            return str(record.id)
+    return asyncio.run(add())
+
+def replacement(service, file_id, content=NEW):
+    upload = ResumableUpload.create(service.temp_dir, file_id, len(content), 16,
+                                    persona_type="sophia", replaces=True, filename="handbook-v2.txt")
+    for offset in range(0, len(content), 16):
+        upload.write_chunk(offset, content[offset:offset + 16])
+    service.active_uploads[file_id] = upload
+    return upload
+
+def complete(sessions, service, file_id, upload):
+    async def run():
+        async with sessions() as db:
+            record = await db.get(FileRecord, uuid.UUID(file_id))
+            await service._complete_replacement(file_id, record, upload, db)
+    asyncio.run(run())
+
+def load(sessions, model, key):
+    async def get():
+        async with sessions() as db:
+            return await db.get(model, key)
+    return asyncio.run(get())
+
+class TestReplacement:
+    """New content replaces the old and is queued for re-indexing"""
+
+    def test_completed_replacement_swaps_content(self, sessions, service, stored_file):
+        upload = replacement(service, stored_file)
+        old_path = load(sessions, FileRecord, uuid.UUID(stored_file)).storage_path
+
+        complete(sessions, service, stored_file, upload)
+
+        record = load(sessions, FileRecord, uuid.UUID(stored_file))
+        assert record.status == FileStatus.UPLOADED
+        assert record.checksum == hashlib.sha256(NEW).hexdigest()
+        assert record.original_filename == "handbook-v2.txt"
+        assert open(record.storage_path, "rb").read() == NEW
+        # The old content had no other reference
+        assert not os.path.exists(old_path)
+        assert load(sessions, ContentBlob, hashlib.sha256(OLD).hexdigest()) is None
+        assert stored_file not in service.active_uploads
+        assert not upload.manifest_path.exists()
+
+        async def jobs():
+            async with sessions() as db:
+                return (await db.execute(select(ProcessingJob))).scalars().all()
+        assert [job.job_type for job in asyncio.run(jobs())] == ["ingest"]
+
+    def test_failed_replacement_keeps_the_record(self, sessions, service, stored_file, monkeypatch):
+        upload = replacement(service, stored_file)
+
+        async def broken(file_record, db):
+            raise RuntimeError("vector store unavailable")
+        monkeypatch.setattr(service, "_prepare_reindex", broken)
+
+        with pytest.raises(RuntimeError):
+            complete(sessions, service, stored_file, upload)
+
+        # Still searchable as it was: no ERROR status, old content and reference intact
+        record = load(sessions, FileRecord, uuid.UUID(stored_file))
+        assert record.status == FileStatus.COMPLETED
+        assert record.error_message is None
+        assert record.checksum == hashlib.sha256(OLD).hexdigest()
+        assert open(record.storage_path, "rb").read() == OLD
+        assert load(sessions, ContentBlob, record.checksum).ref_count == 1
+        assert load(sessions, ContentBlob, hashlib.sha256(NEW).hexdigest()) is None
+        # Only the upload state is gone
+        assert stored_file not in service.active_uploads
+        assert ResumableUpload.load(service.temp_dir, stored_file) is None
@@ -0,0 +1,108 @@
+"""
+Orchestra AI - File Type Detection Unit Tests
+Tests compressed-file detection and single-stream decompression
+"""
+
+import pytest
+import os
+import sys
+import io
+import bz2
+import gzip
+import lzma
+import tarfile
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+file_types = pytest.importorskip("services.file_types")
+archive = pytest.importorskip("services.archive")
+
+COMPRESSIONS = {'gz': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+CSV = b"name,score\nada,3\ngrace,5\n"
+
+def tar_bytes(name="notes.txt", data=b"hello tar\n"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+class TestCompressedDetection:
+    """gzip, bzip2 and xz are told apart from compressed tars"""
+
+    @pytest.mark.parametrize("compression", sorted(COMPRESSIONS))
+    def test_single_stream_keeps_its_compression(self, compression):
+        content = COMPRESSIONS[compression](CSV)
+
+        assert file_types.detect(content, f"scores.csv.{compression}")[0] == compression
+        assert file_types.detect(content)[0] == compression
+
+    @pytest.mark.parametrize("compression", sorted(COMPRESSIONS))
+    def test_compressed_tar_is_tar(self, compression):
+        content = COMPRESSIONS[compression](tar_bytes())
+
+        assert file_types.detect(content, f"bundle.tar.{compression}") == ('tar', 'application/x-tar')
+        # The suffix does not matter, only the decompressed header
+        assert file_types.detect(content, f"bundle.{compression}")[0] == 'tar'
+
+    def test_uncompressed_tar_is_tar(self):
+        assert file_types.detect(tar_bytes(), "bundle.tar")[0] == 'tar'
+
+    def test_truncated_stream_is_still_compressed(self):
+        content = gzip.compress(CSV * 1000)
+
+        assert file_types.detect(content[:16], "scores.csv.gz")[0] == 'gz'
+
+    def test_corrupt_stream_is_not_tar(self):
+        assert file_types.detect(b'\x1f\x8b' + b'\x00' * 300, "broken.gz")[0] == 'gz'
+
+    def test_mime_types(self):
+        assert file_types.detect(gzip.compress(CSV))[1] == 'application/gzip'
+        assert file_types.detect(bz2.compress(CSV))[1] == 'application/x-bzip2'
+        assert file_types.detect(lzma.compress(CSV))[1] == 'application/x-xz'
+
+class TestCompressedReader:
+    """ArchiveReader reads a single compressed stream as a one-member archive"""
+
+    @pytest.mark.parametrize("compression", sorted(COMPRESSIONS))
+    def test_decompresses_the_one_member(self, compression, tmp_path):
+        path = tmp_path / f"scores.csv.{compression}"
+        path.write_bytes(COMPRESSIONS[compression](CSV))
+        spool = tmp_path / "spool"
+        spool.mkdir()
+
+        with archive.ArchiveReader(path, compression) as reader:
+            member = reader.next_member(str(spool))
+            assert reader.next_member(str(spool)) is None
+
+        assert reader.kind == compression
+        assert member.name == "scores.csv"
+        assert member.path.read_bytes() == CSV
+        assert file_types.detect(member.head, member.name)[0] == 'csv'
+
+    def test_expansion_ratio_is_limited(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("ARCHIVE_MAX_RATIO", "10")
+        path = tmp_path / "bomb.txt.gz"
+        path.write_bytes(gzip.compress(b"a" * 5_000_000))
+        spool = tmp_path / "spool"
+        spool.mkdir()
+
+        with archive.ArchiveReader(path, "gz") as reader:
+            with pytest.raises(archive.ArchiveLimitExceeded):
+                reader.next_member(str(spool))
+        assert list(spool.iterdir()) == []
+
+    def test_nested_archive_is_skipped(self, tmp_path):
+        path = tmp_path / "bundle.zip.gz"
+        path.write_bytes(gzip.compress(b"PK\x05\x06" + b"\x00" * 18))
+
+        with archive.ArchiveReader(path, "gz") as reader:
+            assert reader.next_member(str(tmp_path)) is None
+        assert reader.skipped == [("bundle.zip", "nested archive")]
+
+    def test_member_name_strips_compression_suffix(self, tmp_path):
+        assert archive.compressed_member_name(tmp_path / "report.PDF.GZ") == "report.PDF"
+        assert archive.compressed_member_name(tmp_path / "3f2a91") == "3f2a91"
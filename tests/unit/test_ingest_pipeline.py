@@ -0,0 +1,290 @@
+"""
+Orchestra AI - Ingest Pipeline Unit Tests
+Tests stage failures, vector cleanup and incremental re-indexing of IngestPipeline
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import json
+from types import SimpleNamespace
+import numpy as np
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+# Progress updates go through the websocket service
+pytest.importorskip("fastapi")
+ingest_pipeline_module = pytest.importorskip("services.ingest_pipeline")
+
+from database.models import PersonaType, VectorChunk
+from database.vector_store import WriteResult
+
+IngestPipeline = ingest_pipeline_module.IngestPipeline
+chunk_hash = ingest_pipeline_module.chunk_hash
+
+class FakeChunker:
+    """One chunk per page"""
+
+    def iter_chunks(self, segments):
+        for page, text in segments:
+            yield text, page, page
+
+class FakeVectorStore:
+    def __init__(self):
+        self.vectors = {}
+        self.written = []
+        self.deleted = []
+
+    async def delete_vectors(self, collection_name, ids):
+        self.deleted.extend(ids)
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+        return WriteResult(succeeded=len(ids))
+
+class FakeProcessor:
+    """The parts of FileProcessor the pipeline calls, with hooks per page"""
+
+    def __init__(self, tmp_path, pages):
+        self.tmp_path = tmp_path
+        self.pages = pages
+        self.extraction_pool = SimpleNamespace(workers=1)
+        self.chunker = FakeChunker()
+        self.embedding_batch_size = 2
+        self.embedding_model_name = "fake-model"
+        self.vector_store = FakeVectorStore()
+        self.embedded = []
+        self.extract_error = None
+        self.embed_hooks = {}  # chunk text -> coroutine function run before embedding it
+        self.index_hooks = {}
+
+    async def _extract_content(self, file_record):
+        if self.extract_error:
+            raise self.extract_error
+        pages_path = self.tmp_path / f"{file_record.id}.pages.jsonl"
+        pages_path.write_text("".join(
+            json.dumps({"page": number, "text": text}) + "\n" for number, text in enumerate(self.pages, start=1)
+        ))
+        return {"text": self.pages[0], "metadata": {}, "pages_path": str(pages_path)}
+
+    @staticmethod
+    def _iter_page_groups(pages_path):
+        with open(pages_path) as pages:
+            yield None, [(record["page"], record["text"]) for record in map(json.loads, pages)]
+
+    async def _embed_chunks(self, texts):
+        for text in texts:
+            if text in self.embed_hooks:
+                await self.embed_hooks[text]()
+        self.embedded.extend(texts)
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+    async def _index_chunks(self, file_record, persona_type, chunks, embeddings):
+        rows = []
+        for chunk in chunks:
+            self.vector_store.vectors[chunk.vector_id] = chunk.text
+            self.vector_store.written.append(chunk.vector_id)
+            rows.append(VectorChunk(
+                file_record_id=file_record.id, chunk_index=chunk.index, chunk_text=chunk.text,
+                chunk_size=len(chunk.text), embedding_model=self.embedding_model_name,
+                embedding_dimensions=3, vector_id=chunk.vector_id, content_hash=chunk.content_hash
+            ))
+        for chunk in chunks:
+            if chunk.text in self.index_hooks:
+                await self.index_hooks[chunk.text]()
+        return rows
+
+def unpaged(processor):
+    """Read the sidecar back without page numbers, as for archive text members"""
+    def groups(pages_path):
+        with open(pages_path) as pages:
+            yield None, [(None, json.loads(line)["text"]) for line in pages]
+    processor._iter_page_groups = groups
+    return processor
+
+class FakeWebsocket:
+    async def broadcast_file_processing_update(self, file_id, stage, progress, details=None):
+        pass
+
+@pytest.fixture(autouse=True)
+def no_broadcasts(monkeypatch):
+    monkeypatch.setattr(ingest_pipeline_module, "websocket_service", FakeWebsocket())
+
+@pytest.fixture(autouse=True)
+def single_workers(monkeypatch):
+    for stage in ("CHUNK", "EMBED", "INDEX"):
+        monkeypatch.setenv(f"INGEST_{stage}_WORKERS", "1")
+
+def file_record(file_id="file-1"):
+    return SimpleNamespace(id=file_id, vector_source_id=None, original_filename="report.pdf",
+                           extracted_text=None, extracted_metadata=None, processing_progress=0.0,
+                           chunk_count=0, embedding_model=None, embedding_dimensions=None)
+
+PAGES = [f"page {number} text" for number in range(1, 7)]
+
+def run(processor, record, existing=None):
+    """Process one file; returns (changes or the raised error, pipeline)"""
+    pipeline = IngestPipeline(processor)
+
+    async def go():
+        try:
+            return await pipeline.process(record, PersonaType.CHERRY, existing)
+        except Exception as e:
+            return e
+        finally:
+            await pipeline.stop()
+
+    return asyncio.run(go()), pipeline
+
+class TestStageFailure:
+    """A failing stage fails process() and leaves no vectors behind"""
+
+    def test_extract_failure_propagates(self, tmp_path):
+        processor = FakeProcessor(tmp_path, PAGES)
+        processor.extract_error = ValueError("unsupported PDF")
+
+        outcome, pipeline = run(processor, file_record())
+
+        assert isinstance(outcome, ValueError)
+        assert str(outcome) == "unsupported PDF"
+        assert pipeline.files == {"submitted": 1, "completed": 0, "failed": 1}
+        assert processor.vector_store.deleted == []
+
+    def test_indexed_batches_are_deleted_when_a_later_stage_fails(self, tmp_path):
+        processor = FakeProcessor(tmp_path, PAGES)
+        indexed = asyncio.Event()
+
+        async def first_batch_indexed():
+            indexed.set()
+
+        async def fail_after_first_batch():
+            await indexed.wait()
+            raise RuntimeError("embedding backend unavailable")
+
+        processor.index_hooks[PAGES[1]] = first_batch_indexed
+        processor.embed_hooks[PAGES[4]] = fail_after_first_batch
+
+        outcome, pipeline = run(processor, file_record())
+
+        assert isinstance(outcome, RuntimeError)
+        assert pipeline.files["failed"] == 1
+        # At least batch 1 was written before batch 3 failed; none is left
+        store = processor.vector_store
+        assert len(store.written) >= 2
+        assert sorted(store.deleted) == sorted(store.written)
+        assert store.vectors == {}
+
+    def test_batch_finishing_after_the_failure_is_deleted(self, tmp_path):
+        processor = FakeProcessor(tmp_path, PAGES[:4])
+        failed = asyncio.Event()
+
+        async def slow_index():
+            await failed.wait()
+
+        async def fail():
+            failed.set()
+            raise RuntimeError("embedding backend unavailable")
+
+        processor.index_hooks[PAGES[0]] = slow_index
+        processor.embed_hooks[PAGES[2]] = fail
+
+        async def go():
+            pipeline = IngestPipeline(processor)
+            with pytest.raises(RuntimeError):
+                await pipeline.process(file_record(), PersonaType.CHERRY)
+            # Let the index stage finish the batch it was writing
+            await pipeline.stages["index"].queue.join()
+            await pipeline.stop()
+
+        asyncio.run(go())
+
+        store = processor.vector_store
+        assert len(store.written) == 2
+        assert sorted(store.deleted) == sorted(store.written)
+        assert store.vectors == {}
+
+    def test_failed_file_does_not_stop_the_next(self, tmp_path):
+        processor = FakeProcessor(tmp_path, PAGES[:2])
+        pipeline = IngestPipeline(processor)
+
+        async def go():
+            processor.extract_error = ValueError("corrupt")
+            with pytest.raises(ValueError):
+                await pipeline.process(file_record("file-1"), PersonaType.CHERRY)
+            processor.extract_error = None
+            changes = await pipeline.process(file_record("file-2"), PersonaType.CHERRY)
+            await pipeline.stop()
+            return changes
+
+        changes = asyncio.run(go())
+
+        assert changes.to_dict() == {"added": 2, "removed": 0, "kept": 0}
+        assert pipeline.files == {"submitted": 2, "completed": 1, "failed": 1}
+
+class TestIncrementalIndexing:
+    """Re-indexing edited content only embeds the chunks that changed"""
+
+    def test_chunk_hash_covers_text_and_location(self):
+        digest = chunk_hash("same text", 1, 1, None)
+
+        assert digest == chunk_hash("same text", 1, 1, None)
+        assert digest != chunk_hash("same text", 2, 2, None)
+        assert digest != chunk_hash("same text", 1, 1, "docs/a.txt")
+        assert digest != chunk_hash("other text", 1, 1, None)
+
+    def test_only_the_changed_chunk_is_embedded(self, tmp_path):
+        processor = FakeProcessor(tmp_path, PAGES)
+        first, _ = run(processor, file_record())
+        existing = {row.vector_id: row for row in first.added}
+
+        edited = PAGES[:2] + ["page 3 text, revised"] + PAGES[3:5]
+        processor = FakeProcessor(tmp_path, edited)
+        changes, _ = run(processor, file_record(), existing)
+
+        assert processor.embedded == ["page 3 text, revised"]
+        assert changes.to_dict() == {"added": 1, "removed": 2, "kept": 4}
+        assert [row.chunk_text for row in changes.added] == ["page 3 text, revised"]
+        # The old page 3 and the dropped page 6 are handed back for deletion
+        assert sorted(row.chunk_text for row in changes.removed) == ["page 3 text", "page 6 text"]
+
+    def test_unchanged_content_embeds_nothing(self, tmp_path):
+        first, _ = run(FakeProcessor(tmp_path, PAGES), file_record())
+        existing = {row.vector_id: row for row in first.added}
+
+        processor = FakeProcessor(tmp_path, PAGES)
+        changes, _ = run(processor, file_record(), existing)
+
+        assert processor.embedded == []
+        assert changes.to_dict() == {"added": 0, "removed": 0, "kept": 6}
+
+    def test_kept_rows_get_their_new_index(self, tmp_path):
+        first, _ = run(unpaged(FakeProcessor(tmp_path, ["intro", "body"])), file_record())
+        existing = {row.vector_id: row for row in first.added}
+
+        processor = unpaged(FakeProcessor(tmp_path, ["new preface", "intro", "body"]))
+        changes, _ = run(processor, file_record(), existing)
+
+        assert processor.embedded == ["new preface"]
+        assert changes.to_dict() == {"added": 1, "removed": 0, "kept": 2}
+        assert sorted((row.chunk_text, row.chunk_index) for row in existing.values()) == [("body", 2), ("intro", 1)]
+
+    def test_page_shift_changes_the_hash(self, tmp_path):
+        first, _ = run(FakeProcessor(tmp_path, PAGES[1:3]), file_record())
+        existing = {row.vector_id: row for row in first.added}
+
+        # Same texts on new page numbers are new chunks for location metadata
+        processor = FakeProcessor(tmp_path, ["new cover page"] + PAGES[1:3])
+        changes, _ = run(processor, file_record(), existing)
+
+        assert changes.to_dict() == {"added": 3, "removed": 2, "kept": 0}
+
+    def test_repeated_chunks_get_one_vector_each(self, tmp_path):
+        processor = unpaged(FakeProcessor(tmp_path, ["boilerplate footer"] * 2))
+
+        changes, _ = run(processor, file_record())
+
+        vector_ids = [row.vector_id for row in changes.added]
+        assert len(set(vector_ids)) == 2
+        assert vector_ids[1] == vector_ids[0] + "_1"
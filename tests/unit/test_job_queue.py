@@ -0,0 +1,243 @@
+"""
+Orchestra AI - Job Queue Unit Tests
+Tests claiming, lease expiry, retry backoff and failure of processing jobs
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+job_queue_module = pytest.importorskip("services.job_queue")
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from database.models import Base, ProcessingJob
+
+JobQueue = job_queue_module.JobQueue
+JobWorker = job_queue_module.JobWorker
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(job_queue_module, "db_manager", SimpleNamespace(async_session=sessions))
+    yield sessions
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def queue(sessions, monkeypatch):
+    monkeypatch.setenv("INGEST_RETRY_BASE_SECONDS", "10")
+    monkeypatch.setenv("INGEST_RETRY_MAX_SECONDS", "60")
+    queue = JobQueue()
+    queue.register("ingest", lambda job: None)
+    return queue
+
+def enqueue(queue, job_type="ingest", max_retries=3):
+    async def add():
+        async with job_queue_module.db_manager.async_session() as db:
+            job = queue.enqueue(db, job_type, config={"path": "a.txt"}, max_retries=max_retries)
+            await db.commit()
+            return job.id
+    return asyncio.run(add())
+
+def load(job_id):
+    async def get():
+        async with job_queue_module.db_manager.async_session() as db:
+            return (await db.execute(select(ProcessingJob).where(ProcessingJob.id == job_id))).scalar_one()
+    return asyncio.run(get())
+
+def expire_lease(job_id):
+    async def expire():
+        async with job_queue_module.db_manager.async_session() as db:
+            await db.execute(
+                update(ProcessingJob).where(ProcessingJob.id == job_id)
+                .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+    asyncio.run(expire())
+
+def make_due(job_id):
+    async def due():
+        async with job_queue_module.db_manager.async_session() as db:
+            await db.execute(
+                update(ProcessingJob).where(ProcessingJob.id == job_id)
+                .values(run_after=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+    asyncio.run(due())
+
+class TestClaim:
+    """Leasing due jobs to one worker at a time"""
+
+    def test_claim_leases_job_to_worker(self, queue):
+        job_id = enqueue(queue)
+
+        claimed = asyncio.run(queue.claim("worker-a", 5))
+
+        assert [job.id for job in claimed] == [job_id]
+        job = load(job_id)
+        assert job.status == "running"
+        assert job.worker_id == "worker-a"
+        assert job.lease_expires_at > datetime.utcnow()
+
+    def test_claimed_job_is_not_handed_out_twice(self, queue):
+        enqueue(queue)
+        asyncio.run(queue.claim("worker-a", 5))
+
+        assert asyncio.run(queue.claim("worker-b", 5)) == []
+
+    def test_claim_respects_limit_and_job_types(self, queue):
+        for _ in range(3):
+            enqueue(queue)
+        enqueue(queue, job_type="unregistered")
+
+        assert len(asyncio.run(queue.claim("worker-a", 2))) == 2
+        assert len(asyncio.run(queue.claim("worker-a", 5))) == 1
+        assert asyncio.run(queue.claim("worker-a", 5)) == []
+
+    def test_expired_lease_is_reclaimed_as_a_retry(self, queue):
+        job_id = enqueue(queue)
+        asyncio.run(queue.claim("worker-a", 1))
+        expire_lease(job_id)
+
+        claimed = asyncio.run(queue.claim("worker-b", 1))
+
+        assert [job.id for job in claimed] == [job_id]
+        job = load(job_id)
+        assert job.worker_id == "worker-b"
+        assert job.retry_count == 1
+
+    def test_expired_lease_past_max_retries_fails_job(self, queue):
+        job_id = enqueue(queue, max_retries=0)
+        asyncio.run(queue.claim("worker-a", 1))
+        expire_lease(job_id)
+
+        assert asyncio.run(queue.claim("worker-b", 1)) == []
+        job = load(job_id)
+        assert job.status == "failed"
+        assert job.error_message == "Lease expired"
+
+    def test_renew_only_for_lease_holder(self, queue):
+        enqueue(queue)
+        job = asyncio.run(queue.claim("worker-a", 1))[0]
+
+        assert asyncio.run(queue.renew(job, "worker-a")) is True
+        assert asyncio.run(queue.renew(job, "worker-b")) is False
+
+class TestCompletionAndRetry:
+    """complete() and fail() with exponential backoff"""
+
+    def test_complete_marks_job_done(self, queue):
+        job_id = enqueue(queue)
+        job = asyncio.run(queue.claim("worker-a", 1))[0]
+
+        asyncio.run(queue.complete(job, "worker-a", {"chunks": 4}))
+
+        job = load(job_id)
+        assert job.status == "completed"
+        assert job.output_data == {"chunks": 4}
+        assert job.lease_expires_at is None
+        assert asyncio.run(queue.stats())["completed"] == 1
+
+    def test_failed_job_waits_for_backoff(self, queue):
+        job_id = enqueue(queue)
+        job = asyncio.run(queue.claim("worker-a", 1))[0]
+
+        assert asyncio.run(queue.fail(job, "worker-a", "boom")) is True
+
+        job = load(job_id)
+        assert job.status == "pending"
+        assert job.retry_count == 1
+        assert job.error_message == "boom"
+        delay = (job.run_after - datetime.utcnow()).total_seconds()
+        assert 4 < delay <= 10
+        assert asyncio.run(queue.claim("worker-a", 1)) == []
+
+        make_due(job_id)
+        assert [job.id for job in asyncio.run(queue.claim("worker-a", 1))] == [job_id]
+
+    def test_job_fails_after_max_retries(self, queue):
+        job_id = enqueue(queue, max_retries=1)
+        job = asyncio.run(queue.claim("worker-a", 1))[0]
+        assert asyncio.run(queue.fail(job, "worker-a", "first")) is True
+
+        make_due(job_id)
+        job = asyncio.run(queue.claim("worker-a", 1))[0]
+        assert asyncio.run(queue.fail(job, "worker-a", "second")) is False
+
+        job = load(job_id)
+        assert job.status == "failed"
+        assert job.completed_at is not None
+        assert asyncio.run(queue.stats()) == {"pending": 0, "running": 0, "completed": 0, "failed": 1}
+
+    def test_backoff_doubles_up_to_cap(self, queue):
+        for attempt, ceiling in ((1, 10), (2, 20), (3, 40), (4, 60), (8, 60)):
+            delays = [queue.backoff(attempt) for _ in range(50)]
+            assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+
+class TestWorker:
+    """Running claimed jobs under a renewed lease"""
+
+    def run_claimed(self, queue, handler, renew=None):
+        queue.lease_seconds = 0.06
+        queue.register("ingest", handler)
+        if renew is not None:
+            queue.renew = renew
+        worker = JobWorker(queue, concurrency=1, worker_id="worker-a")
+
+        async def run():
+            job = (await queue.claim("worker-a", 1))[0]
+            await worker._run_job(job)
+        asyncio.run(run())
+        return worker
+
+    def test_finished_job_is_completed(self, queue):
+        job_id = enqueue(queue)
+
+        async def handler(job):
+            await asyncio.sleep(0.05)
+
+        worker = self.run_claimed(queue, handler)
+
+        assert load(job_id).status == "completed"
+        assert worker.metrics["completed"] == 1
+        assert worker.metrics["lost_leases"] == 0
+
+    def test_lost_lease_cancels_the_handler(self, queue):
+        job_id = enqueue(queue)
+        events = []
+
+        async def handler(job):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+            events.append("finished")
+
+        async def renew(job, worker_id):
+            # Another worker reclaimed the job after the lease ran out
+            return False
+
+        worker = self.run_claimed(queue, handler, renew)
+
+        assert events == ["cancelled"]
+        assert worker.metrics["lost_leases"] == 1
+        assert worker.metrics["completed"] == worker.metrics["failed"] == worker.metrics["retried"] == 0
+        # Neither completed nor failed by the worker that lost it
+        job = load(job_id)
+        assert job.status == "running"
+        assert job.retry_count == 0
@@ -0,0 +1,153 @@
+"""
+Orchestra AI - Resumable Upload Unit Tests
+Tests chunk ordering, resume reporting and the streamed checksum of ResumableUpload
+"""
+
+import pytest
+import os
+import sys
+import hashlib
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+pytest.importorskip("services.resumable_upload")
+from services.resumable_upload import ResumableUpload
+
+CHUNK = 8
+CONTENT = b"0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJ"  # 46 bytes: 5 full chunks and a 6-byte tail
+
+def chunk(index, content=CONTENT):
+    return index * CHUNK, content[index * CHUNK:(index + 1) * CHUNK]
+
+def send(upload, index, content=CONTENT):
+    """Write and hash one chunk the way upload_chunk does"""
+    offset, data = chunk(index, content)
+    assert upload.validate_chunk(offset, len(data)) is None
+    upload.write_chunk(offset, data)
+    upload.advance_hash(offset, data)
+
+@pytest.fixture
+def upload(tmp_path):
+    return ResumableUpload.create(tmp_path, "file-1", len(CONTENT), CHUNK, persona_type="cherry")
+
+class TestChunkOrder:
+    """Chunks may arrive in any order and more than once"""
+
+    def test_out_of_order_chunks(self, upload):
+        for index in [3, 1, 5, 0, 4, 2]:
+            send(upload, index)
+
+        assert upload.is_complete()
+        assert upload.data_path.read_bytes() == CONTENT
+        assert upload.finish_hash() == hashlib.sha256(CONTENT).hexdigest()
+
+    def test_hash_follows_the_contiguous_frontier(self, upload):
+        send(upload, 2)
+        assert upload.hashed_upto == 0
+
+        send(upload, 0)
+        # Chunk 1 is missing, so chunk 2 waits for it
+        assert upload.hashed_upto == CHUNK
+
+        send(upload, 1)
+        assert upload.hashed_upto == 3 * CHUNK
+
+    def test_duplicate_chunks_count_once(self, upload):
+        for index in [0, 1, 1, 0, 2, 3, 4, 5, 5]:
+            send(upload, index)
+
+        assert upload.received_bytes() == len(CONTENT)
+        assert upload.finish_hash() == hashlib.sha256(CONTENT).hexdigest()
+
+    def test_header_comes_from_the_first_chunk(self, upload):
+        send(upload, 1)
+        send(upload, 0)
+
+        # Kept in memory as the chunk arrived, not read back
+        assert upload.header() == CONTENT[:CHUNK]
+
+    @pytest.mark.parametrize("offset, size, message", [
+        (3, CHUNK, "multiple of 8"),
+        (-CHUNK, CHUNK, "multiple of 8"),
+        (48, CHUNK, "past the declared file size"),
+        (0, CHUNK - 1, "must be 8 bytes"),
+        (40, CHUNK, "past the declared file size"),
+        (40, 5, "must be 6 bytes"),
+    ])
+    def test_invalid_chunks_are_rejected(self, upload, offset, size, message):
+        assert message in upload.validate_chunk(offset, size)
+
+class TestResume:
+    """A reloaded upload reports what is still missing"""
+
+    def test_missing_ranges_are_merged(self, upload, tmp_path):
+        for index in [0, 3]:
+            send(upload, index)
+
+        resumed = ResumableUpload.load(tmp_path, "file-1")
+
+        assert resumed.persona_type == "cherry"
+        assert resumed.received_bytes() == 2 * CHUNK
+        assert resumed.missing_ranges() == [(CHUNK, 3 * CHUNK), (4 * CHUNK, len(CONTENT))]
+        assert not resumed.is_complete()
+
+    def test_resumed_upload_hashes_what_it_did_not_see(self, upload, tmp_path):
+        for index in [0, 1, 2]:
+            send(upload, index)
+
+        # A new process (restart or another worker) receives the rest
+        resumed = ResumableUpload.load(tmp_path, "file-1")
+        for index in [5, 3, 4]:
+            send(resumed, index)
+
+        assert resumed.is_complete()
+        assert resumed.hashed_upto == 0
+        assert resumed.finish_hash() == hashlib.sha256(CONTENT).hexdigest()
+        # Never saw the first chunk, so it reads the header back
+        assert resumed.header() == CONTENT
+
+    def test_unknown_upload(self, tmp_path):
+        assert ResumableUpload.load(tmp_path, "missing") is None
+
+    def test_only_one_completion(self, upload, tmp_path):
+        assert upload.claim_completion()
+        assert not ResumableUpload.load(tmp_path, "file-1").claim_completion()
+
+    def test_cleanup_removes_state(self, upload, tmp_path):
+        upload.claim_completion()
+        upload.cleanup()
+
+        assert list(tmp_path.iterdir()) == []
+        assert ResumableUpload.load(tmp_path, "file-1") is None
+
+class TestChecksum:
+    """The digest reflects the bytes actually stored"""
+
+    def test_checksum_mismatch_after_corruption_on_disk(self, upload, tmp_path):
+        for index in [0, 1, 2, 3, 4, 5]:
+            send(upload, index)
+        with open(upload.data_path, "r+b") as data:
+            data.seek(20)
+            data.write(b"!")
+
+        # Hash state is per process; a resumed upload reads the stored bytes
+        digest = ResumableUpload.load(tmp_path, "file-1").finish_hash()
+
+        assert digest != hashlib.sha256(CONTENT).hexdigest()
+        assert digest == hashlib.sha256(upload.data_path.read_bytes()).hexdigest()
+
+    def test_different_content_has_a_different_checksum(self, tmp_path):
+        other = CONTENT[:-1] + b"K"
+        upload = ResumableUpload.create(tmp_path, "file-2", len(other), CHUNK)
+        for index in [5, 4, 3, 2, 1, 0]:
+            send(upload, index, other)
+
+        assert upload.finish_hash() == hashlib.sha256(other).hexdigest() != hashlib.sha256(CONTENT).hexdigest()
+
+    def test_empty_upload(self, tmp_path):
+        upload = ResumableUpload.create(tmp_path, "empty", 0, CHUNK)
+
+        assert upload.is_complete()
+        assert upload.received_bytes() == 0
+        assert upload.finish_hash() == hashlib.sha256(b"").hexdigest()
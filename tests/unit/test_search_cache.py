@@ -0,0 +1,171 @@
+"""
+Orchestra AI - Search Cache Unit Tests
+Tests hits, stale-while-revalidate, misses and bypasses of SearchCache (local tier)
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+import search_cache as search_cache_module
+from search_cache import HIT, MISS, STALE, SearchCache
+
+@pytest.fixture
+def cache(monkeypatch):
+    # Local tier only: no Redis in unit tests
+    monkeypatch.setattr(search_cache_module, "REDIS_AVAILABLE", False)
+    monkeypatch.delenv("SEARCH_CACHE_ENABLED", raising=False)
+    return SearchCache()
+
+class Provider:
+    """Fetch callable returning the next canned response and counting calls"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.responses[min(self.calls, len(self.responses)) - 1]
+
+def lookup(cache, fetch, provider="serp", query="python asyncio"):
+    return cache.get_or_fetch(provider, "normal", "cherry", query, fetch)
+
+def expire(cache):
+    """Make every cached entry stale (past its TTL but inside the stale window)"""
+    for entry in cache._lru.values():
+        entry.fresh_until = time.time() - 1
+
+class TestLookup:
+    """Hit, stale and miss outcomes"""
+
+    def test_miss_then_hit(self, cache):
+        fetch = Provider([{"url": "https://a.example"}])
+
+        async def run():
+            return await lookup(cache, fetch), await lookup(cache, fetch)
+
+        first, second = asyncio.run(run())
+
+        assert first == ([{"url": "https://a.example"}], MISS)
+        assert second == ([{"url": "https://a.example"}], HIT)
+        assert fetch.calls == 1
+        assert cache.stats()["hit_ratio"] == 0.5
+
+    def test_hits_are_independent_copies(self, cache):
+        fetch = Provider([{"title": "original"}])
+
+        async def run():
+            value, _ = await lookup(cache, fetch)
+            value[0]["title"] = "changed by caller"
+            return await lookup(cache, fetch)
+
+        assert asyncio.run(run()) == ([{"title": "original"}], HIT)
+
+    def test_query_variants_share_an_entry(self, cache):
+        fetch = Provider([{"url": "https://a.example"}])
+
+        async def run():
+            await lookup(cache, fetch, query="Python  AsyncIO")
+            return await lookup(cache, fetch, query=" python asyncio ")
+
+        assert asyncio.run(run())[1] == HIT
+        assert fetch.calls == 1
+
+    def test_stale_entry_is_served_and_refreshed(self, cache):
+        fetch = Provider([{"v": 1}], [{"v": 2}])
+
+        async def run():
+            await lookup(cache, fetch)
+            expire(cache)
+            stale = await lookup(cache, fetch)
+            # The refresh runs in the background on this loop
+            await asyncio.gather(*cache._tasks)
+            return stale, await lookup(cache, fetch)
+
+        stale, fresh = asyncio.run(run())
+
+        assert stale == ([{"v": 1}], STALE)
+        assert fresh == ([{"v": 2}], HIT)
+        assert fetch.calls == 2
+        assert cache.counters["refreshes"] == 1
+
+    def test_one_refresh_per_stale_key(self, cache):
+        fetch = Provider([{"v": 1}], [{"v": 2}])
+
+        async def run():
+            await lookup(cache, fetch)
+            expire(cache)
+            await asyncio.gather(lookup(cache, fetch), lookup(cache, fetch), lookup(cache, fetch))
+            await asyncio.gather(*cache._tasks)
+
+        asyncio.run(run())
+
+        assert fetch.calls == 2
+
+    def test_entry_past_stale_window_is_a_miss(self, cache):
+        fetch = Provider([{"v": 1}], [{"v": 2}])
+
+        async def run():
+            await lookup(cache, fetch)
+            for entry in cache._lru.values():
+                entry.fresh_until = entry.stale_until = time.time() - 1
+            return await lookup(cache, fetch)
+
+        assert asyncio.run(run()) == ([{"v": 2}], MISS)
+
+    def test_close_waits_for_refreshes(self, cache):
+        fetch = Provider([{"v": 1}], [{"v": 2}])
+
+        async def run():
+            await lookup(cache, fetch)
+            expire(cache)
+            await lookup(cache, fetch)
+            await cache.close()
+            return cache.counters["refreshes"]
+
+        assert asyncio.run(run()) == 1
+
+class TestNotStored:
+    """Results that must not be cached"""
+
+    def test_empty_results_are_not_stored(self, cache):
+        fetch = Provider([], [{"url": "https://a.example"}])
+
+        async def run():
+            return await lookup(cache, fetch), await lookup(cache, fetch)
+
+        first, second = asyncio.run(run())
+
+        assert first == ([], MISS)
+        assert second == ([{"url": "https://a.example"}], MISS)
+        assert cache.stats()["lru_entries"] == 1
+
+    def test_zero_ttl_provider_bypasses_cache(self, cache):
+        fetch = Provider([{"id": "doc-1"}])
+
+        async def run():
+            return await lookup(cache, fetch, provider="database"), await lookup(cache, fetch, provider="database")
+
+        assert asyncio.run(run())[1] == ([{"id": "doc-1"}], MISS)
+        assert fetch.calls == 2
+        assert cache.counters["bypassed"] == 2
+        assert cache.stats()["lru_entries"] == 0
+
+    def test_disabled_cache_bypasses(self, monkeypatch):
+        monkeypatch.setattr(search_cache_module, "REDIS_AVAILABLE", False)
+        monkeypatch.setenv("SEARCH_CACHE_ENABLED", "false")
+        cache = SearchCache()
+        fetch = Provider([{"url": "https://a.example"}])
+
+        async def run():
+            await lookup(cache, fetch)
+            return await lookup(cache, fetch)
+
+        assert asyncio.run(run())[1] == MISS
+        assert fetch.calls == 2
@@ -0,0 +1,240 @@
+"""
+Orchestra AI - Provider Fan-out Unit Tests
+Tests deadlines, hedged requests, error outcomes and latency history of FanOut
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from search_cache import HIT, MISS, STALE
+from search_fanout import ERROR, MIN_SAMPLES, OK, TIMEOUT, FanOut, LatencyTracker
+
+@pytest.fixture(autouse=True)
+def hedge_settings(monkeypatch):
+    monkeypatch.delenv("SEARCH_HEDGE_PROVIDERS", raising=False)
+    monkeypatch.setenv("SEARCH_HEDGE_AFTER", "0.05")
+    monkeypatch.setenv("SEARCH_HEDGE_MIN", "0.01")
+
+def answer(results, delay=0.0):
+    async def fetch():
+        await asyncio.sleep(delay)
+        return results
+    return fetch
+
+def attempts_with_delays(*delays):
+    """Fetch whose n-th call takes delays[n] seconds and returns its call number"""
+    calls = []
+
+    async def fetch():
+        calls.append(len(calls) + 1)
+        call = len(calls)
+        await asyncio.sleep(delays[min(call, len(delays)) - 1])
+        return [{"call": call}]
+    return fetch, calls
+
+class TestDeadline:
+    """Providers finish on their own under one deadline"""
+
+    def test_all_providers_answer(self):
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("database", answer([{"id": 1}]))
+        fanout.add("duckduckgo", answer([{"id": 2}, {"id": 3}], delay=0.01))
+
+        outcomes = asyncio.run(fanout.run())
+
+        assert list(outcomes) == ["database", "duckduckgo"]
+        assert outcomes["database"].status == OK
+        assert outcomes["duckduckgo"].results == [{"id": 2}, {"id": 3}]
+        assert outcomes["duckduckgo"].to_dict()["result_count"] == 2
+
+    def test_slow_provider_times_out_without_losing_the_rest(self):
+        fanout = FanOut(deadline=0.1, tracker=LatencyTracker())
+        fanout.add("database", answer([{"id": 1}]))
+        fanout.add("exa_ai", answer([{"id": 2}], delay=5))
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            outcomes = await fanout.run()
+            return outcomes, loop.time() - started
+
+        outcomes, elapsed = asyncio.run(run())
+
+        assert elapsed < 1
+        assert outcomes["database"].results == [{"id": 1}]
+        assert outcomes["exa_ai"].status == TIMEOUT
+        assert outcomes["exa_ai"].results == []
+        assert outcomes["exa_ai"].latency_ms == 100
+
+    def test_outcomes_arrive_in_finishing_order(self):
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("serp", answer([{"id": 1}], delay=0.05))
+        fanout.add("database", answer([{"id": 2}]))
+
+        async def run():
+            return [outcome.provider async for outcome in fanout.as_completed()]
+
+        assert asyncio.run(run()) == ["database", "serp"]
+
+class TestErrors:
+    """A failing provider is reported, not raised"""
+
+    def test_error_outcome(self):
+        async def broken():
+            raise ConnectionError("connection refused")
+
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("serp", broken)
+        fanout.add("database", answer([{"id": 1}]))
+
+        outcomes = asyncio.run(fanout.run())
+
+        assert outcomes["serp"].status == ERROR
+        assert outcomes["serp"].error == "connection refused"
+        assert outcomes["serp"].to_dict()["error"] == "connection refused"
+        assert outcomes["database"].status == OK
+
+    def test_failed_hedge_falls_back_to_the_original(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            if len(calls) == 2:
+                raise TimeoutError("hedge failed")
+            await asyncio.sleep(0.1)
+            return [{"id": 1}]
+
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("duckduckgo", fetch)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert outcome.status == OK
+        assert outcome.attempts == 2
+
+class TestHedging:
+    """Slow requests to hedgeable providers get one duplicate"""
+
+    def test_slow_request_is_hedged(self):
+        fetch, calls = attempts_with_delays(5, 0.01)
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("duckduckgo", fetch)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert outcome.status == OK
+        assert outcome.results == [{"call": 2}]
+        assert (outcome.attempts, outcome.hedged) == (2, True)
+        assert calls == [1, 2]
+
+    def test_fast_request_is_not_hedged(self):
+        fetch, calls = attempts_with_delays(0.0)
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add("duckduckgo", fetch)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert (outcome.attempts, outcome.hedged) == (1, False)
+
+    @pytest.mark.parametrize("provider", ["database", "exa_ai", "serp", "venice_ai", "apify", "zenrows", "scraping"])
+    def test_paid_and_internal_providers_are_not_hedged_by_default(self, provider):
+        fetch, calls = attempts_with_delays(0.2)
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+        fanout.add(provider, fetch)
+
+        outcome = asyncio.run(fanout.run())[provider]
+
+        assert outcome.status == OK
+        assert outcome.attempts == 1
+        assert calls == [1]
+
+    def test_hedge_providers_can_be_configured(self, monkeypatch):
+        monkeypatch.setenv("SEARCH_HEDGE_PROVIDERS", "exa_ai, serp")
+        fanout = FanOut(deadline=1.0, tracker=LatencyTracker())
+
+        assert fanout._hedge_delay("exa_ai") == 0.05
+        assert fanout._hedge_delay("duckduckgo") is None
+
+    def test_hedge_delay_follows_p95_latency(self):
+        tracker = LatencyTracker()
+        for _ in range(MIN_SAMPLES):
+            tracker.record("duckduckgo", 0.3)
+        fanout = FanOut(deadline=1.0, tracker=tracker)
+
+        assert fanout._hedge_delay("duckduckgo") == 0.3
+
+    def test_timed_out_provider_reports_hedge(self):
+        fetch, calls = attempts_with_delays(5, 5)
+        fanout = FanOut(deadline=0.15, tracker=LatencyTracker())
+        fanout.add("duckduckgo", fetch)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert outcome.status == TIMEOUT
+        assert (outcome.attempts, outcome.hedged) == (2, True)
+
+class TestLatencyHistory:
+    """Only requests that reached the provider are recorded"""
+
+    def test_uncached_answers_are_recorded(self):
+        tracker = LatencyTracker()
+        fanout = FanOut(deadline=1.0, tracker=tracker)
+        fanout.add("database", answer([{"id": 1}], delay=0.02))
+
+        asyncio.run(fanout.run())
+
+        assert len(tracker.samples["database"]) == 1
+        assert tracker.samples["database"][0] >= 0.02
+
+    @pytest.mark.parametrize("status", [HIT, STALE])
+    def test_cache_hits_are_not_recorded(self, status):
+        async def cached():
+            return [{"id": 1}], status
+
+        tracker = LatencyTracker()
+        fanout = FanOut(deadline=1.0, tracker=tracker)
+        fanout.add("duckduckgo", cached, cached=True)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert outcome.results == [{"id": 1}]
+        assert outcome.cache == status
+        assert outcome.to_dict()["cache"] == status
+        assert "duckduckgo" not in tracker.samples
+
+    def test_cache_misses_are_recorded(self):
+        async def cached():
+            await asyncio.sleep(0.02)
+            return [{"id": 1}], MISS
+
+        tracker = LatencyTracker()
+        fanout = FanOut(deadline=1.0, tracker=tracker)
+        fanout.add("duckduckgo", cached, cached=True)
+
+        outcome = asyncio.run(fanout.run())["duckduckgo"]
+
+        assert outcome.results == [{"id": 1}]
+        assert len(tracker.samples["duckduckgo"]) == 1
+
+    def test_hits_do_not_pull_the_hedge_delay_down(self):
+        tracker = LatencyTracker()
+        for _ in range(MIN_SAMPLES):
+            tracker.record("duckduckgo", 0.3)
+
+        async def hit():
+            return [{"id": 1}], HIT
+
+        async def run():
+            for _ in range(3 * MIN_SAMPLES):
+                fanout = FanOut(deadline=1.0, tracker=tracker)
+                fanout.add("duckduckgo", hit, cached=True)
+                await fanout.run()
+
+        asyncio.run(run())
+
+        assert FanOut(deadline=1.0, tracker=tracker)._hedge_delay("duckduckgo") == 0.3
@@ -0,0 +1,155 @@
+"""
+Orchestra AI - Search Stream Unit Tests
+Tests the order of stream_search events and how they reach SSE and WebSocket clients
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import json
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic")
+engine_module = pytest.importorskip("advanced_search_engine")
+
+import search_cache as search_cache_module
+import search_fanout as search_fanout_module
+from search_cache import HIT, MISS, SearchCache
+from search_fanout import LatencyTracker
+from advanced_search_engine import SearchOrchestrator, SearchRequest, SearchResult
+
+def results(source, count, delay):
+    async def search(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return [SearchResult(title=f"{source} {i}", content=f"{source} result {i}", source=source,
+                             relevance_score=0.5) for i in range(count)]
+    return search
+
+@pytest.fixture(autouse=True)
+def providers(monkeypatch):
+    """Database answers first, then DuckDuckGo; nothing leaves the process"""
+    monkeypatch.setattr(search_cache_module, "REDIS_AVAILABLE", False)
+    monkeypatch.setattr(engine_module, "search_cache", SearchCache())
+    monkeypatch.setattr(engine_module, "search_database", results("Database", 2, 0.0))
+    monkeypatch.setattr(engine_module, "search_duckduckgo", results("DuckDuckGo", 3, 0.05))
+    monkeypatch.setattr(search_fanout_module, "search_latency", LatencyTracker())
+
+def collect(request, blend_updates=True):
+    async def run():
+        return [event async for event in SearchOrchestrator().stream_search(request, blend_updates)]
+    return asyncio.run(run())
+
+class FakeApp:
+    """Records the routes add_advanced_search_endpoints registers"""
+
+    def __init__(self):
+        self.routes = {}
+
+    def add_event_handler(self, event, handler):
+        pass
+
+    def route(self, path, **kwargs):
+        def register(endpoint):
+            self.routes[path] = endpoint
+            return endpoint
+        return register
+
+    get = post = route
+
+class FakeManager:
+    def __init__(self, user_id):
+        self.active_connections = {user_id: None}
+        self.sent = []
+
+    async def send_personal_message(self, message, user_id):
+        self.sent.append(message)
+
+class TestEventOrder:
+    """search_started, then provider_results (each followed by blended), then search_completed"""
+
+    def test_events_follow_the_providers(self):
+        events = collect(SearchRequest(query="vector databases"))
+
+        assert [(event["type"], event.get("provider")) for event in events] == [
+            ("search_started", None),
+            ("provider_results", "database"),
+            ("blended", None),
+            ("provider_results", "duckduckgo"),
+            ("blended", None),
+            ("search_completed", None),
+        ]
+        assert events[0]["providers"] == ["database", "duckduckgo"]
+        assert [event["total_results"] for event in events if event["type"] == "blended"] == [2, 5]
+        assert events[-1]["response"].total_results == 5
+
+    def test_empty_provider_is_not_reblended(self, monkeypatch):
+        monkeypatch.setattr(engine_module, "search_database", results("Database", 0, 0.0))
+
+        events = collect(SearchRequest(query="vector databases"))
+
+        assert [event["type"] for event in events] == [
+            "search_started", "provider_results", "provider_results", "blended", "search_completed"
+        ]
+
+    def test_without_blend_updates(self):
+        events = collect(SearchRequest(query="vector databases"), blend_updates=False)
+
+        assert [event["type"] for event in events] == [
+            "search_started", "provider_results", "provider_results", "search_completed"
+        ]
+
+    def test_cache_status_is_reported(self):
+        request = SearchRequest(query="vector databases")
+        collect(request)
+
+        events = collect(request)
+
+        duckduckgo = next(event for event in events if event.get("provider") == "duckduckgo")
+        assert duckduckgo["cache"] == HIT
+        assert events[-1]["response"].cached_sources == ["DuckDuckGo"]
+        # Only the first, uncached answer is provider latency
+        assert len(search_fanout_module.search_latency.samples["duckduckgo"]) == 1
+
+class TestTransports:
+    """SSE and WebSocket clients get the events in the same order"""
+
+    def test_sse_stream(self):
+        app = FakeApp()
+        engine_module.add_advanced_search_endpoints(app)
+
+        async def run():
+            response = await app.routes["/api/search/advanced/stream"](SearchRequest(query="vector databases"))
+            return [chunk async for chunk in response.body_iterator]
+
+        chunks = asyncio.run(run())
+
+        names = [chunk.split("\n")[0] for chunk in chunks]
+        assert names == [
+            "event: search_started", "event: provider_results", "event: blended",
+            "event: provider_results", "event: blended", "event: search_completed",
+        ]
+        completed = json.loads(chunks[-1].split("\n")[1][len("data: "):])
+        assert completed["response"]["total_results"] == 5
+        assert completed["response"]["provider_status"]["duckduckgo"]["cache"] == MISS
+
+    def test_websocket_stream(self):
+        websocket_module = pytest.importorskip("services.websocket_service")
+        service = websocket_module.WebSocketService()
+        service.manager = FakeManager("user-1")
+
+        asyncio.run(service.stream_search(
+            {"type": "search_query", "query": "vector databases", "search_id": "search-1"}, "user-1"
+        ))
+
+        sent = service.manager.sent
+        assert [message["type"] for message in sent] == [
+            "search_started", "provider_results", "blended", "provider_results", "blended", "search_completed"
+        ]
+        assert {message["search_id"] for message in sent} == {"search-1"}
+        # Everything sent is plain JSON
+        assert json.loads(json.dumps(sent)) == sent
@@ -0,0 +1,265 @@
+"""
+Orchestra AI - Weaviate Store Unit Tests
+Tests bulk writes, batched deletes and batched searches of WeaviateStore against a fake client
+"""
+
+import pytest
+import os
+import sys
+import asyncio
+import threading
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+os.environ.setdefault("ENVIRONMENT", "development")
+
+from database.vector_store import WeaviateStore
+
+class FakeBatch:
+    """client.batch: buffers added objects, and answers delete_objects from a script
+
+    Added objects are flushed to the configured callback batch_size at a
+    time; objects whose uuid is in `failing` come back with an error.
+    """
+
+    def __init__(self, responses, failing=()):
+        self.responses = list(responses)
+        self.deletes = []
+        self.failing = set(failing)
+        self.config = {}
+        self.buffer = []
+        self.flushed = []
+        self.threads = []
+
+    def configure(self, **config):
+        self.config = config
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add_data_object(self, data_object, class_name, uuid, vector):
+        self.threads.append(threading.current_thread())
+        self.buffer.append({"class": class_name, "id": uuid, "properties": data_object, "vector": vector})
+        if len(self.buffer) >= self.config["batch_size"]:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        objects = []
+        for obj in self.buffer:
+            errors = {"errors": {"error": [{"message": f"bad vector {obj['id']}"}]}} if obj["id"] in self.failing else {}
+            objects.append({**obj, "result": errors})
+        self.flushed.append(self.buffer)
+        self.buffer = []
+        self.config["callback"](objects)
+
+    def delete_objects(self, class_name, where, output):
+        self.deletes.append((class_name, where))
+        response = self.responses.pop(0) if self.responses else {"results": {"matches": 0, "successful": 0}}
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class FakeQuery:
+    """A Get query builder; do() answers with one item per call"""
+
+    def __init__(self, client, class_name):
+        self.client = client
+        self.class_name = class_name
+        self.alias = None
+        self.where = None
+        self.limit = None
+
+    def with_near_vector(self, near_vector):
+        self.vector = near_vector["vector"]
+        return self
+
+    def with_limit(self, limit):
+        self.limit = limit
+        return self
+
+    def with_where(self, where):
+        self.where = where
+        return self
+
+    def with_alias(self, alias):
+        self.alias = alias
+        return self
+
+    def item(self):
+        return {"id": f"doc-{self.vector[0]:g}", "_additional": {"certainty": 0.9}}
+
+    def do(self):
+        self.client.threads.append(threading.current_thread())
+        return {"data": {"Get": {self.class_name: [self.item()]}}}
+
+class FakeQueryAPI:
+    def __init__(self, client):
+        self.client = client
+        self.requests = 0
+
+    def get(self, class_name, properties):
+        return FakeQuery(self.client, class_name)
+
+    def multi_get(self, queries):
+        api = self
+
+        class MultiGet:
+            def do(self):
+                api.requests += 1
+                api.client.threads.append(threading.current_thread())
+                return {"data": {"Get": {query.alias: [query.item()] for query in queries}}}
+        return MultiGet()
+
+class FakeClient:
+    def __init__(self, delete_responses=(), failing=()):
+        self.batch = FakeBatch(delete_responses, failing)
+        self.query = FakeQueryAPI(self)
+        self.threads = []
+
+def deleted(matches, successful=None, failed=0, limit=WeaviateStore.DELETE_LIMIT, objects=None):
+    return {"results": {"matches": matches, "limit": limit, "successful": matches if successful is None else successful,
+                        "failed": failed, "objects": objects}}
+
+@pytest.fixture
+def make_store(monkeypatch):
+    monkeypatch.setenv("WEAVIATE_BATCH_SIZE", "4")
+    monkeypatch.setenv("WEAVIATE_BATCH_WORKERS", "2")
+
+    def make(delete_responses=(), failing=()):
+        store = WeaviateStore()
+        store.client = FakeClient(delete_responses, failing)
+        return store
+    return make
+
+def add(store, count):
+    ids = [f"id-{i}" for i in range(count)]
+    vectors = [[float(i), 1.0] for i in range(count)]
+    metadata = [{"file_id": "f1", "chunk_index": i} for i in range(count)]
+    return asyncio.run(store.add_vectors("Docs", vectors, metadata, ids))
+
+class TestBulkWrite:
+    """add_vectors goes through the client's dynamic batcher in a worker thread"""
+
+    def test_objects_are_batched_off_the_loop(self, make_store):
+        store = make_store()
+
+        result = add(store, 10)
+
+        assert result and result.succeeded == 10
+        assert [len(batch) for batch in store.client.batch.flushed] == [4, 4, 2]
+        config = store.client.batch.config
+        assert (config["batch_size"], config["dynamic"], config["num_workers"]) == (4, True, 2)
+        first = store.client.batch.flushed[0][0]
+        assert first["id"] == "id-0" and first["vector"] == [0.0, 1.0]
+        assert first["properties"] == {"file_id": "f1", "chunk_index": 0, "id": "id-0"}
+        assert threading.main_thread() not in store.client.batch.threads
+
+    def test_failed_objects_are_reported_per_batch(self, make_store):
+        store = make_store(failing={"id-1", "id-2", "id-9"})
+
+        result = add(store, 10)
+
+        assert not result
+        assert (result.succeeded, result.failed) == (7, 3)
+        assert result.errors == [
+            {"batch": 0, "size": 4, "failed": 2, "errors": ["bad vector id-1", "bad vector id-2"]},
+            {"batch": 1, "size": 2, "failed": 1, "errors": ["bad vector id-9"]},
+        ]
+
+    def test_client_error_fails_the_whole_write(self, make_store):
+        store = make_store()
+
+        def broken(**config):
+            raise ConnectionError("weaviate down")
+        store.client.batch.configure = broken
+
+        result = add(store, 3)
+
+        assert (result.succeeded, result.failed) == (0, 3)
+        assert result.errors[0]["errors"] == ["weaviate down"]
+
+class TestBatchDelete:
+    """Deletes go out as where-filtered batch deletes"""
+
+    def test_ids_are_deleted_in_batches_of_1000(self, make_store):
+        store = make_store([deleted(1000), deleted(1000), deleted(500)])
+        ids = [f"id-{i}" for i in range(2500)]
+
+        result = asyncio.run(store.delete_vectors("Docs", ids))
+
+        assert result.succeeded == 2500 and result
+        sizes = [len(where["operands"]) for _, where in store.client.batch.deletes]
+        assert sizes == [1000, 1000, 500]
+        first = store.client.batch.deletes[0][1]["operands"][0]
+        assert first == {"path": ["id"], "operator": "Equal", "valueText": "id-0"}
+
+    def test_filter_delete_repeats_while_limit_is_hit(self, make_store):
+        store = make_store([deleted(10000), deleted(37)])
+
+        result = asyncio.run(store.delete_by_filter("Docs", {"file_id": "f1"}))
+
+        assert result.succeeded == 10037
+        assert len(store.client.batch.deletes) == 2
+        assert store.client.batch.deletes[0][1] == {
+            "operator": "And",
+            "operands": [{"path": ["file_id"], "operator": "Equal", "valueText": "f1"}]
+        }
+
+    def test_failed_objects_are_reported(self, make_store):
+        objects = [{"errors": {"error": [{"message": "locked"}]}}]
+        store = make_store([deleted(3, successful=2, failed=1, objects=objects)])
+
+        result = asyncio.run(store.delete_by_filter("Docs", {"file_id": "f1"}))
+
+        assert not result
+        assert (result.succeeded, result.failed) == (2, 1)
+        assert result.errors == [{"batch": 0, "size": 3, "failed": 1, "errors": ["locked"]}]
+
+    def test_request_error_is_reported_per_batch(self, make_store):
+        store = make_store([deleted(1000), ConnectionError("weaviate down")])
+
+        result = asyncio.run(store.delete_vectors("Docs", [f"id-{i}" for i in range(1500)]))
+
+        assert result.succeeded == 1000
+        assert result.errors == [{"batch": 0, "size": None, "errors": ["weaviate down"]}]
+
+    def test_list_filter_values_mean_any_of(self):
+        where = WeaviateStore._build_where_filter({"file_id": ["a", "b"], "persona": "cherry"})
+
+        assert where["operands"][0] == {"operator": "Or", "operands": [
+            {"path": ["file_id"], "operator": "Equal", "valueText": "a"},
+            {"path": ["file_id"], "operator": "Equal", "valueText": "b"},
+        ]}
+        assert where["operands"][1]["valueText"] == "cherry"
+
+class TestBatchSearch:
+    """Several query vectors in one aliased GraphQL request"""
+
+    def test_one_request_per_batch_off_the_loop(self, make_store):
+        store = make_store()
+
+        results = asyncio.run(store.search_vectors_batch("Docs", [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]], top_k=5))
+
+        assert [[item["id"] for item in rows] for rows in results] == [["doc-1"], ["doc-2"], ["doc-3"]]
+        assert results[0][0]["score"] == 0.9
+        assert store.client.query.requests == 1
+        assert threading.main_thread() not in store.client.threads
+
+    def test_single_search_runs_off_the_loop(self, make_store):
+        store = make_store()
+
+        results = asyncio.run(store.search_vectors("Docs", [4.0, 0.0], filters={"file_id": "f1"}))
+
+        assert [item["id"] for item in results] == ["doc-4"]
+        assert threading.main_thread() not in store.client.threads
+
+    def test_empty_batch_makes_no_request(self, make_store):
+        store = make_store()
+
+        assert asyncio.run(store.search_vectors_batch("Docs", [])) == []
+        assert store.client.query.requests == 0